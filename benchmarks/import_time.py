@@ -0,0 +1,34 @@
+""" Measures the time taken to import pyEchosign in a fresh interpreter.
+
+Usage: python benchmarks/import_time.py [runs]
+"""
+import subprocess
+import sys
+import time
+
+STATEMENTS = (
+    'import pyEchosign',
+    'from pyEchosign import TransientDocument',
+    'from pyEchosign import EchosignAccount, Agreement',
+    'from pyEchosign import *',
+)
+
+
+def time_statement(statement, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.time()
+        subprocess.check_call([sys.executable, '-c', statement])
+        timings.append(time.time() - start)
+    baseline = []
+    for _ in range(runs):
+        start = time.time()
+        subprocess.check_call([sys.executable, '-c', 'pass'])
+        baseline.append(time.time() - start)
+    return sorted(timings)[runs // 2] - sorted(baseline)[runs // 2]
+
+
+if __name__ == '__main__':
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    for statement in STATEMENTS:
+        print('{:<55} {:7.1f} ms'.format(statement, time_statement(statement, runs) * 1000))
@@ -0,0 +1,92 @@
+""" Compares sending an agreement by uploading its document as a TransientDocument with sending a LibraryDocument
+already stored by Echosign, over a simulated network.
+
+Usage: python benchmarks/library_send.py [sends] [document KB] [round trip ms] [upload Mbit/s]
+"""
+import sys
+import threading
+import time
+from io import BytesIO
+
+from pyEchosign.classes.account import EchosignAccount
+from pyEchosign.classes.agreement import Agreement
+from pyEchosign.classes.documents import TransientDocument
+from pyEchosign.classes.library_document import LibraryDocument
+from pyEchosign.classes.users import User
+
+
+class Response(object):
+    status_code = 201
+
+    def __init__(self, body):
+        self.body = body
+        self.content = b''
+
+    def json(self):
+        return self.body
+
+
+class SimulatedSession(object):
+    """ Stands in for a requests Session, taking a round trip plus the time to upload each request body """
+    def __init__(self, round_trip, bandwidth):
+        self.round_trip = round_trip
+        self.bandwidth = bandwidth  # Bytes per second
+        self.bytes_sent = 0
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def post(self, url, data=None, files=None, **kwargs):
+        size = len(data or '')
+        for file_tuple in (files or {}).values():
+            file = file_tuple[1]
+            size += len(file.getvalue())
+        with self.lock:
+            self.bytes_sent += size
+            self.requests += 1
+        time.sleep(self.round_trip + size / float(self.bandwidth))
+        if url.endswith('transientDocuments'):
+            return Response(dict(transientDocumentId='document'))
+        return Response(dict(agreementId='agreement'))
+
+
+def run(send, count, session):
+    start = time.time()
+    for index in range(count):
+        send(index)
+    elapsed = time.time() - start
+    return elapsed / count, session.bytes_sent / float(count), session.requests / float(count)
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    document = b'%' * (int(sys.argv[2]) if len(sys.argv) > 2 else 1024) * 1024
+    round_trip = (float(sys.argv[3]) if len(sys.argv) > 3 else 80) / 1000
+    bandwidth = (float(sys.argv[4]) if len(sys.argv) > 4 else 20) * 1000 * 1000 / 8
+    recipients = [User('signer@example.com')]
+
+    def account(session):
+        return EchosignAccount('token', session=session, api_access_point='https://api.example.com/api/rest/v5/',
+                               circuit_breaker=False)
+
+    upload_session = SimulatedSession(round_trip, bandwidth)
+    upload_account = account(upload_session)
+
+    def send_uploaded(index):
+        agreement = Agreement(upload_account, name='Contract {}'.format(index))
+        agreement.files = [TransientDocument(upload_account, 'contract.pdf', BytesIO(document), 'application/pdf')]
+        agreement.send(recipients)
+
+    library_session = SimulatedSession(round_trip, bandwidth)
+    library_document = LibraryDocument(account(library_session), 'library-document', ['DOCUMENT'], 'Contract',
+                                       '2017-03-01T10:00:00+00:00', LibraryDocument.SHARED)
+
+    def send_library(index):
+        library_document.send(recipients, agreement_name='Contract {}'.format(index))
+
+    print('{} sends of a {} KB document, {:.0f} ms round trip, {:.0f} Mbit/s upload'.format(
+        count, len(document) // 1024, round_trip * 1000, bandwidth * 8 / 1000 / 1000))
+    print('{:<20} {:>12} {:>14} {:>10}'.format('', 'ms per send', 'bytes per send', 'requests'))
+    for name, send, session in (('upload and send', send_uploaded, upload_session),
+                                ('library document', send_library, library_session)):
+        latency, sent, requests = run(send, count, session)
+        print('{:<20} {:12.1f} {:14.0f} {:10.0f}'.format(name, latency * 1000, sent, requests))
@@ -0,0 +1,46 @@
+""" Compares loading an agreement listing from a Snapshot with parsing the same listing's JSON.
+
+Usage: python benchmarks/snapshot.py [agreements]
+"""
+import json
+import sys
+import time
+
+from pyEchosign.classes.account import EchosignAccount
+from pyEchosign.classes.agreement import Agreement
+from pyEchosign.classes.snapshot import Snapshot
+
+
+def listing(count):
+    return json.dumps(dict(userAgreementList=[{
+        'agreementId': 'agreement-{}'.format(index),
+        'name': 'Contract {}'.format(index),
+        'status': 'OUT_FOR_SIGNATURE' if index % 3 else 'SIGNED',
+        'displayDate': '2017-02-19T08:22:{:02d}-08:00'.format(index % 60),
+        'displayUserSetInfos': [{'displayUserSetMemberInfos': [
+            {'email': 'signer{}@example.com'.format(index % 500), 'fullName': 'Signer {}'.format(index % 500),
+             'company': 'Example'},
+        ]}],
+    } for index in range(count)]))
+
+
+def best_of(function, runs=5):
+    timings = []
+    for _ in range(runs):
+        start = time.time()
+        function()
+        timings.append(time.time() - start)
+    return min(timings)
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    body = listing(count)
+    account = EchosignAccount('token', api_access_point='https://api.example.com/api/rest/v5/')
+    data = Snapshot(Agreement.json_to_agreements(account, json.loads(body))).dumps()
+
+    parse = best_of(lambda: Agreement.json_to_agreements(account, json.loads(body)))
+    load = best_of(lambda: Snapshot.loads(account, data))
+    print('{} agreements: JSON {} bytes, snapshot {} bytes'.format(count, len(body), len(data)))
+    print('{:<20} {:8.1f} ms'.format('parse JSON', parse * 1000))
+    print('{:<20} {:8.1f} ms'.format('load snapshot', load * 1000))
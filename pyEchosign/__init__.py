@@ -1,4 +1,13 @@
-from .classes import *
-__all__ = ['EchosignAccount', 'Agreement', 'TransientDocument', 'User']
+from pyEchosign.utils.lazy import lazy_package
+
+__all__ = ['EchosignAccount', 'AccountPool', 'BlobStore', 'CallbackReceiver', 'CircuitBreaker', 'Deadline',
+           'OutboundQueue', 'ParticipantIndex', 'PollingScheduler', 'QuotaTracker', 'ReminderScheduler',
+           'RequestScheduler', 'Agreement', 'AgreementCollection', 'AgreementExporter', 'AgreementPrefetcher',
+           'JsonLinesExporter', 'SharedCache', 'ShardedSync', 'Snapshot', 'SpanCollector', 'Tracer',
+           'TransientDocument', 'User']
 __version__ = '1.0.1'
 __release__ = '1.0.1'
+
+# Classes and subpackages are imported on first access, so that importing pyEchosign stays cheap
+lazy_package(__name__, dict([(name, ('.classes', name)) for name in __all__] +
+                            [(name, ('.' + name, None)) for name in ('classes', 'exceptions', 'utils')]))
@@ -1,5 +1,37 @@
-from .account import *
-from .agreement import *
-from .documents import *
-from .users import *
-__all__ = ['EchosignAccount', 'Agreement', 'TransientDocument', 'User']
\ No newline at end of file
+from pyEchosign.utils.lazy import lazy_package
+
+__all__ = ['EchosignAccount', 'AccountPool', 'BlobStore', 'CallbackReceiver', 'CircuitBreaker', 'Deadline',
+           'OutboundQueue', 'ParticipantIndex', 'PollingScheduler', 'QuotaTracker', 'ReminderScheduler',
+           'RequestScheduler', 'Agreement', 'AgreementCollection', 'AgreementExporter', 'AgreementPrefetcher',
+           'JsonLinesExporter', 'SharedCache', 'ShardedSync', 'Snapshot', 'SpanCollector', 'Tracer',
+           'TransientDocument', 'User']
+
+# The module each public class is defined in. Modules are only imported once one of their classes is first used.
+_class_modules = {
+    'EchosignAccount': 'account',
+    'AccountPool': 'account_pool',
+    'BlobStore': 'blob_store',
+    'CallbackReceiver': 'callbacks',
+    'CircuitBreaker': 'resilience',
+    'Deadline': 'resilience',
+    'OutboundQueue': 'outbound',
+    'ParticipantIndex': 'participants',
+    'PollingScheduler': 'polling',
+    'QuotaTracker': 'quota',
+    'ReminderScheduler': 'reminders',
+    'RequestScheduler': 'scheduler',
+    'Agreement': 'agreement',
+    'AgreementCollection': 'collection',
+    'AgreementExporter': 'exporter',
+    'AgreementPrefetcher': 'prefetch',
+    'JsonLinesExporter': 'tracing',
+    'SharedCache': 'shared_cache',
+    'ShardedSync': 'sync',
+    'Snapshot': 'snapshot',
+    'SpanCollector': 'tracing',
+    'Tracer': 'tracing',
+    'TransientDocument': 'documents',
+    'User': 'users',
+}
+
+lazy_package(__name__, dict((name, ('.' + module, name)) for name, module in _class_modules.items()))
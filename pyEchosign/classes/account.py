@@ -1,12 +1,21 @@
 import logging
-from typing import List
+import threading
+import time
+from typing import Iterator, List
 
-import requests
-
-from pyEchosign.classes.agreement import Agreement
+from pyEchosign.classes.agreement import Agreement, AgreementView
 from pyEchosign.classes.library_document import LibraryDocument
+from pyEchosign.classes.participants import ParticipantIndex
+from pyEchosign.classes import tracing
+from pyEchosign.classes.resilience import CircuitBreaker, Deadline
+from pyEchosign.exceptions.echosign import AccessTokenError
+from pyEchosign.exceptions.internal import DeadlineExceeded, QuotaExceeded
 from pyEchosign.utils import endpoints
+from pyEchosign.utils.cache import cached
+from pyEchosign.utils.coalesce import SharedResponse, SingleFlight
 from pyEchosign.utils.handle_response import check_error
+from pyEchosign.utils.json_stream import iter_json_array
+from pyEchosign.utils.lazy import requests
 from pyEchosign.utils.request_parameters import get_headers
 
 log = logging.getLogger('pyOutlook - {}'.format(__name__))
@@ -16,27 +25,116 @@ __all__ = ['EchosignAccount']
 class EchosignAccount(object):
     """ Saves OAuth Information for connecting to Echosign
     
+    Keyword Args:
+        session: An object exposing ``get``, ``post``, ``put`` and ``delete`` with the same signatures as the
+            ``requests`` module (such as a ``requests.Session``), used for every HTTP call made under this account.
+            Defaults to the ``requests`` module itself.
+        api_access_point: The API endpoint to use, if already known. When provided, the request for base_uris is
+            skipped.
+        blob_store: A :class:`BlobStore <pyEchosign.classes.blob_store.BlobStore>` which downloaded files are kept in,
+            so that repeated downloads are read from disk
+        refresh_token: An OAuth refresh token. When provided along with client_id and client_secret, the access token
+            is refreshed automatically when the API rejects it, and the rejected request is made again.
+        client_id: The OAuth client ID of the application the tokens were issued to
+        client_secret: The OAuth client secret of the application the tokens were issued to
+        on_token_refresh: A function called with the account after its access token is refreshed, such as to save
+            the new token
+        coalesce_reads: Whether concurrent identical GET requests share one request to the API and its decoded
+            response. Defaults to True.
+        timeout: The timeout in seconds applied to each HTTP call, either a number or a (connect, read) tuple as
+            accepted by ``requests``, or None for no timeout. Defaults to ``DEFAULT_TIMEOUT``: 10 seconds to connect
+            and 60 seconds between bytes of the response. Calls made within a
+            :class:`Deadline <pyEchosign.classes.resilience.Deadline>` are limited to the time it has remaining.
+        circuit_breaker: The :class:`CircuitBreaker <pyEchosign.classes.resilience.CircuitBreaker>` requests are made
+            through, or False to disable it. Defaults to the CircuitBreaker shared by every account on the same
+            api_access_point.
+        cache: A :class:`SharedCache <pyEchosign.classes.shared_cache.SharedCache>` which base_uris, library document
+            and agreement documents responses are cached in, so that other processes sharing it don't request them
+            again
+        quota: A :class:`QuotaTracker <pyEchosign.classes.quota.QuotaTracker>` which counts every call this account
+            makes
+        scheduler: A :class:`RequestScheduler <pyEchosign.classes.scheduler.RequestScheduler>` which every call waits
+            on before it is made, so that interactive calls go ahead of batch work
+
     Attributes:
         access_token: The OAuth Access token to use for authenticating to Echosign
         user_id: The ID of the user to specify as the API caller, if not provided the caller is inferred from the token
         user_email: The email of the user to specify as the API caller, if not provided the caller is inferred from the token
         api_access_point: The API endpoint used as a base for all API calls
+        session: The object HTTP calls for this account are made through
+        blob_store: The :class:`BlobStore <pyEchosign.classes.blob_store.BlobStore>` for downloaded files, if any
     """
+    DEFAULT_TIMEOUT = (10, 60)
+
     def __init__(self, access_token, **kwargs):
         # type: (str) -> None
         self.access_token = access_token
         self.user_id = kwargs.pop('user_id', None)
         self.user_email = kwargs.pop('user_email', None)
+        self.session = kwargs.pop('session', requests)
+        self.api_access_point = kwargs.pop('api_access_point', None)
+        self.blob_store = kwargs.pop('blob_store', None)
+        self.refresh_token = kwargs.pop('refresh_token', None)
+        self.client_id = kwargs.pop('client_id', None)
+        self.client_secret = kwargs.pop('client_secret', None)
+        self.on_token_refresh = kwargs.pop('on_token_refresh', None)
+
+        self.coalesce_reads = kwargs.pop('coalesce_reads', True)
+        self.timeout = kwargs.pop('timeout', self.DEFAULT_TIMEOUT)
+        self.circuit_breaker = kwargs.pop('circuit_breaker', None)
+        self.cache = kwargs.pop('cache', None)
+        self.quota = kwargs.pop('quota', None)
+        self.scheduler = kwargs.pop('scheduler', None)
+
+        self._refresh_lock = threading.Lock()
+        self._single_flight = SingleFlight()
 
+        if self.api_access_point is None:
+            self.api_access_point = cached(self, endpoints.BASE_URIS, self._request_api_access_point)
+
+    def _request_api_access_point(self):
+        # type: () -> str
         log.debug('EchosignAccount instantiated. Requesting base_uris from API...')
-        headers = {'Access-Token': access_token}
-        response = requests.get(endpoints.BASE_URIS, headers=headers)
+        headers = {'Access-Token': self.access_token}
+        response = self.session.get(endpoints.BASE_URIS, headers=headers)
         response_body = response.json()
         log.debug('Received status code {} from Echosign API'.format(response.status_code))
-        self.api_access_point = response_body.get('api_access_point') + endpoints.API_URL_EXTENSION
+        return response_body.get('api_access_point') + endpoints.API_URL_EXTENSION
 
     access_token = None
 
+    def __getstate__(self):
+        # Locks can't be pickled or copied, so each copy of the account makes its own, and its own participant index
+        state = dict(self.__dict__)
+        del state['_refresh_lock'], state['_single_flight']
+        state.pop('_participants', None)
+        if state['session'] is requests:
+            state['session'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.session is None:
+            self.session = requests
+        self._refresh_lock = threading.Lock()
+        self._single_flight = SingleFlight()
+
+    @property
+    def cache_identity(self):
+        # type: () -> str
+        """ Identifies the account when keying data stored for it, such as in a :class:`BlobStore
+        <pyEchosign.classes.blob_store.BlobStore>`. Unlike the access token, it is unchanged when the access token is
+        refreshed. """
+        identity = self.user_id or self.user_email or self.refresh_token or self.access_token
+        return '{}\n{}'.format(self.api_access_point, identity)
+
+    @property
+    def participants(self):
+        # type: () -> ParticipantIndex
+        """ The :class:`ParticipantIndex <pyEchosign.classes.participants.ParticipantIndex>` of this account's
+        agreements, for finding every agreement of a participant by email """
+        return ParticipantIndex.for_account(self)
+
     def headers(self, content_type='application/json'):
         """ Return headers using account information
 
@@ -48,12 +146,224 @@ class EchosignAccount(object):
         """
         return get_headers(self.access_token, self.user_email, content_type)
 
-    def get_agreements(self, query=None):
-        # type: (str) -> List[Agreement]
+    def request(self, method, url, **kwargs):
+        """ Make an HTTP request to the API through this account's session
+
+        Args:
+            method: The HTTP method to use, 'get', 'post', 'put' or 'delete'
+            url: The full URL to request
+            **kwargs: Passed directly to the session, such as headers, params, data or files. A timeout given here
+                overrides the account's timeout for this call.
+
+        If the API responds with a 401 and the account has a refresh_token, the access token is refreshed and the
+        request is made again with the new token.
+
+        If coalesce_reads is enabled, a GET which is identical to one already in flight (same URL, parameters and
+        headers) waits for that request and shares its response, rather than making another.
+
+        Returns: The response received from the session
+
+        Raises:
+            DeadlineExceeded: If the call is made within a Deadline which has passed, including while waiting on the
+                account's scheduler
+            QuotaExceeded: If the account's quota enforces its limits and none remain for the call
+            CircuitOpenError: If the account's circuit breaker is open because requests to the api_access_point are
+                failing
+        """
+        if self.coalesce_reads and method == 'get' and not kwargs.get('stream'):
+            key = (url, self._freeze(kwargs.get('params')), self._freeze(kwargs.get('headers')))
+            deadline = Deadline.current()
+            return self._single_flight.do(key, lambda: self._request(method, url, **kwargs),
+                                          timeout=deadline.remaining if deadline is not None else None,
+                                          share=SharedResponse)
+
+        return self._request(method, url, **kwargs)
+
+    def _request(self, method, url, **kwargs):
+        # The token this request is sent with, which may already be older than the account's
+        access_token = (kwargs.get('headers') or {}).get('Access-Token', self.access_token)
+        file_positions = self._file_positions(kwargs.get('files'))
+
+        response = self._send(method, url, kwargs)
+
+        if response.status_code != 401 or self.refresh_token is None:
+            return response
+
+        log.debug('Received a 401 from Echosign API, refreshing access token before retrying')
+        response.close()
+        self.refresh_access_token(access_token)
+
+        headers = kwargs.get('headers')
+        if headers is not None and 'Access-Token' in headers:
+            kwargs['headers'] = dict(headers)
+            kwargs['headers']['Access-Token'] = self.access_token
+        for file, position in file_positions:
+            file.seek(position)
+
+        return self._send(method, url, kwargs)
+
+    def _send(self, method, url, kwargs):
+        """ Make a single call through the session, applying the scheduler, timeout, deadline and circuit breaker """
+        if self.scheduler is None:
+            return self._send_now(method, url, kwargs)
+
+        deadline = Deadline.current()
+        if not self.scheduler.acquire(timeout=deadline.remaining if deadline is not None else None):
+            raise DeadlineExceeded()
+        try:
+            return self._send_now(method, url, kwargs)
+        finally:
+            self.scheduler.release()
+
+    def _send_now(self, method, url, kwargs):
+        kwargs = dict(kwargs)
+        timeout = kwargs.pop('timeout', self.timeout)
+
+        shortened = False
+        deadline = Deadline.current()
+        if deadline is not None:
+            remaining = deadline.remaining
+            if remaining <= 0:
+                raise DeadlineExceeded()
+            capped = self._cap_timeout(timeout, remaining)
+            shortened = capped != timeout
+            timeout = capped
+        if timeout is not None:
+            kwargs['timeout'] = timeout
+
+        with tracing.trace('http', method=method.upper(), url=url) as span:
+            response = self._call(method, url, kwargs, shortened)
+            span.set_attribute('status_code', response.status_code)
+            return response
+
+    def _call(self, method, url, kwargs, shortened=False):
+        breaker = self._breaker()
+        if breaker is None:
+            self._count(method, url)
+            return getattr(self.session, method)(url, **kwargs)
+
+        breaker.before_call()
+        started = time.time()
+        recorded = False
+        try:
+            # Counted only once the breaker lets the call through, so calls it refuses don't use up the quota
+            self._count(method, url)
+            response = getattr(self.session, method)(url, **kwargs)
+            if response.status_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success(time.time() - started)
+            recorded = True
+            return response
+        except QuotaExceeded:
+            raise
+        except Exception as e:
+            # A timeout the caller's Deadline shortened says nothing about the health of the access point
+            if not (shortened and isinstance(e, requests.exceptions.Timeout)):
+                breaker.record_failure()
+                recorded = True
+            raise
+        finally:
+            if not recorded:
+                breaker.record_ignored()
+
+    def _count(self, method, url):
+        if self.quota is not None:
+            self.quota.reserve(self.quota.classify(method, url))
+
+    def _breaker(self):
+        # type: () -> CircuitBreaker
+        if self.circuit_breaker is False:
+            return None
+        if self.circuit_breaker is not None:
+            return self.circuit_breaker
+        # Looked up per call, since api_access_point may be changed after the account is created
+        return CircuitBreaker.for_access_point(self.api_access_point)
+
+    @staticmethod
+    def _cap_timeout(timeout, remaining):
+        """ Shorten a requests timeout (None, a number or a (connect, read) tuple) to at most remaining seconds """
+        if isinstance(timeout, tuple):
+            return tuple(remaining if part is None else min(part, remaining) for part in timeout)
+        if timeout is None:
+            return remaining
+        return min(timeout, remaining)
+
+    @tracing.traced('EchosignAccount.refresh_access_token')
+    def refresh_access_token(self, rejected_token=None):
+        # type: (str) -> None
+        """ Obtain a new access token using the refresh_token.
+
+        Only one refresh is made at a time. Threads which find their token rejected while a refresh is in progress
+        wait for it to finish and use its result, rather than refreshing again.
+
+        Args:
+            rejected_token: (optional) The access token the API rejected. If the account's access token has already
+                changed from it, no refresh is needed and none is made.
+
+        Raises:
+            AccessTokenError: If the account has no refresh_token
+            PermissionDenied, ApiError: If Echosign refuses the refresh
+            DeadlineExceeded, CircuitOpenError: As for :meth:`request`
+        """
+        if self.refresh_token is None:
+            raise AccessTokenError('A refresh_token is required to refresh the access token')
+
+        with self._refresh_lock:
+            if rejected_token is not None and rejected_token != self.access_token:
+                # Another thread refreshed the token while this one waited
+                return
+
+            root = self.api_access_point
+            if root.endswith(endpoints.API_URL_EXTENSION):
+                root = root[:-len(endpoints.API_URL_EXTENSION)]
+
+            data = dict(grant_type='refresh_token', refresh_token=self.refresh_token, client_id=self.client_id,
+                        client_secret=self.client_secret)
+            # Made like any other call, so the refresh is bounded by the account's timeout and the caller's Deadline
+            response = self._send('post', root + endpoints.OAUTH_REFRESH,
+                                  dict(data=data, headers={'Content-Type': 'application/x-www-form-urlencoded'}))
+            check_error(response)
+
+            response_body = response.json()
+            self.access_token = response_body['access_token']
+            self.refresh_token = response_body.get('refresh_token', self.refresh_token)
+            log.debug('Access token refreshed')
+
+        if self.on_token_refresh is not None:
+            self.on_token_refresh(self)
+
+    @classmethod
+    def _freeze(cls, value):
+        """ A hashable equivalent of request params or headers, whose values may be lists """
+        if isinstance(value, dict):
+            return tuple(sorted((key, cls._freeze(item)) for key, item in value.items()))
+        if isinstance(value, (list, tuple)):
+            return tuple(cls._freeze(item) for item in value)
+        return value
+
+    @staticmethod
+    def _file_positions(files):
+        """ The current position of each seekable file being uploaded, so they can be rewound for a retry """
+        positions = []
+        for value in (files or {}).values():
+            file = value[1] if isinstance(value, tuple) else value
+            if hasattr(file, 'seek') and hasattr(file, 'tell'):
+                try:
+                    positions.append((file, file.tell()))
+                except (IOError, OSError, ValueError):
+                    pass
+        return positions
+
+    @tracing.traced('EchosignAccount.get_agreements')
+    def get_agreements(self, query=None, raw=False):
+        # type: (str, bool) -> List[Agreement]
         """ Gets all agreements for the EchosignAccount
 
         Keyword Args:
             query: (str) A search query to filter results by
+            raw: (bool) Return lightweight :class:`AgreementViews <pyEchosign.classes.agreement.AgreementView>` over
+                the JSON received, which only build the full Agreement when needed
         
         Returns: A list of :class:`Agreement <pyEchosign.classes.agreement.Agreement>` objects
         """
@@ -63,22 +373,88 @@ class EchosignAccount(object):
         if query is not None:
             params.update({'query': query})
 
-        r = requests.get(url, headers=get_headers(self.access_token), params=params)
+        r = self.request('get', url, headers=get_headers(self.access_token), params=params)
         check_error(r)
         response_body = r.json()
-        return Agreement.json_to_agreements(self, response_body)
+        agreements = Agreement.json_to_agreements(self, response_body, raw=raw)
+        if not raw:
+            # Without a query the listing is complete, so agreements no longer in it are removed from the index
+            self.participants.update(agreements, complete=query is None)
+        return agreements
+
+    def iter_agreements(self, query=None, raw=False, prefetch=None):
+        # type: (str, bool, dict) -> Iterator[Agreement]
+        """ Gets all agreements for the EchosignAccount like :meth:`get_agreements`, but parses the response as it
+        is received and yields each agreement as soon as it is complete. Only one agreement's JSON is held in memory
+        at a time, rather than the whole response.
+
+        Keyword Args:
+            query: (str) A search query to filter results by
+            raw: (bool) Yield lightweight :class:`AgreementViews <pyEchosign.classes.agreement.AgreementView>`
+            prefetch: (dict) Retrieve the documents or signing URLs of agreements in the background, ahead of the one
+                being used. Takes the keyword arguments of :class:`AgreementPrefetcher
+                <pyEchosign.classes.prefetch.AgreementPrefetcher>`, such as ``dict(signing_urls=True, ahead=16)``.
+
+        Returns: A generator of :class:`Agreement <pyEchosign.classes.agreement.Agreement>` objects
+        """
+        if prefetch is not None:
+            from pyEchosign.classes.prefetch import AgreementPrefetcher
+            return iter(AgreementPrefetcher(self.iter_agreements(query, raw), **prefetch))
+        return self._iter_agreements(query, raw)
+
+    def _iter_agreements(self, query, raw):
+        url = self.api_access_point + 'agreements'
+        params = dict()
+
+        if query is not None:
+            params.update({'query': query})
+
+        r = self.request('get', url, headers=get_headers(self.access_token), params=params, stream=True)
+        check_error(r)
 
+        try:
+            for agreement_data in iter_json_array(r.iter_content(64 * 1024), 'userAgreementList'):
+                if raw:
+                    yield AgreementView(self, agreement_data)
+                else:
+                    agreement = Agreement.json_to_agreement(self, agreement_data)
+                    self.participants.update([agreement])
+                    yield agreement
+        finally:
+            r.close()
+
+    @tracing.traced('EchosignAccount.get_library_documents')
     def get_library_documents(self):
         """ Gets all Library Documents for the EchosignAccount
 
         Returns: A list of :class:`Agreement <pyEchosign.classes.library_document.LibraryDocument>` objects
         """
         url = self.api_access_point + 'libraryDocuments'
-        headers = get_headers(self.access_token)
-        r = requests.get(url, headers=headers)
-        response_data = r.json()
 
-        check_error(r)
+        def fetch():
+            r = self.request('get', url, headers=get_headers(self.access_token))
+            response_data = r.json()
+
+            check_error(r)
+            return response_data
 
+        response_data = cached(self, url, fetch)
         return LibraryDocument.json_to_agreements(self, response_data)
 
+    def iter_library_documents(self):
+        # type: () -> Iterator[LibraryDocument]
+        """ Gets all Library Documents for the EchosignAccount like :meth:`get_library_documents`, but yields each
+        as soon as it is received rather than holding the whole response in memory.
+
+        Returns: A generator of :class:`LibraryDocument <pyEchosign.classes.library_document.LibraryDocument>` objects
+        """
+        url = self.api_access_point + 'libraryDocuments'
+        r = self.request('get', url, headers=get_headers(self.access_token), stream=True)
+        check_error(r)
+
+        try:
+            for document_data in iter_json_array(r.iter_content(64 * 1024), 'libraryDocumentList'):
+                yield LibraryDocument.json_to_agreement(self, document_data)
+        finally:
+            r.close()
+
@@ -0,0 +1,183 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from pyEchosign.classes.account import EchosignAccount
+from pyEchosign.utils.lazy import requests
+from pyEchosign.utils.rate_limit import TokenBucket
+
+log = logging.getLogger('pyEchosign.' + __name__)
+
+__all__ = ['AccountPool']
+
+
+def _new_session(pool_size):
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class _Shard(object):
+    """ The connections and rate budget shared by every account that resolves to one api_access_point """
+    def __init__(self, api_access_point, pool_size, rate=None, burst=None):
+        # type: (str, int, float, float) -> None
+        self.api_access_point = api_access_point
+        self.session = _new_session(pool_size)
+        self.bucket = TokenBucket(rate, burst) if rate is not None else None
+
+    def request(self, method, url, **kwargs):
+        if self.bucket is not None:
+            self.bucket.acquire()
+        return self.session.request(method, url, **kwargs)
+
+
+class _TenantSession(object):
+    """ The session handed to a pooled account. Holds the per-token concurrency limit and delegates to the shard. """
+    def __init__(self, shard, max_concurrency=None):
+        # type: (_Shard, int) -> None
+        self.shard = shard
+        self.last_used = time.time()
+        self._semaphore = threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+
+    def request(self, method, url, **kwargs):
+        self.last_used = time.time()
+        if self._semaphore is None:
+            return self.shard.request(method, url, **kwargs)
+        with self._semaphore:
+            return self.shard.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request('PUT', url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request('DELETE', url, **kwargs)
+
+
+class AccountPool(object):
+    """ Hands out :class:`EchosignAccounts <pyEchosign.classes.account.EchosignAccount>` for many access tokens,
+    sharing connections and rate budgets between every account on the same api_access_point ("shard"). Thousands of
+    tenants therefore use no more sockets than the handful of shards they resolve to.
+
+    Keyword Args:
+        max_accounts (int): How many accounts are held before the least recently retrieved is evicted
+        idle_timeout (float): Seconds without any request after which an account is evicted. Defaults to None, for
+            eviction by ``max_accounts`` only.
+        pool_size (int): The number of connections kept open per shard
+        rate (float): Requests per second permitted per shard. Defaults to None, for no limit.
+        burst (float): How many requests may be made at once per shard before ``rate`` applies. Defaults to ``rate``.
+        max_concurrency_per_token (int): How many requests may be in flight at once for one access token. None for
+            no limit.
+    """
+    def __init__(self, max_accounts=1000, idle_timeout=None, pool_size=10, rate=None, burst=None,
+                 max_concurrency_per_token=4):
+        # type: (int, float, int, float, float, int) -> None
+        self.max_accounts = max_accounts
+        self.idle_timeout = idle_timeout
+        self.pool_size = pool_size
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency_per_token = max_concurrency_per_token
+
+        self._accounts = OrderedDict()  # type: OrderedDict
+        self._shards = {}  # type: dict
+        self._lock = threading.Lock()
+        # Only used to look up base_uris, which are all served by the same host
+        self._bootstrap = _new_session(pool_size)
+
+    def __len__(self):
+        return len(self._accounts)
+
+    def __contains__(self, access_token):
+        return access_token in self._accounts
+
+    @property
+    def shards(self):
+        """ The api_access_points which currently have a connection pool """
+        return list(self._shards.keys())
+
+    def get_account(self, access_token, **kwargs):
+        # type: (str) -> EchosignAccount
+        """ Retrieve the account for an access token, creating it if it isn't already pooled.
+
+        Args:
+            access_token: The OAuth Access token of the tenant
+            **kwargs: Passed to :class:`EchosignAccount <pyEchosign.classes.account.EchosignAccount>` when the
+                account is created, such as user_email or api_access_point. A session may not be given.
+
+        Returns: An :class:`EchosignAccount <pyEchosign.classes.account.EchosignAccount>` using its shard's connections
+
+        """
+        if 'session' in kwargs:
+            raise TypeError('AccountPool accounts use the connections of their shard, so a session cannot be given')
+
+        with self._lock:
+            account = self._take(access_token)
+            if account is not None:
+                self._accounts[access_token] = account
+                self._evict()
+                return account
+
+        # Resolving base_uris is a network call, so it's done without holding the lock
+        account = EchosignAccount(access_token, session=self._bootstrap, **kwargs)
+
+        with self._lock:
+            existing = self._take(access_token)
+            if existing is not None:
+                # Another thread created the account in the meantime
+                account = existing
+            else:
+                account.session = _TenantSession(self._shard(account.api_access_point),
+                                                 self.max_concurrency_per_token)
+            self._accounts[access_token] = account
+            self._evict()
+
+        return account
+
+    def evict(self, access_token):
+        # type: (str) -> None
+        """ Remove the account for an access token from the pool, if present """
+        with self._lock:
+            self._accounts.pop(access_token, None)
+
+    def close(self):
+        """ Close every connection held by the pool and forget all pooled accounts """
+        with self._lock:
+            self._accounts.clear()
+            for shard in self._shards.values():
+                shard.session.close()
+            self._shards.clear()
+            self._bootstrap.close()
+
+    def _take(self, access_token):
+        # Popping and re-inserting moves the account to the most recently used end
+        return self._accounts.pop(access_token, None)
+
+    def _shard(self, api_access_point):
+        # type: (str) -> _Shard
+        shard = self._shards.get(api_access_point)
+        if shard is None:
+            log.debug('Opening connection pool for {}'.format(api_access_point))
+            shard = _Shard(api_access_point, self.pool_size, self.rate, self.burst)
+            self._shards[api_access_point] = shard
+        return shard
+
+    def _evict(self):
+        while len(self._accounts) > self.max_accounts:
+            self._accounts.popitem(last=False)
+
+        if self.idle_timeout is not None:
+            cutoff = time.time() - self.idle_timeout
+            # Accounts are ordered by when they were last retrieved rather than last used, so every one is checked
+            for access_token in list(self._accounts.keys()):
+                if self._accounts[access_token].session.last_used < cutoff:
+                    log.debug('Evicting idle account from pool')
+                    del self._accounts[access_token]
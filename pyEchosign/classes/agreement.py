@@ -1,27 +1,37 @@
 import json
 import logging
+import os
+import threading
 from collections import namedtuple
+from io import BytesIO, IOBase, StringIO
 from typing import TYPE_CHECKING, List, Dict
 
-import arrow
-
-import requests
-from six import StringIO, BytesIO
-
 from pyEchosign.classes.documents import AgreementDocument
+from pyEchosign.classes.library_document import LibraryDocument
+from pyEchosign.classes.resilience import Deadline
+from pyEchosign.classes.scheduler import RequestScheduler
+from pyEchosign.classes import tracing
 from pyEchosign.exceptions.internal import ApiError
 from pyEchosign.utils.utils import find_user_in_list
+from .participants import ParticipantIndex
 from .users import User
 
 from pyEchosign.utils.request_parameters import get_headers
 from pyEchosign.utils.handle_response import check_error, response_success
+from pyEchosign.utils.cache import cached
+from pyEchosign.utils.download import download
+from pyEchosign.utils.lazy import arrow
 
 log = logging.getLogger('pyEchosign.' + __name__)
 
 if TYPE_CHECKING:
     from .account import EchosignAccount
 
-__all__ = ['Agreement']
+__all__ = ['Agreement', 'AgreementView']
+
+
+def _agreement_id(agreement):
+    return agreement.echosign_id
 
 
 class Agreement(object):
@@ -43,7 +53,10 @@ class Agreement(object):
             :class:`EchosignAccount <pyEchosign.classes.account.EchosignAccount>`
         files (list): A list of :class:`TransientDocument <pyEchosign.classes.documents.TransientDocument>` instances
             which will become the documents within the agreement. This information is not provided when retrieving
-            agreements from Echosign.
+            agreements from Echosign. :class:`PendingDocuments <pyEchosign.classes.documents.PendingDocument>` may
+            also be used, and are waited for when the agreement is sent, as may
+            :class:`LibraryDocuments <pyEchosign.classes.library_document.LibraryDocument>`, which are used without
+            being uploaded again.
     
     Attributes:
         account (EchosignAccount): An instance of :class:`EchosignAccount <pyEchosign.classes.account.EchosignAccount>`.
@@ -78,6 +91,17 @@ class Agreement(object):
 
         self._documents = None
         self._signing_url = None
+        self._lock = threading.RLock()
+
+    def __getstate__(self):
+        # The lock can't be pickled or copied, so each copy of the agreement makes its own
+        state = dict(self.__dict__)
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
 
     def __str__(self):
         if self.name is not None:
@@ -126,6 +150,10 @@ class Agreement(object):
         WAITING_FOR_AUTHORING = 'WAITING_FOR_AUTHORING'
         OTHER = 'OTHER'
 
+    # Statuses an agreement never leaves, so its documents no longer change
+    FINAL_STATUSES = frozenset([Status.SIGNED, Status.APPROVED, Status.DELIVERED, Status.ACCEPTED, Status.FORM_FILLED,
+                                Status.RECALLED, Status.ARCHIVED, Status.EXPIRED])
+
     @classmethod
     def json_to_agreement(cls, account, json_data):
         echosign_id = json_data.get('agreementId', None)
@@ -133,7 +161,7 @@ class Agreement(object):
         status = json_data.get('status', None)
         user_set = json_data.get('displayUserSetInfos', None)[0]
         user_set = user_set.get('displayUserSetMemberInfos', None)
-        users = User.json_to_users(user_set)
+        users = User.json_to_users(user_set, participants=ParticipantIndex.for_account(account))
         date = json_data.get('displayDate', None)
         if date is not None:
             date = arrow.get(date)
@@ -142,8 +170,10 @@ class Agreement(object):
         return new_agreement
 
     @classmethod
-    def json_to_agreements(cls, account, json_data):
+    def json_to_agreements(cls, account, json_data, raw=False):
         json_data = json_data.get('userAgreementList')
+        if raw:
+            return [AgreementView(account, agreement_data) for agreement_data in json_data]
         return [cls.json_to_agreement(account, agreement_data) for agreement_data in json_data]
 
     @property
@@ -157,62 +187,163 @@ class Agreement(object):
         """
         # If _documents is None, no (successful) API call has been made to retrieve them
         if self._documents is None:
-            url = self.account.api_access_point + 'agreements/{}/documents'.format(self.echosign_id)
-            r = requests.get(url, headers=get_headers(self.account.access_token))
-            # Raise Exception if there was an error
-            check_error(r)
-            try:
-                data = r.json()
-            except ValueError:
-                raise ApiError('Unexpected response from Echosign API: Status {} - {}'.format(r.status_code, r.content))
-            else:
-                self._documents = []
-
-                # Take both sections of documents from the response and turn into AgreementDocuments
-                documents = self._document_data_to_document(data.get('documents', []))
-                supporting_documents = self._document_data_to_document(data.get('supportingDocuments', []))
-                self._documents = documents + supporting_documents
+            # Concurrent callers wait for the first to retrieve the documents, rather than each requesting them
+            with self._lock:
+                if self._documents is None:
+                    url = self.account.api_access_point + 'agreements/{}/documents'.format(self.echosign_id)
+                    with tracing.trace('Agreement.documents', agreement_id=self.echosign_id):
+                        data = cached(self.account, url, lambda: self._request_documents(url))
+                    # Take both sections of documents from the response and turn into AgreementDocuments
+                    documents = self._document_data_to_document(data.get('documents', []), self)
+                    supporting_documents = self._document_data_to_document(data.get('supportingDocuments', []), self)
+                    self._documents = documents + supporting_documents
 
         return self._documents
 
+    def _request_documents(self, url):
+        r = self.account.request('get', url, headers=get_headers(self.account.access_token))
+        # Raise Exception if there was an error
+        check_error(r)
+        try:
+            return r.json()
+        except ValueError:
+            raise ApiError('Unexpected response from Echosign API: Status {} - {}'.format(r.status_code, r.content))
+
     @property
     def combined_document(self):
         # type: () -> BytesIO
         """ The PDF file containing all documents within this agreement."""
-        endpoint = '{}agreements/{}/combinedDocument'.format(self.account.api_access_point, self.echosign_id)
-
-        response = requests.get(endpoint, headers=get_headers(self.account.access_token))
-        check_error(response)
+        file = BytesIO()
+        self.download_combined_document(file)
+        file.seek(0)
 
-        return BytesIO(response.content)
+        return file
 
     @property
     def audit_trail_file(self):
         # type: () -> BytesIO
         """ The PDF file of the audit trail."""
-        endpoint = '{}agreements/{}/auditTrail'.format(self.account.api_access_point, self.echosign_id)
+        file = BytesIO()
+        self.download_audit_trail_file(file)
+        file.seek(0)
+
+        return file
+
+    def _download(self, resource, file):
+        """ Streams an agreement resource, such as combinedDocument, into file. Returns the number of bytes written """
+        endpoint = '{}agreements/{}/{}'.format(self.account.api_access_point, self.echosign_id, resource)
+        return download(self.account, endpoint, file, final=self._final)
+
+    @property
+    def _final(self):
+        # type: () -> bool
+        """ Whether the agreement has a final status, so its files can be kept in the account's BlobStore """
+        return getattr(self, 'status', None) in self.FINAL_STATUSES
+
+    @tracing.traced('Agreement.download_combined_document', agreement_id=_agreement_id)
+    def download_combined_document(self, file):
+        # type: (IOBase) -> int
+        """ Writes the PDF file containing all documents within this agreement to a file, without holding the whole
+        PDF in memory.
+
+        Args:
+            file: A file-like object opened for writing bytes
 
-        response = requests.get(endpoint, headers=get_headers(self.account.access_token))
-        check_error(response)
+        Returns: The number of bytes written
+
+        """
+        return self._download('combinedDocument', file)
+
+    @tracing.traced('Agreement.download_audit_trail_file', agreement_id=_agreement_id)
+    def download_audit_trail_file(self, file):
+        # type: (IOBase) -> int
+        """ Writes the PDF file of the audit trail to a file, without holding the whole PDF in memory.
+
+        Args:
+            file: A file-like object opened for writing bytes
+
+        Returns: The number of bytes written
+
+        """
+        return self._download('auditTrail', file)
+
+    @tracing.traced('Agreement.download_form_data', agreement_id=_agreement_id)
+    def download_form_data(self, file):
+        # type: (IOBase) -> int
+        """ Writes the form data for this agreement as CSV to a file.
+
+        Args:
+            file: A file-like object opened for writing bytes
+
+        Returns: The number of bytes written
+
+        """
+        return self._download('formData', file)
+
+    @tracing.traced('Agreement.download_documents', agreement_id=_agreement_id)
+    def download_documents(self, directory, workers=4, documents=None):
+        # type: (str, int, List[AgreementDocument]) -> Dict[AgreementDocument, str]
+        """ Downloads the individual documents of this agreement into a directory, several at a time. Unlike
+        :attr:`combined_document`, only the documents requested are transferred.
+
+        Args:
+            directory: The directory to write the documents to. Files are named after the document, prefixed with
+                its ID if two documents share a name.
+            workers: (optional) How many documents are downloaded at once. Defaults to 4.
+            documents: (optional) Which :class:`AgreementDocuments <pyEchosign.classes.documents.AgreementDocument>`
+                to download. Defaults to all :attr:`documents`.
+
+        Returns: A dict of each :class:`AgreementDocument <pyEchosign.classes.documents.AgreementDocument>` to the
+            path it was written to
+
+        """
+        from concurrent.futures import ThreadPoolExecutor
 
-        return BytesIO(response.content)
+        if documents is None:
+            documents = self.documents
+
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        paths = {}
+        names = [document.file_name for document in documents]
+        for document in documents:
+            file_name = document.file_name
+            if names.count(file_name) > 1:
+                file_name = '{}_{}'.format(document.echosign_id, file_name)
+            paths[document] = os.path.join(directory, file_name)
+
+        def download_document(document):
+            with open(paths[document], 'wb') as file:
+                document.download(file)
+
+        executor = ThreadPoolExecutor(max_workers=workers)
+        try:
+            # Consuming the results re-raises the first exception encountered, if any
+            list(executor.map(tracing.bind(Deadline.bind(RequestScheduler.bind(download_document))), documents))
+        finally:
+            executor.shutdown(wait=True)
+
+        return paths
 
     @staticmethod
-    def _document_data_to_document(json_data):
-        # type: (dict) -> list
+    def _document_data_to_document(json_data, agreement=None):
+        # type: (dict, Agreement) -> list
         """ Coverts JSON received from API into an AgreementDocument and appends to Agreement.documents """
         documents = []
         for document_data in json_data:
             # Documents and Supporting Documents are not mixed together - we could get either ID
-            try:
-                echosign_id = document_data.get('documentId')
-            except KeyError:
+            supporting_document = 'supportingDocumentId' in document_data
+            if supporting_document:
                 echosign_id = document_data.get('supportingDocumentId')
+            else:
+                echosign_id = document_data.get('documentId')
 
             mime_type = document_data.get('mimeType')
             name = document_data.get('name')
             page_count = document_data.get('numPages')
-            document = AgreementDocument(echosign_id, mime_type, name, page_count)
+            document = AgreementDocument(echosign_id, mime_type, name, page_count, supporting_document,
+                                         agreement=agreement)
 
             # If this is a supporting document, there will be a field name
             field_name = document_data.get('fieldName', None)
@@ -247,11 +378,12 @@ class Agreement(object):
 
         return recipient_set
 
+    @tracing.traced('Agreement.cancel', agreement_id=_agreement_id)
     def cancel(self):
         """ Cancels the agreement on Echosign. Agreement will still be visible in the Manage page. """
         url = '{}agreements/{}/status'.format(self.account.api_access_point, self.echosign_id)
         body = dict(value='CANCEL')
-        r = requests.put(url, headers=get_headers(self.account.access_token), data=json.dumps(body))
+        r = self.account.request('put', url, headers=get_headers(self.account.access_token), data=json.dumps(body))
 
         if response_success(r):
             log.debug('Request to cancel agreement {} successful.'.format(self.echosign_id))
@@ -263,6 +395,7 @@ class Agreement(object):
             finally:
                 check_error(r)
 
+    @tracing.traced('Agreement.delete', agreement_id=_agreement_id)
     def delete(self):
         """ Deletes the agreement on Echosign. Agreement will not be visible in the Manage page. 
         
@@ -272,7 +405,7 @@ class Agreement(object):
         """
         url = self.account.api_access_point + 'agreements/' + self.echosign_id
 
-        r = requests.delete(url, headers=get_headers(self.account.access_token))
+        r = self.account.request('delete', url, headers=get_headers(self.account.access_token))
 
         if response_success(r):
             log.debug('Request to delete agreement {} successful.'.format(self.echosign_id))
@@ -288,10 +421,12 @@ class Agreement(object):
         PARALLEL = 'PARALLEL'
         SENDER_SIGNS_ONLY = 'SENDER_SIGNS_ONLY'
 
+    @tracing.traced('Agreement.send')
     def send(self, recipients, agreement_name=None, ccs=None, days_until_signing_deadline=0,
              external_id='', signature_flow=SignatureFlow.SEQUENTIAL, message='',
-             merge_fields=None):
-        # type: (List[User], str, list, int, str, Agreement.SignatureFlow, str, List[Dict[str, str]]) -> None
+             merge_fields=None, callback_url=None, library_document_id=None):
+        # type: (List[User], str, list, int, str, Agreement.SignatureFlow, str, List[Dict[str, str]], str,
+        #        str) -> None
         """ Sends this agreement to Echosign for signature
 
         Args:
@@ -310,6 +445,11 @@ class Agreement(object):
                 'default_value' keys. The field name maps to the field on the document, and the default value is
                 what will be placed inside.
             message: (optional) A message which will be displayed to recipients of the agreement
+            callback_url: (optional) A URL Echosign will notify when the status of the agreement changes, such as the
+                URL of a :class:`CallbackReceiver <pyEchosign.classes.callbacks.CallbackReceiver>`
+            library_document_id: (optional) The ID of a
+                :class:`LibraryDocument <pyEchosign.classes.library_document.LibraryDocument>` to send, in addition to
+                any files. Library documents are already stored by Echosign, so nothing is uploaded.
 
         Returns:
             A namedtuple representing the information received back from the API. Contains the following attributes
@@ -336,11 +476,12 @@ class Agreement(object):
         if ccs is None:
             ccs = []
 
+        if callback_url is None:
+            callback_url = ''
+
         security_options = dict(passwordProtection="NONE", kbaProtection="NONE", webIdentityProtection="NONE",
                                 protectOpen=False, internalPassword="", externalPassword="", openPassword="")
 
-        files_data = [{'transientDocumentId': file.document_id} for file in self.files]
-
         if merge_fields is None:
             merge_fields = []
 
@@ -349,16 +490,22 @@ class Agreement(object):
 
         recipients_data = self.__construct_recipient_agreement_request(recipients)
 
-        document_creation_info = dict(signatureType="ESIGN", name=agreement_name, callbackInfo="",
+        document_creation_info = dict(signatureType="ESIGN", name=agreement_name, callbackInfo=callback_url,
                                       securityOptions=security_options, locale="", ccs=ccs,
                                       externalId=external_id, signatureFlow=signature_flow,
-                                      fileInfos=files_data, mergeFieldInfo=converted_merge_fields,
+                                      mergeFieldInfo=converted_merge_fields,
                                       recipientSetInfos=recipients_data, message=message,
                                       daysUntilSigningDeadline=days_until_signing_deadline, )
 
+        # Done last, since any files still uploading in the background are waited for here
+        file_infos = [self._file_info(file) for file in self.files]
+        if library_document_id is not None:
+            file_infos.append({'libraryDocumentId': library_document_id})
+        document_creation_info['fileInfos'] = file_infos
+
         request_data = dict(documentCreationInfo=document_creation_info)
         url = self.account.api_access_point + 'agreements'
-        api_response = requests.post(url, headers=self.account.headers(), data=json.dumps(request_data))
+        api_response = self.account.request('post', url, headers=self.account.headers(), data=json.dumps(request_data))
 
         if response_success(api_response):
             response = namedtuple('Response', ('agreement_id', 'embedded_code', 'expiration', 'url'))
@@ -369,38 +516,71 @@ class Agreement(object):
             url = response_data.get('url', None)
 
             response = response(response_data['agreementId'], embedded_code, expiration, url)
+            tracing.current_span().set_attribute('agreement_id', response.agreement_id)
 
             return response
 
         else:
             check_error(api_response)
 
+    @staticmethod
+    def _file_info(file):
+        """ The fileInfo identifying one of the agreement's files to Echosign. A fileInfo dict, such as one an
+        :class:`OutboundQueue <pyEchosign.classes.outbound.OutboundQueue>` kept, is used as it is. """
+        if isinstance(file, dict):
+            return file
+        if isinstance(file, LibraryDocument):
+            return {'libraryDocumentId': file.echosign_id}
+        return {'transientDocumentId': file.document_id}
+
+    @tracing.traced('Agreement.get_signing_urls', agreement_id=_agreement_id)
     def get_signing_urls(self):
         """ Associate the signing URLs for this agreement with its
         :class:`recipients <pyEchosign.classes.users.User>` """
         endpoint = '{}agreements/{}/signingUrls'.format(self.account.api_access_point, self.echosign_id)
         headers = get_headers(self.account.access_token)
-        r = requests.get(endpoint, headers=headers)
+        r = self.account.request('get', endpoint, headers=headers)
 
         if response_success(r):
             data = r.json()
             url_sets = data['signingUrlSetInfos']
 
-            # Each signing set will have its own URLs
-            for set in url_sets:
-                urls = set['signingUrls']
-                for url in urls:
-                    try:
-                        email = url['email']
-                        # Find the user in this Agreement's list of users that has a matching email
-                        matching_user = find_user_in_list(self.users, 'email', email)
-                    except KeyError:
-                        continue
-                    # Set the signing URL for that recipient
+            # Only the users are changed under the lock, so the request doesn't hold up readers of the agreement
+            with self._lock:
+                self._assign_signing_urls(url_sets)
+
+    def _assign_signing_urls(self, url_sets):
+        """ Set the signing URLs in signingUrlSetInfos on the users. Must be called with the lock held. """
+        # Each signing set will have its own URLs
+        for set in url_sets:
+            urls = set['signingUrls']
+            for url in urls:
+                try:
+                    email = url['email']
+                    # Find the user in this Agreement's list of users that has a matching email
+                    matching_user = find_user_in_list(self.users, 'email', email)
+                except KeyError:
+                    continue
+                # Set the signing URL for that recipient
+                if matching_user is not None:
+                    if matching_user.agreement is not self:
+                        # Users from listings are shared between agreements, so this agreement needs its own
+                        matching_user = self._own_user(matching_user)
                     matching_user._signing_url = url['esignUrl']
 
+    def _own_user(self, user):
+        # type: (User) -> User
+        """ Replace a participant shared with other agreements by a copy belonging to this agreement """
+        own = User(user.email, full_name=user.full_name, company=user.company, agreement=self,
+                   authentication_method=user.authentication_method, password=user.password)
+        self.users = [own if existing is user else existing for existing in self.users]
+        return own
+
+    @tracing.traced('Agreement.send_reminder', agreement_id=_agreement_id)
     def send_reminder(self, comment=''):
-        """ Send a reminder for an agreement to the participants.
+        """ Send a reminder for an agreement to the participants. Each call sends a reminder; use a
+        :class:`ReminderScheduler <pyEchosign.classes.reminders.ReminderScheduler>` to merge reminders requested by
+        several callers.
 
         Args:
             comment: An optional comment that will be sent with the reminder
@@ -409,10 +589,11 @@ class Agreement(object):
         url = self.account.api_access_point + 'reminders'
         payload = dict(agreementId=self.echosign_id, comment=comment)
 
-        r = requests.post(url, data=json.dumps(payload), headers=self.account.headers())
+        r = self.account.request('post', url, data=json.dumps(payload), headers=self.account.headers())
 
         check_error(r)
 
+    @tracing.traced('Agreement.get_form_data', agreement_id=_agreement_id)
     def get_form_data(self):
         """ Retrieves the form data for this agreement as CSV.
 
@@ -421,8 +602,99 @@ class Agreement(object):
         """
         url = '{}agreements/{}/formData'.format(self.account.api_access_point, self.echosign_id)
 
-        r = requests.get(url, headers=self.account.headers())
+        r = self.account.request('get', url, headers=self.account.headers())
 
         check_error(r)
 
         return StringIO(r.text)
+
+
+class AgreementView(object):
+    """ A lightweight, read-only view of an agreement from a listing, returned by
+    :meth:`EchosignAccount.get_agreements <pyEchosign.classes.account.EchosignAccount.get_agreements>` with raw=True.
+
+    The view wraps the JSON received from the API without copying it. The date is only parsed and the users are only
+    built when accessed, so filtering a large listing on one or two fields avoids most of the work of creating
+    :class:`Agreements <pyEchosign.classes.agreement.Agreement>`. Any other attribute or method of Agreement, such as
+    :attr:`documents <pyEchosign.classes.agreement.Agreement.documents>`, is available and materializes the full
+    Agreement on first use.
+
+    Attributes:
+        account (EchosignAccount): The account the agreement was retrieved with
+        data (dict): The JSON of the agreement as received from the API
+    """
+    __slots__ = ('account', 'data', '_date', '_users', '_agreement')
+
+    def __init__(self, account, data):
+        # type: (EchosignAccount, dict) -> None
+        self.account = account
+        self.data = data
+        self._date = None
+        self._users = None
+        self._agreement = None
+
+    def __str__(self):
+        return 'Echosign Agreement: {}'.format(self.name if self.name is not None else self.echosign_id)
+
+    def __repr__(self):
+        return str(self)
+
+    def __getattr__(self, item):
+        # Only called for attributes the view doesn't provide itself
+        if item.startswith('__'):
+            raise AttributeError(item)
+        return getattr(self.to_agreement(), item)
+
+    @property
+    def echosign_id(self):
+        # type: () -> str
+        return self.data.get('agreementId')
+
+    @property
+    def name(self):
+        # type: () -> str
+        return self.data.get('name')
+
+    @property
+    def status(self):
+        # type: () -> str
+        """ The :class:`Agreement.Status <pyEchosign.classes.agreement.Agreement.Status>` of the agreement """
+        return self.data.get('status')
+
+    @property
+    def date(self):
+        """ The displayDate of the agreement, parsed on first access """
+        if self._date is None and self.data.get('displayDate') is not None:
+            self._date = arrow.get(self.data['displayDate'])
+        return self._date
+
+    @property
+    def users(self):
+        # type: () -> List[User]
+        """ The :class:`Users <pyEchosign.classes.users.User>` of the agreement, built on first access. Once the full
+        Agreement has been built, its users, which hold their signing URLs, are returned instead. """
+        if self._agreement is not None:
+            return self._agreement.users
+        if self._users is None:
+            self._users = User.json_to_users(self._user_data())
+        return self._users
+
+    @property
+    def emails(self):
+        # type: () -> List[str]
+        """ The email addresses of the agreement's users, read directly from the JSON without building Users """
+        return [user_data.get('email') for user_data in self._user_data()]
+
+    def _user_data(self):
+        # type: () -> List[dict]
+        """ The JSON of the agreement's users. Like :meth:`Agreement.json_to_agreement`, only the first user set is
+        read. """
+        user_sets = self.data.get('displayUserSetInfos') or [{}]
+        return user_sets[0].get('displayUserSetMemberInfos') or []
+
+    def to_agreement(self):
+        # type: () -> Agreement
+        """ The full :class:`Agreement <pyEchosign.classes.agreement.Agreement>` for this view, built on first use """
+        if self._agreement is None:
+            self._agreement = Agreement.json_to_agreement(self.account, self.data)
+        return self._agreement
@@ -0,0 +1,194 @@
+import hashlib
+import logging
+import mmap
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+log = logging.getLogger('pyEchosign.' + __name__)
+
+__all__ = ['BlobStore']
+
+
+class BlobStore(object):
+    """ A local, content-addressable store for downloaded files such as agreement PDFs and audit trails.
+
+    Files are stored once per SHA-256 digest of their content, so the same PDF downloaded for many agreements or
+    library documents only takes up disk space once. A download made through an account with a BlobStore is served
+    from disk (via mmap) when the same resource has been downloaded before, rather than requesting it again.
+
+    Resources are keyed by the URL and the :attr:`cache_identity
+    <pyEchosign.classes.account.EchosignAccount.cache_identity>` of the account which downloaded them, so one tenant
+    is never served another's files from the store, and refreshing an access token keeps the files stored with it.
+    Entries are not revalidated against Echosign, so files which may still change, such as those of agreements out for
+    signature, are only stored when ``ttl`` is set.
+
+    Args:
+        directory: The directory to keep the store in. Created if it does not exist.
+
+    Keyword Args:
+        max_bytes (int): The most disk space the stored files may use. The least recently read files are evicted once
+            it is exceeded. Defaults to None, for no limit.
+        ttl (float): Seconds after which a stored resource is downloaded again. Defaults to None, for no expiry, in
+            which case only files which can no longer change are stored.
+    """
+    def __init__(self, directory, max_bytes=None, ttl=None):
+        # type: (str, int, float) -> None
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self._objects = os.path.join(directory, 'objects')
+        if not os.path.isdir(self._objects):
+            os.makedirs(self._objects)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(directory, 'index.sqlite3'), check_same_thread=False)
+        with self._db:
+            self._db.execute('CREATE TABLE IF NOT EXISTS blobs '
+                             '(digest TEXT PRIMARY KEY, size INTEGER NOT NULL, last_read REAL NOT NULL)')
+            self._db.execute('CREATE TABLE IF NOT EXISTS resources '
+                             '(key TEXT PRIMARY KEY, digest TEXT NOT NULL, stored REAL NOT NULL)')
+
+    @staticmethod
+    def key(url, identity):
+        # type: (str, str) -> str
+        """ The key a resource is stored under, for the :attr:`cache_identity
+        <pyEchosign.classes.account.EchosignAccount.cache_identity>` of the account downloading it """
+        return hashlib.sha256('{}\n{}'.format(identity, url).encode('utf-8')).hexdigest()
+
+    @property
+    def size(self):
+        # type: () -> int
+        """ The number of bytes used by stored files """
+        with self._lock:
+            return self._db.execute('SELECT COALESCE(SUM(size), 0) FROM blobs').fetchone()[0]
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM blobs').fetchone()[0]
+
+    def path(self, digest):
+        # type: (str) -> str
+        return os.path.join(self._objects, digest[:2], digest[2:])
+
+    def lookup(self, key):
+        # type: (str) -> str
+        """ The digest of the file stored for a key, or None if it isn't stored or has expired """
+        with self._lock:
+            return self._lookup(key)
+
+    def _lookup(self, key):
+        """ Must be called with the lock held """
+        row = self._db.execute('SELECT digest, stored FROM resources WHERE key = ?', (key, )).fetchone()
+        if row is None:
+            return None
+        digest, stored = row
+        if self.ttl is not None and stored < time.time() - self.ttl:
+            return None
+        if not os.path.exists(self.path(digest)):
+            return None
+        with self._db:
+            self._db.execute('UPDATE blobs SET last_read = ? WHERE digest = ?', (time.time(), digest))
+        return digest
+
+    def open(self, digest):
+        """ A read-only memory map of a stored file. Empty files are returned as an empty bytes object. """
+        with open(self.path(digest), 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return b''
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def copy_to(self, key, file, chunk_size=64 * 1024):
+        # type: (str, object, int) -> int
+        """ Write the file stored for a key to a file-like object.
+
+        Returns: The number of bytes written, or None if nothing is stored for the key
+
+        """
+        # The file is opened with the lock held, so it can't be evicted in between
+        with self._lock:
+            digest = self._lookup(key)
+            if digest is None:
+                return None
+            mapped = self.open(digest)
+        try:
+            for offset in range(0, len(mapped), chunk_size):
+                file.write(mapped[offset:offset + chunk_size])
+            return len(mapped)
+        finally:
+            if not isinstance(mapped, bytes):
+                mapped.close()
+
+    def store_response(self, key, response, file=None, chunk_size=64 * 1024):
+        # type: (str, object, object, int) -> int
+        """ Store the body of a response requested with stream=True under a key, optionally also writing it to a file.
+
+        Returns: The number of bytes in the response
+
+        """
+        sha = hashlib.sha256()
+        size = 0
+        handle, temp_path = tempfile.mkstemp(dir=self._objects, suffix='.part')
+        try:
+            with os.fdopen(handle, 'wb') as temp:
+                try:
+                    for chunk in response.iter_content(chunk_size):
+                        if not chunk:
+                            continue
+                        sha.update(chunk)
+                        temp.write(chunk)
+                        if file is not None:
+                            file.write(chunk)
+                        size += len(chunk)
+                finally:
+                    response.close()
+            self._add(key, sha.hexdigest(), size, temp_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return size
+
+    def invalidate(self, key):
+        # type: (str) -> None
+        """ Forget the file stored for a key, so that the next download requests it again """
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM resources WHERE key = ?', (key, ))
+
+    def _add(self, key, digest, size, temp_path):
+        path = self.path(digest)
+        with self._lock:
+            if os.path.exists(path):
+                log.debug('Blob {} already stored, discarding duplicate download'.format(digest))
+            else:
+                if not os.path.isdir(os.path.dirname(path)):
+                    os.makedirs(os.path.dirname(path))
+                os.rename(temp_path, path)
+            now = time.time()
+            with self._db:
+                self._db.execute('INSERT OR REPLACE INTO blobs (digest, size, last_read) VALUES (?, ?, ?)',
+                                 (digest, size, now))
+                self._db.execute('INSERT OR REPLACE INTO resources (key, digest, stored) VALUES (?, ?, ?)',
+                                 (key, digest, now))
+            self._evict()
+
+    def _evict(self):
+        if self.max_bytes is None:
+            return
+        total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM blobs').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for digest, size in self._db.execute('SELECT digest, size FROM blobs ORDER BY last_read').fetchall():
+            if total <= self.max_bytes:
+                break
+            log.debug('Evicting blob {} from store'.format(digest))
+            with self._db:
+                self._db.execute('DELETE FROM resources WHERE digest = ?', (digest, ))
+                self._db.execute('DELETE FROM blobs WHERE digest = ?', (digest, ))
+            try:
+                os.remove(self.path(digest))
+            except OSError:
+                pass
+            total -= size
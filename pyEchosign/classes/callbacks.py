@@ -0,0 +1,221 @@
+import hmac
+import json
+import logging
+import threading
+from collections import namedtuple
+from typing import TYPE_CHECKING, Callable
+
+from six.moves.BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from six.moves.socketserver import ThreadingMixIn
+from six.moves.urllib.parse import parse_qs, urlencode, urlparse
+
+log = logging.getLogger('pyEchosign.' + __name__)
+
+if TYPE_CHECKING:
+    from .agreement import Agreement
+
+__all__ = ['CallbackReceiver', 'CallbackNotification']
+
+
+class CallbackNotification(namedtuple('CallbackNotification', ('agreement_id', 'status', 'event_type', 'data'))):
+    """ A status notification sent by Echosign to an agreement's callback URL.
+
+    Attributes:
+        agreement_id: The ID of the agreement, sent by Echosign as documentKey
+        status: The new status of the agreement, such as SIGNED
+        event_type: The event which caused the notification, such as ESIGNED, if provided
+        data: Every parameter that was received, as a dict
+    """
+    __slots__ = ()
+
+
+class CallbackReceiver(object):
+    """ Receives the status notifications Echosign sends to an agreement's callback URL, so that agreements don't need
+    to be polled for changes.
+
+    Notifications update the status of any :class:`Agreement <pyEchosign.classes.agreement.Agreement>` registered with
+    :meth:`track` and are dispatched to handlers registered with :meth:`add_handler`. The receiver can either run its
+    own lightweight HTTP server with :meth:`start`, or be embedded in an existing web application by passing the
+    request parameters of a callback to :meth:`handle`.
+
+    Keyword Args:
+        host (str): The interface to listen on when started. Defaults to 127.0.0.1.
+        port (int): The port to listen on when started. Defaults to 0, for any free port.
+        public_url (str): The URL Echosign should use to reach this receiver, if it differs from the local address,
+            such as when behind a proxy
+        token (str): A shared secret included in :attr:`callback_url`. Notifications without it are rejected.
+    """
+    def __init__(self, host='127.0.0.1', port=0, public_url=None, token=None):
+        # type: (str, int, str, str) -> None
+        self.host = host
+        self.port = port
+        self.public_url = public_url
+        self.token = token
+
+        self._agreements = {}
+        self._handlers = []
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def callback_url(self):
+        # type: () -> str
+        """ The URL to pass as callback_url to :meth:`Agreement.send <pyEchosign.classes.agreement.Agreement.send>` """
+        if self.public_url is not None:
+            url = self.public_url
+        else:
+            url = 'http://{}:{}/'.format(self.host, self.port)
+
+        if self.token is not None:
+            separator = '&' if '?' in url else '?'
+            url = url + separator + urlencode(dict(token=self.token))
+        return url
+
+    def track(self, agreement):
+        # type: (Agreement) -> None
+        """ Keep the status of an agreement up to date as notifications for it are received """
+        with self._lock:
+            self._agreements[agreement.echosign_id] = agreement
+
+    def untrack(self, agreement):
+        # type: (Agreement) -> None
+        with self._lock:
+            self._agreements.pop(agreement.echosign_id, None)
+
+    def add_handler(self, handler, status=None):
+        # type: (Callable[[CallbackNotification, Agreement], None], str) -> None
+        """ Register a function to be called for each notification.
+
+        Args:
+            handler: Called with the :class:`CallbackNotification <pyEchosign.classes.callbacks.CallbackNotification>`
+                and the tracked :class:`Agreement <pyEchosign.classes.agreement.Agreement>` it concerns, or None if
+                the agreement isn't tracked
+            status: (optional) Only call the handler for notifications with this
+                :class:`Agreement.Status <pyEchosign.classes.agreement.Agreement.Status>`
+        """
+        with self._lock:
+            self._handlers.append((status, handler))
+
+    def _valid_token(self, token):
+        # type: (str) -> bool
+        if token is None:
+            return False
+        # Compared in constant time, so the token can't be guessed from how long rejections take
+        return hmac.compare_digest(token.encode('utf-8'), self.token.encode('utf-8'))
+
+    def handle(self, params):
+        # type: (dict) -> CallbackNotification
+        """ Process the parameters of a callback request.
+
+        Args:
+            params: The query string or form parameters received. Values may be single strings or lists of strings,
+                as returned by ``parse_qs``.
+
+        Returns: The :class:`CallbackNotification <pyEchosign.classes.callbacks.CallbackNotification>` dispatched, or
+            None if the parameters weren't a valid notification
+
+        """
+        data = dict((key, value[0] if isinstance(value, list) else value) for key, value in params.items())
+
+        if self.token is not None and not self._valid_token(data.pop('token', None)):
+            log.warning('Rejected callback without a valid token')
+            return None
+
+        agreement_id = data.get('documentKey', data.get('agreementId'))
+        if agreement_id is None:
+            log.warning('Received callback without an agreement ID: {}'.format(data))
+            return None
+
+        notification = CallbackNotification(agreement_id, data.get('status'), data.get('eventType'), data)
+        log.debug('Received callback for agreement {} with status {}'.format(agreement_id, notification.status))
+
+        with self._lock:
+            agreement = self._agreements.get(agreement_id)
+            handlers = [handler for status, handler in self._handlers
+                        if status is None or status == notification.status]
+
+        if agreement is not None and notification.status is not None:
+            agreement.status = notification.status
+
+        for handler in handlers:
+            try:
+                handler(notification, agreement)
+            except Exception:
+                log.exception('Callback handler raised an exception')
+
+        return notification
+
+    def start(self):
+        """ Start listening for callbacks on a background thread """
+        receiver = self
+
+        class Handler(_CallbackRequestHandler):
+            callback_receiver = receiver
+
+        self._server = _ThreadingHTTPServer((self.host, self.port), Handler)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name='pyEchosign-callbacks')
+        self._thread.daemon = True
+        self._thread.start()
+        log.debug('Listening for Echosign callbacks on {}'.format(self.callback_url))
+
+    def stop(self):
+        """ Stop the server started by :meth:`start` """
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+            self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _CallbackRequestHandler(BaseHTTPRequestHandler):
+    callback_receiver = None  # type: CallbackReceiver
+
+    def do_GET(self):
+        self._respond(parse_qs(urlparse(self.path).query))
+
+    def do_POST(self):
+        params = parse_qs(urlparse(self.path).query)
+
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode('utf-8') if length else ''
+        if body:
+            if 'json' in (self.headers.get('Content-Type') or ''):
+                try:
+                    data = json.loads(body)
+                except ValueError:
+                    data = None
+                if not isinstance(data, dict):
+                    log.warning('Rejected callback with a JSON body which is not an object')
+                    self._send_status(400)
+                    return
+                params.update(data)
+            else:
+                params.update(parse_qs(body))
+
+        self._respond(params)
+
+    def _respond(self, params):
+        notification = self.callback_receiver.handle(params)
+        self._send_status(200 if notification is not None else 400)
+
+    def _send_status(self, status_code):
+        self.send_response(status_code)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        log.debug(format % args)
@@ -0,0 +1,185 @@
+import re
+import threading
+from bisect import bisect_left, bisect_right, insort
+from typing import TYPE_CHECKING, Iterable, List
+
+from pyEchosign.utils.lazy import arrow
+
+if TYPE_CHECKING:
+    from .agreement import Agreement
+
+__all__ = ['AgreementCollection']
+
+_TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+def _tokens(name):
+    # type: (str) -> set
+    return set(token.lower() for token in _TOKEN_PATTERN.findall(name or ''))
+
+
+def _timestamp(date):
+    if date is None:
+        return None
+    return arrow.get(date).float_timestamp
+
+
+class _IndexEntry(object):
+    """ The keys an agreement was indexed under, so they can be removed when it is refreshed """
+    __slots__ = ('agreement', 'status', 'emails', 'timestamp', 'tokens')
+
+    def __init__(self, agreement):
+        self.agreement = agreement
+        self.status = getattr(agreement, 'status', None)
+        self.emails = set(user.email.lower() for user in agreement.users if user.email)
+        self.timestamp = _timestamp(agreement.date)
+        self.tokens = _tokens(agreement.name)
+
+
+class AgreementCollection(object):
+    """ An in-memory collection of :class:`Agreements <pyEchosign.classes.agreement.Agreement>`, indexed for fast
+    lookups by status, participant email, date range and name.
+
+    Status and participant lookups are hash lookups, date ranges are binary searches of a sorted index and names are
+    searched by word prefix, so none of them scan every agreement. The indexes are updated as agreements are added,
+    refreshed or removed.
+
+    Args:
+        agreements: (optional) The agreements to start the collection with, such as the result of
+            :meth:`EchosignAccount.get_agreements <pyEchosign.classes.account.EchosignAccount.get_agreements>`
+    """
+    def __init__(self, agreements=None):
+        # type: (Iterable[Agreement]) -> None
+        self._entries = {}
+        self._by_status = {}
+        self._by_email = {}
+        self._dates = []  # sorted (timestamp, echosign_id)
+        self._by_token = {}
+        self._tokens = []  # sorted tokens, for prefix search
+        self._lock = threading.RLock()
+
+        if agreements is not None:
+            self.update(agreements)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter([entry.agreement for entry in list(self._entries.values())])
+
+    def __contains__(self, agreement):
+        echosign_id = getattr(agreement, 'echosign_id', agreement)
+        return echosign_id in self._entries
+
+    def get(self, echosign_id):
+        # type: (str) -> Agreement
+        """ The agreement with an ID, or None if it isn't in the collection """
+        entry = self._entries.get(echosign_id)
+        return entry.agreement if entry is not None else None
+
+    def add(self, agreement):
+        # type: (Agreement) -> None
+        """ Add an agreement to the collection. If an agreement with the same ID is already present it is replaced,
+        and the indexes are updated to match its current status, users, date and name. """
+        with self._lock:
+            self._remove(agreement.echosign_id)
+            self._index(_IndexEntry(agreement))
+
+    # Re-indexing an agreement after its attributes change is the same operation as adding it again
+    refresh = add
+
+    def update(self, agreements):
+        # type: (Iterable[Agreement]) -> None
+        """ Add or refresh several agreements """
+        with self._lock:
+            for agreement in agreements:
+                self.add(agreement)
+
+    def remove(self, agreement):
+        # type: (Agreement) -> None
+        with self._lock:
+            self._remove(getattr(agreement, 'echosign_id', agreement))
+
+    def by_status(self, status):
+        # type: (str) -> List[Agreement]
+        """ The agreements with an :class:`Agreement.Status <pyEchosign.classes.agreement.Agreement.Status>` """
+        return self._agreements(self._by_status.get(status, ()))
+
+    def by_participant(self, email):
+        # type: (str) -> List[Agreement]
+        """ The agreements a participant (matched by email, case-insensitively) is a user of """
+        return self._agreements(self._by_email.get(email.lower(), ()))
+
+    def between(self, start=None, end=None):
+        # type: (object, object) -> List[Agreement]
+        """ The agreements dated within a range, oldest first. Agreements without a date are excluded.
+
+        Args:
+            start: (optional) The earliest date, inclusive. Accepts anything arrow can parse, such as a datetime.
+            end: (optional) The latest date, inclusive
+        """
+        with self._lock:
+            low = 0 if start is None else bisect_left(self._dates, (_timestamp(start), ''))
+            high = len(self._dates) if end is None else bisect_right(self._dates, (_timestamp(end), u'\uffff'))
+            return [self._entries[echosign_id].agreement for _, echosign_id in self._dates[low:high]]
+
+    def search(self, text):
+        # type: (str) -> List[Agreement]
+        """ The agreements whose name contains a word starting with each word of text, case-insensitively. For
+        example, "mast serv" matches "Master Services Agreement". """
+        with self._lock:
+            matches = None
+            for prefix in _tokens(text):
+                ids = set()
+                position = bisect_left(self._tokens, prefix)
+                while position < len(self._tokens) and self._tokens[position].startswith(prefix):
+                    ids.update(self._by_token[self._tokens[position]])
+                    position += 1
+                matches = ids if matches is None else matches & ids
+            return self._agreements(matches or ())
+
+    def _agreements(self, ids):
+        with self._lock:
+            return [self._entries[echosign_id].agreement for echosign_id in ids]
+
+    def _index(self, entry):
+        echosign_id = entry.agreement.echosign_id
+        self._entries[echosign_id] = entry
+        self._by_status.setdefault(entry.status, set()).add(echosign_id)
+        for email in entry.emails:
+            self._by_email.setdefault(email, set()).add(echosign_id)
+        if entry.timestamp is not None:
+            insort(self._dates, (entry.timestamp, echosign_id))
+        for token in entry.tokens:
+            if token not in self._by_token:
+                self._by_token[token] = set()
+                insort(self._tokens, token)
+            self._by_token[token].add(echosign_id)
+
+    def _remove(self, echosign_id):
+        entry = self._entries.pop(echosign_id, None)
+        if entry is None:
+            return
+
+        self._discard(self._by_status, entry.status, echosign_id)
+        for email in entry.emails:
+            self._discard(self._by_email, email, echosign_id)
+        if entry.timestamp is not None:
+            position = bisect_left(self._dates, (entry.timestamp, echosign_id))
+            del self._dates[position]
+        for token in entry.tokens:
+            if self._discard(self._by_token, token, echosign_id):
+                del self._tokens[bisect_left(self._tokens, token)]
+
+    @staticmethod
+    def _discard(index, key, echosign_id):
+        # type: (dict, object, str) -> bool
+        """ Removes an ID from an index, returning True if the key no longer has any IDs """
+        ids = index.get(key)
+        if ids is None:
+            return False
+        ids.discard(echosign_id)
+        if not ids:
+            del index[key]
+            return True
+        return False
@@ -1,19 +1,36 @@
 import logging
+import threading
 from io import IOBase, FileIO, BytesIO
 from typing import TYPE_CHECKING, Union
 
-import arrow
-import requests
-
-from pyEchosign.exceptions.internal import ApiError
+from pyEchosign.classes import tracing
+from pyEchosign.classes.resilience import Deadline
+from pyEchosign.classes.scheduler import RequestScheduler
+from pyEchosign.exceptions.internal import ApiError, DeadlineExceeded, MissingAgreement
+from pyEchosign.utils.download import download
 from pyEchosign.utils.handle_response import check_error, response_success
+from pyEchosign.utils.lazy import arrow
 from pyEchosign.utils.request_parameters import get_headers
 
 log = logging.getLogger('pyEchosign.' + __name__)
 if TYPE_CHECKING:
     from .account import EchosignAccount
+    from .agreement import Agreement
+
+__all__ = ['TransientDocument', 'PendingDocument']
+
+_executor = None
+_executor_lock = threading.Lock()
 
-__all__ = ['TransientDocument']
+
+def _upload_executor():
+    """ The thread pool deferred uploads run in when no executor is given, created on first use """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            _executor = ThreadPoolExecutor(max_workers=TransientDocument.UPLOAD_WORKERS)
+        return _executor
 
 
 class TransientDocument(object):
@@ -37,6 +54,9 @@ class TransientDocument(object):
         expiration_date: The date Echosign will delete this document
             (not provided by Echosign, calculated for convenience)
     """
+    # How many deferred uploads run at once in the shared thread pool
+    UPLOAD_WORKERS = 4
+
     def __init__(self, account, file_name, file, mime_type=None):
         # type: (EchosignAccount, str, Union[IOBase, FileIO, BytesIO], str) -> None
         self.file_name = file_name
@@ -56,30 +76,113 @@ class TransientDocument(object):
             file_tuple = file_tuple + (mime_type, )
 
         files = dict(File=file_tuple)
-        r = requests.post(url, headers=get_headers(account.access_token, content_type=None), files=files)
-
-        if response_success(r):
-            log.debug('Request to create document {} successful.'.format(self.file_name))
-            response_data = r.json()
-            self.document_id = response_data.get('transientDocumentId', None)
-            # If there was no document ID, something went wrong
-            if self.document_id is None:
-                log.error('Did not receive a transientDocumentId from Echosign. Received: {}'.format(r.content))
-                raise ApiError('Did not receive a Transient Document ID from Echosign')
+        with tracing.trace('TransientDocument.upload', file_name=file_name) as span:
+            r = account.request('post', url, headers=get_headers(account.access_token, content_type=None),
+                                files=files)
+
+            if response_success(r):
+                log.debug('Request to create document {} successful.'.format(self.file_name))
+                response_data = r.json()
+                self.document_id = response_data.get('transientDocumentId', None)
+                span.set_attribute('document_id', self.document_id)
+                # If there was no document ID, something went wrong
+                if self.document_id is None:
+                    log.error('Did not receive a transientDocumentId from Echosign. Received: {}'.format(r.content))
+                    raise ApiError('Did not receive a Transient Document ID from Echosign')
+                else:
+                    today = arrow.now()
+                    # Document will expire in 7 days from creation
+                    self.expiration_date = today.shift(days=+7).datetime
             else:
-                today = arrow.now()
-                # Document will expire in 7 days from creation
-                self.expiration_date = today.shift(days=+7).datetime
-        else:
-            try:
-                log.error('Error encountered creating document {}. Received message: {}'.
-                          format(self.file_name, r.content))
-            finally:
-                check_error(r)
+                try:
+                    log.error('Error encountered creating document {}. Received message: {}'.
+                              format(self.file_name, r.content))
+                finally:
+                    check_error(r)
 
     def __str__(self):
         return self.file_name
 
+    @classmethod
+    def upload_async(cls, account, file_name, file, mime_type=None, executor=None):
+        # type: (EchosignAccount, str, Union[IOBase, FileIO, BytesIO], str, object) -> PendingDocument
+        """ Start uploading a TransientDocument in the background, returning a :class:`PendingDocument` at once.
+
+        Pending documents can be placed in :attr:`Agreement.files <pyEchosign.classes.agreement.Agreement>` straight
+        away. :meth:`Agreement.send <pyEchosign.classes.agreement.Agreement.send>` waits only for uploads which have
+        not finished yet, so the files of an agreement upload in parallel with each other and with the rest of the
+        send.
+
+        Args:
+            account: The :class:`EchosignAccount <pyEchosign.classes.account.EchosignAccount>`
+                to be associated with this document
+            file_name (str): The name of the file
+            file: The actual file object to upload to Echosign, accepts a stream of bytes.
+            mime_type: (optional) The MIME type of the file
+            executor: (optional) A ``concurrent.futures`` executor to upload in. Defaults to a thread pool shared by
+                all deferred uploads, of :attr:`UPLOAD_WORKERS` threads.
+        """
+        if executor is None:
+            executor = _upload_executor()
+        upload = tracing.bind(Deadline.bind(RequestScheduler.bind(lambda: cls(account, file_name, file, mime_type))))
+        return PendingDocument(executor.submit(upload), file_name)
+
+
+class PendingDocument(object):
+    """ A :class:`TransientDocument` being uploaded in the background, returned by
+    :meth:`TransientDocument.upload_async`. It can be used in place of the TransientDocument: reading its
+    document_id waits for the upload to finish.
+
+    Attributes:
+        file_name: The name of the file being uploaded
+    """
+    def __init__(self, future, file_name):
+        # type: (object, str) -> None
+        self.future = future
+        self.file_name = file_name
+
+    def __str__(self):
+        return self.file_name
+
+    def done(self):
+        # type: () -> bool
+        """ Whether the upload has finished, successfully or not """
+        return self.future.done()
+
+    def result(self, timeout=None):
+        # type: (float) -> TransientDocument
+        """ Wait for the upload to finish and return the TransientDocument, re-raising any error it failed with.
+
+        Args:
+            timeout: (optional) The most seconds to wait. Raises concurrent.futures.TimeoutError if exceeded.
+
+        Raises:
+            DeadlineExceeded: If called within a :class:`Deadline <pyEchosign.classes.resilience.Deadline>` which
+                passes before the upload finishes
+        """
+        deadline = Deadline.current()
+        if deadline is None or (timeout is not None and timeout < deadline.remaining):
+            return self.future.result(timeout)
+
+        from concurrent.futures import TimeoutError
+        try:
+            return self.future.result(max(deadline.remaining, 0))
+        except TimeoutError:
+            # The upload itself may have failed with a TimeoutError, which is re-raised as it is
+            if self.future.done():
+                raise
+            raise DeadlineExceeded()
+
+    @property
+    def document_id(self):
+        # type: () -> str
+        """ The ID provided by Echosign, waiting for the upload to finish if needed """
+        return self.result().document_id
+
+    @property
+    def expiration_date(self):
+        return self.result().expiration_date
+
 
 class AgreementDocument(object):
     """ Represents a document used in an Agreement.
@@ -91,10 +194,14 @@ class AgreementDocument(object):
             page_count: The number of pages in the document
             supporting_document: Whether or not this document is a "supporting document" as specified by the API
             field_name: If a supporting document, what the name is of the supporting document field
+            agreement: The :class:`Agreement <pyEchosign.classes.agreement.Agreement>` this document belongs to, used
+                to download it
 
     """
-    def __init__(self, echosign_id, mime_type, name, page_count, supporting_document=False, field_name=None):
-        # type: (str, str, str, int, bool, str) -> None
+    def __init__(self, echosign_id, mime_type, name, page_count, supporting_document=False, field_name=None,
+                 agreement=None):
+        # type: (str, str, str, int, bool, str, Agreement) -> None
+        self.agreement = agreement
         self.echosign_id = echosign_id
         self.mime_type = mime_type
         self.name = name
@@ -109,3 +216,46 @@ class AgreementDocument(object):
     def __repr__(self):
         return 'AgreementDocument: {}'.format(self.name)
 
+    @property
+    def file_name(self):
+        # type: () -> str
+        """ The name of the document, safe to use as a file name """
+        name = self.name
+        # Names such as '..' would refer to a directory rather than a file
+        if not name or not name.strip('. '):
+            name = self.echosign_id
+        return name.replace('/', '_').replace('\\', '_')
+
+    @property
+    def file(self):
+        # type: () -> BytesIO
+        """ The file of this document """
+        file = BytesIO()
+        self.download(file)
+        file.seek(0)
+
+        return file
+
+    def download(self, file):
+        # type: (IOBase) -> int
+        """ Writes the file of this document to a file-like object as it is received, without holding it all in
+        memory.
+
+        Args:
+            file: A file-like object opened for writing bytes
+
+        Returns: The number of bytes written
+
+        Raises:
+            MissingAgreement: If this document isn't associated with an agreement
+        """
+        if self.agreement is None:
+            raise MissingAgreement('An agreement must be tied to this AgreementDocument in order to download it')
+
+        account = self.agreement.account
+        endpoint = '{}agreements/{}/documents/{}'.format(account.api_access_point, self.agreement.echosign_id,
+                                                         self.echosign_id)
+        with tracing.trace('AgreementDocument.download', agreement_id=self.agreement.echosign_id,
+                           document_id=self.echosign_id):
+            return download(account, endpoint, file, final=self.agreement._final)
+
@@ -0,0 +1,202 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Callable
+
+from pyEchosign.classes.agreement import Agreement
+from pyEchosign.classes.scheduler import RequestScheduler
+from pyEchosign.utils.utils import replace_file
+
+log = logging.getLogger('pyEchosign.' + __name__)
+
+if TYPE_CHECKING:
+    from .account import EchosignAccount
+
+__all__ = ['AgreementExporter', 'ExportProgress']
+
+
+class ExportProgress(object):
+    """ Throughput of an :class:`AgreementExporter <pyEchosign.classes.exporter.AgreementExporter>` run.
+
+    Attributes:
+        total: The number of agreements to archive in this run, excluding those already checkpointed
+        skipped: The number of agreements skipped because a previous run archived them
+        completed: The number of agreements archived so far in this run
+        failed: A dict of agreement ID to the exception raised while archiving it. These are not checkpointed,
+            so they will be retried on the next run.
+        bytes_written: The number of bytes written so far in this run
+        started: The time.time() at which the run started
+    """
+    def __init__(self, total, skipped):
+        # type: (int, int) -> None
+        self.total = total
+        self.skipped = skipped
+        self.completed = 0
+        self.failed = {}
+        self.bytes_written = 0
+        self.started = time.time()
+
+    def __str__(self):
+        eta = self.eta
+        return 'Exported {}/{} agreements ({} failed), {:.2f} agreements/s, {:.0f} KB/s, ETA {}'.format(
+            self.completed, self.total, len(self.failed), self.rate, self.bytes_per_second / 1024.0,
+            '{:.0f}s'.format(eta) if eta is not None else 'unknown')
+
+    @property
+    def elapsed(self):
+        # type: () -> float
+        return time.time() - self.started
+
+    @property
+    def rate(self):
+        # type: () -> float
+        """ Agreements archived per second """
+        elapsed = self.elapsed
+        return self.completed / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def bytes_per_second(self):
+        # type: () -> float
+        elapsed = self.elapsed
+        return self.bytes_written / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def remaining(self):
+        # type: () -> int
+        return self.total - self.completed - len(self.failed)
+
+    @property
+    def eta(self):
+        # type: () -> float
+        """ The estimated number of seconds until the run finishes, or None if nothing has finished yet """
+        rate = self.rate
+        if rate == 0:
+            return None if self.remaining else 0.0
+        return self.remaining / rate
+
+
+class AgreementExporter(object):
+    """ Archives the combined document, audit trail and form data of every agreement in an account to a directory.
+
+    Downloads are made in parallel and streamed to disk. Each archived agreement is recorded in a checkpoint file, so
+    a run which is interrupted can simply be started again and will pick up where it stopped. Files for an agreement
+    are written to ``<directory>/<agreement ID>/``.
+
+    Args:
+        account: The :class:`EchosignAccount <pyEchosign.classes.account.EchosignAccount>` to export agreements from
+        directory: The directory to write the archive to
+
+    Keyword Args:
+        workers (int): How many agreements are downloaded at once. Defaults to 4.
+        checkpoint (str): The path of the checkpoint file. Defaults to ``.checkpoint`` within ``directory``.
+        statuses (tuple): Only agreements with one of these :class:`Agreement.Status
+            <pyEchosign.classes.agreement.Agreement.Status>` are exported. Defaults to SIGNED agreements only,
+            None to export every agreement.
+        query (str): A search query used to filter agreements, as in :meth:`EchosignAccount.get_agreements
+            <pyEchosign.classes.account.EchosignAccount.get_agreements>`
+    """
+    COMBINED_DOCUMENT = 'combined_document.pdf'
+    AUDIT_TRAIL = 'audit_trail.pdf'
+    FORM_DATA = 'form_data.csv'
+
+    def __init__(self, account, directory, workers=4, checkpoint=None, statuses=(Agreement.Status.SIGNED, ),
+                 query=None):
+        # type: (EchosignAccount, str, int, str, tuple, str) -> None
+        self.account = account
+        self.directory = directory
+        self.workers = workers
+        self.checkpoint = checkpoint if checkpoint is not None else os.path.join(directory, '.checkpoint')
+        self.statuses = statuses
+        self.query = query
+
+        self._checkpoint_lock = threading.Lock()
+
+    def exported_ids(self):
+        # type: () -> set
+        """ The IDs of agreements which have already been archived, according to the checkpoint file """
+        if not os.path.exists(self.checkpoint):
+            return set()
+        with open(self.checkpoint) as checkpoint:
+            return set(line.strip() for line in checkpoint if line.strip())
+
+    def pending_agreements(self):
+        """ The agreements which still need to be archived """
+        exported = self.exported_ids()
+        agreements = self.account.get_agreements(self.query)
+        if self.statuses is not None:
+            agreements = [agreement for agreement in agreements
+                          if getattr(agreement, 'status', None) in self.statuses]
+        pending = [agreement for agreement in agreements if agreement.echosign_id not in exported]
+        return pending, len(agreements) - len(pending)
+
+    def run(self, progress_callback=None):
+        # type: (Callable[[ExportProgress], None]) -> ExportProgress
+        """ Archive every pending agreement.
+
+        Args:
+            progress_callback: (optional) Called with an :class:`ExportProgress
+                <pyEchosign.classes.exporter.ExportProgress>` every time an agreement finishes or fails
+
+        Returns: The :class:`ExportProgress <pyEchosign.classes.exporter.ExportProgress>` of the completed run
+
+        """
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+        # Archiving is batch work, so it yields to interactive requests on an account with a RequestScheduler
+        with RequestScheduler.priority(RequestScheduler.BATCH):
+            agreements, skipped = self.pending_agreements()
+            export_agreement = RequestScheduler.bind(self.export_agreement)
+        progress = ExportProgress(len(agreements), skipped)
+        log.info('Exporting {} agreements, {} already exported'.format(progress.total, skipped))
+
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            futures = dict((executor.submit(export_agreement, agreement), agreement) for agreement in agreements)
+            for future in as_completed(futures):
+                agreement = futures[future]
+                try:
+                    progress.bytes_written += future.result()
+                except Exception as e:
+                    log.error('Failed to export agreement {}: {}'.format(agreement.echosign_id, e))
+                    progress.failed[agreement.echosign_id] = e
+                else:
+                    progress.completed += 1
+                    self._mark_exported(agreement.echosign_id)
+
+                log.info(str(progress))
+                if progress_callback is not None:
+                    progress_callback(progress)
+        finally:
+            executor.shutdown(wait=True)
+
+        return progress
+
+    def export_agreement(self, agreement):
+        # type: (Agreement) -> int
+        """ Archive a single agreement, regardless of the checkpoint. Returns the number of bytes written. """
+        agreement_directory = os.path.join(self.directory, agreement.echosign_id)
+        if not os.path.isdir(agreement_directory):
+            os.makedirs(agreement_directory)
+
+        written = 0
+        for file_name, download in ((self.COMBINED_DOCUMENT, agreement.download_combined_document),
+                                    (self.AUDIT_TRAIL, agreement.download_audit_trail_file),
+                                    (self.FORM_DATA, agreement.download_form_data)):
+            path = os.path.join(agreement_directory, file_name)
+            # Write to a temporary file first, so that an interrupted download never looks complete
+            partial_path = path + '.part'
+            with open(partial_path, 'wb') as file:
+                written += download(file)
+            replace_file(partial_path, path)
+
+        return written
+
+    def _mark_exported(self, echosign_id):
+        with self._checkpoint_lock:
+            with open(self.checkpoint, 'a') as checkpoint:
+                checkpoint.write(echosign_id + '\n')
+                checkpoint.flush()
+                os.fsync(checkpoint.fileno())
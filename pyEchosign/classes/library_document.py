@@ -1,11 +1,12 @@
 from typing import TYPE_CHECKING
 
-import arrow
-import requests
 from io import BytesIO
 
+from pyEchosign.utils.cache import cached
 from pyEchosign.utils.request_parameters import get_headers
 from pyEchosign.utils.handle_response import check_error
+from pyEchosign.utils.download import download
+from pyEchosign.utils.lazy import arrow
 
 if TYPE_CHECKING:
     from .account import EchosignAccount
@@ -90,28 +91,51 @@ class LibraryDocument(object):
         """ The PDF file of the audit for this Library Document."""
         endpoint = '{}libraryDocuments/{}/auditTrail'.format(self.account.api_access_point, self.echosign_id)
 
-        response = requests.get(endpoint, headers=get_headers(self.account.access_token))
-        check_error(response)
+        file = BytesIO()
+        download(self.account, endpoint, file)
+        file.seek(0)
 
-        return BytesIO(response.content)
+        return file
 
     def retrieve_complete_document(self):
         """ Retrieves the remaining data for the LibraryDocument, such as locale, status, and security options. """
         url = self.account.api_access_point + 'libraryDocuments/{}'.format(self.echosign_id)
-        headers = get_headers(self.account.access_token)
-        r = requests.get(url, headers=headers)
 
-        check_error(r)
+        def fetch():
+            r = self.account.request('get', url, headers=get_headers(self.account.access_token))
+            check_error(r)
+            return r.json()
 
-        response_data = r.json()
+        response_data = cached(self.account, url, fetch)
         self._locale = response_data.get('locale')
         self._status = response_data.get('status')
         self._security_options = response_data.get('securityOptions')
         self.fully_retrieved = True
 
+    def send(self, recipients, agreement_name=None, **kwargs):
+        """ Sends this LibraryDocument for signature as a new agreement. The document is already stored by Echosign,
+        so unlike sending :class:`TransientDocuments <pyEchosign.classes.documents.TransientDocument>` nothing is
+        uploaded.
+
+        Args:
+            recipients: A list of :class:`Users <pyEchosign.classes.users.User>`.
+                The order which they are provided in the list determines the order in which they sign.
+            agreement_name: (optional) The name of the agreement. Defaults to the name of the LibraryDocument.
+            **kwargs: Any other arguments of :meth:`Agreement.send <pyEchosign.classes.agreement.Agreement.send>`,
+                such as ccs, message or merge_fields
+
+        Returns: The response of :meth:`Agreement.send <pyEchosign.classes.agreement.Agreement.send>`, including the
+            agreement_id of the new agreement
+
+        """
+        from .agreement import Agreement
+
+        agreement = Agreement(self.account, name=agreement_name or self.name, files=[self])
+        return agreement.send(recipients, **kwargs)
+
     def delete(self):
         """ Deletes the LibraryDocument from Echosign. It will not be visible on the Manage page. """
         url = self.account.api_access_point + 'libraryDocuments/{}'.format(self.echosign_id)
         headers = get_headers(self.account.access_token)
-        r = requests.delete(url, headers=headers)
+        r = self.account.request('delete', url, headers=headers)
         check_error(r)
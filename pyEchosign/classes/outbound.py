@@ -0,0 +1,452 @@
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from typing import TYPE_CHECKING, List
+
+from pyEchosign.classes.library_document import LibraryDocument
+from pyEchosign.classes.scheduler import RequestScheduler
+from pyEchosign.exceptions.echosign import AccessTokenError, PermissionDenied, ProcessingError
+from pyEchosign.exceptions.internal import ApiError, MissingAgreement
+from pyEchosign.utils.handle_response import check_error
+
+log = logging.getLogger('pyEchosign.' + __name__)
+
+if TYPE_CHECKING:
+    from .account import EchosignAccount
+    from .agreement import Agreement
+    from .users import User
+
+__all__ = ['OutboundQueue', 'QueuedOperation']
+
+# Errors which will not go away by trying again
+_PERMANENT_ERRORS = (AccessTokenError, PermissionDenied, ProcessingError, MissingAgreement)
+# Client error status codes which may succeed when tried again
+_RETRYABLE_STATUS_CODES = (408, 429)
+
+
+def _permanent(error):
+    # type: (Exception) -> bool
+    """ Whether an error will not go away by trying the operation again """
+    if isinstance(error, ApiError) and error.status_code is not None:
+        return 400 <= error.status_code < 500 and error.status_code not in _RETRYABLE_STATUS_CODES
+    return isinstance(error, _PERMANENT_ERRORS)
+
+
+class QueuedOperation(object):
+    """ A handle to an operation accepted by an :class:`OutboundQueue`.
+
+    Attributes:
+        id: The ID of the operation within its queue
+        kind: The kind of operation, 'upload', 'send', 'cancel', 'delete' or 'send_reminder'
+    """
+    PENDING = 'PENDING'
+    RUNNING = 'RUNNING'
+    DONE = 'DONE'
+    FAILED = 'FAILED'
+
+    def __init__(self, queue, operation_id, kind):
+        # type: (OutboundQueue, str, str) -> None
+        self.queue = queue
+        self.id = operation_id
+        self.kind = kind
+
+    def __repr__(self):
+        return 'QueuedOperation: {} {}'.format(self.kind, self.id)
+
+    @property
+    def status(self):
+        # type: () -> str
+        """ PENDING, RUNNING, DONE or FAILED """
+        return self.queue._row(self.id)['status']
+
+    @property
+    def result(self):
+        # type: () -> dict
+        """ What the operation returned once DONE, such as the document_id of an upload or the agreement_id of a
+        send """
+        return self.queue._row(self.id)['result']
+
+    @property
+    def error(self):
+        # type: () -> str
+        """ The last error the operation failed with, if any """
+        return self.queue._row(self.id)['error']
+
+    def wait(self, timeout=None):
+        # type: (float) -> bool
+        """ Block until the operation is DONE or FAILED. Returns False if timeout passed first. """
+        return self.queue._wait(self.id, timeout)
+
+
+class OutboundQueue(object):
+    """ A persistent local queue of changes to make in Echosign - uploads, sends, cancellations, deletions and
+    reminders. Operations are accepted immediately and written to disk, then made by background workers, so callers
+    don't wait on the Echosign API and queued operations survive the process exiting or crashing.
+
+    Operations which fail are retried with exponential backoff, except for errors retrying won't fix (such as a
+    PermissionDenied or another 4xx response). Each operation has an idempotency key: enqueuing an operation with the
+    key of one already in the queue returns the existing operation rather than adding another, unless that operation
+    FAILED. Sends are keyed by their external_id (one is generated if not provided), and when a send is retried after
+    an attempt that may have reached Echosign, agreements with its external_id are looked for first so it isn't sent
+    twice.
+
+    Only one process should use a queue directory at a time.
+
+    Example::
+
+        with OutboundQueue(account, '/var/lib/myapp/echosign-queue') as queue:
+            upload = queue.upload('contract.pdf', open('contract.pdf', 'rb'))
+            agreement = Agreement(account, name='Contract')
+            agreement.files = [upload]
+            send = queue.send(agreement, recipients, external_id='order-1234')
+
+    Args:
+        account: The :class:`EchosignAccount <pyEchosign.classes.account.EchosignAccount>` operations are made with
+        directory: The directory to keep the queue in. Created if it does not exist.
+
+    Keyword Args:
+        workers (int): How many operations are made at once. Defaults to 2.
+        max_attempts (int): How many times an operation is tried before it is marked FAILED. Defaults to 5.
+        retry_delay (float): Seconds to wait before the first retry, doubled for each retry after. Defaults to 5.
+    """
+    def __init__(self, account, directory, workers=2, max_attempts=5, retry_delay=5.0):
+        # type: (EchosignAccount, str, int, int, float) -> None
+        self.account = account
+        self.directory = directory
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+        self._files = os.path.join(directory, 'files')
+        if not os.path.isdir(self._files):
+            os.makedirs(self._files)
+
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._threads = []
+        self._stopping = False
+
+        self._db = sqlite3.connect(os.path.join(directory, 'queue.sqlite3'), check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        with self._db:
+            self._db.execute('CREATE TABLE IF NOT EXISTS operations '
+                             '(seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT UNIQUE NOT NULL, '
+                             'key TEXT UNIQUE NOT NULL, kind TEXT NOT NULL, payload TEXT NOT NULL, '
+                             'depends_on TEXT NOT NULL, status TEXT NOT NULL, attempts INTEGER NOT NULL, '
+                             'next_attempt REAL NOT NULL, result TEXT, error TEXT)')
+            # Operations left RUNNING were interrupted by the process exiting, so are tried again
+            self._db.execute('UPDATE operations SET status = ? WHERE status = ?',
+                             (QueuedOperation.PENDING, QueuedOperation.RUNNING))
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def __len__(self):
+        """ The number of operations not yet DONE or FAILED """
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM operations WHERE status IN (?, ?)',
+                                    (QueuedOperation.PENDING, QueuedOperation.RUNNING)).fetchone()[0]
+
+    def start(self):
+        """ Start the background workers """
+        with self._lock:
+            self._stopping = False
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, name='OutboundQueue worker')
+                thread.daemon = True
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, wait=True):
+        # type: (bool) -> None
+        """ Stop the background workers once they finish their current operation. Pending operations stay queued
+        until the queue is started again. """
+        with self._changed:
+            self._stopping = True
+            self._changed.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+        self._threads = []
+
+    def operations(self, status=None):
+        # type: (str) -> List[QueuedOperation]
+        """ The operations in the queue in the order they were added, optionally only those with a status """
+        with self._lock:
+            if status is None:
+                rows = self._db.execute('SELECT id, kind FROM operations ORDER BY seq').fetchall()
+            else:
+                rows = self._db.execute('SELECT id, kind FROM operations WHERE status = ? ORDER BY seq',
+                                        (status, )).fetchall()
+        return [QueuedOperation(self, operation_id, kind) for operation_id, kind in rows]
+
+    def upload(self, file_name, file, mime_type=None, key=None):
+        # type: (str, object, str, str) -> QueuedOperation
+        """ Queue the upload of a :class:`TransientDocument <pyEchosign.classes.documents.TransientDocument>`. The
+        file is copied into the queue directory before returning.
+
+        The returned operation can be placed in the files of an Agreement passed to :meth:`send`, which then waits for
+        the upload to finish.
+
+        Args:
+            file_name: The name of the file
+            file: A file-like object to read the bytes to upload from
+            mime_type: (optional) The MIME type of the file
+            key: (optional) An idempotency key for the upload
+        """
+        operation_id = uuid.uuid4().hex
+        path = os.path.join(self._files, operation_id)
+        with open(path, 'wb') as stored:
+            shutil.copyfileobj(file, stored)
+            stored.flush()
+            os.fsync(stored.fileno())
+
+        payload = dict(file_name=file_name, mime_type=mime_type)
+        operation = self._enqueue('upload', payload, key, operation_id=operation_id)
+        if operation.id != operation_id:
+            # The upload was already queued
+            os.remove(path)
+        return operation
+
+    def send(self, agreement, recipients, agreement_name=None, ccs=None, days_until_signing_deadline=0,
+             external_id=None, signature_flow='SEQUENTIAL', message='', merge_fields=None, callback_url=None):
+        # type: (Agreement, List[User], str, list, int, str, str, str, list, str) -> QueuedOperation
+        """ Queue :meth:`Agreement.send <pyEchosign.classes.agreement.Agreement.send>`. Takes the same arguments.
+
+        The agreement's files may be TransientDocuments, LibraryDocuments or upload operations returned by
+        :meth:`upload`. The send's result is a dict of the agreement_id, embedded_code, expiration and url returned
+        by Echosign.
+
+        Args:
+            external_id: (optional) Used as the idempotency key of the send. Generated if not provided.
+        """
+        if external_id is None:
+            external_id = uuid.uuid4().hex
+
+        files = []
+        depends_on = []
+        for file in agreement.files:
+            if isinstance(file, QueuedOperation):
+                files.append(dict(operation=file.id))
+                depends_on.append(file.id)
+            elif isinstance(file, LibraryDocument):
+                files.append(dict(library_document_id=file.echosign_id))
+            else:
+                files.append(dict(document_id=file.document_id))
+
+        payload = dict(name=agreement.name, files=files, recipients=[recipient.email for recipient in recipients],
+                       agreement_name=agreement_name, ccs=ccs, days_until_signing_deadline=days_until_signing_deadline,
+                       external_id=external_id, signature_flow=signature_flow, message=message,
+                       merge_fields=merge_fields, callback_url=callback_url)
+        return self._enqueue('send', payload, 'send:' + external_id, depends_on)
+
+    def cancel(self, agreement):
+        # type: (Agreement) -> QueuedOperation
+        """ Queue :meth:`Agreement.cancel <pyEchosign.classes.agreement.Agreement.cancel>` """
+        return self._enqueue('cancel', dict(echosign_id=agreement.echosign_id), 'cancel:' + agreement.echosign_id)
+
+    def delete(self, agreement):
+        # type: (Agreement) -> QueuedOperation
+        """ Queue :meth:`Agreement.delete <pyEchosign.classes.agreement.Agreement.delete>` """
+        return self._enqueue('delete', dict(echosign_id=agreement.echosign_id), 'delete:' + agreement.echosign_id)
+
+    def send_reminder(self, agreement, comment='', key=None):
+        # type: (Agreement, str, str) -> QueuedOperation
+        """ Queue :meth:`Agreement.send_reminder <pyEchosign.classes.agreement.Agreement.send_reminder>`
+
+        Args:
+            key: (optional) An idempotency key for the reminder. Without one every reminder queued is sent.
+        """
+        payload = dict(echosign_id=agreement.echosign_id, comment=comment)
+        return self._enqueue('send_reminder', payload, key)
+
+    def _enqueue(self, kind, payload, key=None, depends_on=(), operation_id=None):
+        operation_id = operation_id or uuid.uuid4().hex
+        if key is None:
+            key = operation_id
+
+        with self._changed:
+            row = self._db.execute('SELECT id, kind, status FROM operations WHERE key = ?', (key, )).fetchone()
+            if row is not None and row[2] != QueuedOperation.FAILED:
+                log.debug('Operation {} is already queued'.format(key))
+                return QueuedOperation(self, row[0], row[1])
+
+            with self._db:
+                if row is not None:
+                    # Queued again after failing, so the failed operation gives up its key but is kept as a record
+                    self._db.execute('UPDATE operations SET key = ? WHERE id = ?', (key + ':' + row[0], row[0]))
+                    payload = dict(payload, requeued=True)
+                self._db.execute('INSERT INTO operations (id, key, kind, payload, depends_on, status, attempts, '
+                                 'next_attempt) VALUES (?, ?, ?, ?, ?, ?, 0, 0)',
+                                 (operation_id, key, kind, json.dumps(payload), json.dumps(list(depends_on)),
+                                  QueuedOperation.PENDING))
+            self._changed.notify_all()
+        return QueuedOperation(self, operation_id, kind)
+
+    def _row(self, operation_id):
+        with self._lock:
+            row = self._db.execute('SELECT status, result, error FROM operations WHERE id = ?',
+                                   (operation_id, )).fetchone()
+        if row is None:
+            raise KeyError(operation_id)
+        status, result, error = row
+        return dict(status=status, result=json.loads(result) if result is not None else None, error=error)
+
+    def _wait(self, operation_id, timeout=None):
+        finished = (QueuedOperation.DONE, QueuedOperation.FAILED)
+        expires = None if timeout is None else time.time() + timeout
+        with self._changed:
+            while True:
+                row = self._db.execute('SELECT status FROM operations WHERE id = ?', (operation_id, )).fetchone()
+                if row is None:
+                    raise KeyError(operation_id)
+                if row[0] in finished:
+                    return True
+                remaining = None if expires is None else expires - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._changed.wait(remaining)
+
+    def _claim(self):
+        """ Mark the next operation which is ready to be made as RUNNING and return it, or return the number of
+        seconds until one may be ready. Must be called with the lock held. """
+        now = time.time()
+        rows = self._db.execute('SELECT id, kind, payload, depends_on, attempts, next_attempt FROM operations '
+                                'WHERE status = ? ORDER BY seq', (QueuedOperation.PENDING, )).fetchall()
+        wait = None
+        for operation_id, kind, payload, depends_on, attempts, next_attempt in rows:
+            dependencies = json.loads(depends_on)
+            statuses = [self._db.execute('SELECT status FROM operations WHERE id = ?', (dependency, )).fetchone()
+                        for dependency in dependencies]
+            if any(status is None or status[0] == QueuedOperation.FAILED for status in statuses):
+                self._finish(operation_id, QueuedOperation.FAILED, error='An operation this depends on failed')
+                continue
+            if any(status[0] != QueuedOperation.DONE for status in statuses):
+                continue
+            if next_attempt > now:
+                wait = next_attempt - now if wait is None else min(wait, next_attempt - now)
+                continue
+
+            with self._db:
+                self._db.execute('UPDATE operations SET status = ?, attempts = attempts + 1 WHERE id = ?',
+                                 (QueuedOperation.RUNNING, operation_id))
+            return operation_id, kind, json.loads(payload), attempts
+        return wait
+
+    def _finish(self, operation_id, status, result=None, error=None, next_attempt=0):
+        with self._db:
+            self._db.execute('UPDATE operations SET status = ?, result = ?, error = ?, next_attempt = ? WHERE id = ?',
+                             (status, json.dumps(result) if result is not None else None, error, next_attempt,
+                              operation_id))
+        self._changed.notify_all()
+
+    def _work(self):
+        with RequestScheduler.priority(RequestScheduler.BATCH):
+            self._work_batch()
+
+    def _work_batch(self):
+        while True:
+            with self._changed:
+                claimed = None
+                while not self._stopping:
+                    claimed = self._claim()
+                    if isinstance(claimed, tuple):
+                        break
+                    self._changed.wait(claimed)
+                if self._stopping:
+                    return
+
+            operation_id, kind, payload, attempts = claimed
+            try:
+                result = self._perform(operation_id, kind, payload, attempts)
+            except Exception as e:
+                permanent = _permanent(e) or attempts + 1 >= self.max_attempts
+                log.warning('Queued {} {} failed: {}'.format(kind, operation_id, e))
+                with self._changed:
+                    if permanent:
+                        self._finish(operation_id, QueuedOperation.FAILED, error=str(e))
+                    else:
+                        delay = self.retry_delay * 2 ** attempts
+                        self._finish(operation_id, QueuedOperation.PENDING, error=str(e),
+                                     next_attempt=time.time() + delay)
+            else:
+                with self._changed:
+                    self._finish(operation_id, QueuedOperation.DONE, result=result)
+                if kind == 'upload':
+                    os.remove(os.path.join(self._files, operation_id))
+
+    def _perform(self, operation_id, kind, payload, attempts):
+        # Imported here so the queue can be imported without the rest of the library
+        from .agreement import Agreement
+        from .documents import TransientDocument
+        from .users import User
+
+        if kind == 'upload':
+            with open(os.path.join(self._files, operation_id), 'rb') as file:
+                document = TransientDocument(self.account, payload['file_name'], file, payload['mime_type'])
+            return dict(document_id=document.document_id)
+
+        if kind == 'send':
+            if attempts > 0 or payload.get('requeued'):
+                # An earlier attempt may have created the agreement before failing
+                agreement_id = self._find_sent(payload['external_id'])
+                if agreement_id is not None:
+                    log.debug('Agreement with external ID {} already exists'.format(payload['external_id']))
+                    return dict(agreement_id=agreement_id, embedded_code=None, expiration=None, url=None)
+
+            # Sending only needs the ID of each file, so the agreement is given the fileInfos Echosign expects
+            files = []
+            for file in payload['files']:
+                if 'library_document_id' in file:
+                    files.append({'libraryDocumentId': file['library_document_id']})
+                    continue
+                if 'operation' in file:
+                    file = self._row(file['operation'])['result']
+                files.append({'transientDocumentId': file['document_id']})
+
+            agreement = Agreement(self.account, name=payload['name'], files=files)
+            response = agreement.send([User(email) for email in payload['recipients']],
+                                      agreement_name=payload['agreement_name'], ccs=payload['ccs'],
+                                      days_until_signing_deadline=payload['days_until_signing_deadline'],
+                                      external_id=payload['external_id'], signature_flow=payload['signature_flow'],
+                                      message=payload['message'], merge_fields=payload['merge_fields'],
+                                      callback_url=payload['callback_url'])
+            if response is None:
+                raise ApiError('Did not receive an agreement ID from Echosign')
+            return response._asdict()
+
+        agreement = Agreement(self.account, echosign_id=payload['echosign_id'])
+        if kind == 'cancel':
+            agreement.cancel()
+        elif kind == 'delete':
+            agreement.delete()
+        elif kind == 'send_reminder':
+            agreement.send_reminder(payload['comment'])
+        else:
+            raise ValueError('Unknown operation {}'.format(kind))
+        return dict()
+
+    def _find_sent(self, external_id):
+        # type: (str) -> str
+        """ The ID of the agreement sent with an external ID, if any. The search matches any agreement mentioning
+        the external ID, so each one found is retrieved to check its external ID is the one sent. """
+        for agreement in self.account.get_agreements(query=external_id):
+            url = '{}agreements/{}'.format(self.account.api_access_point, agreement.echosign_id)
+            response = self.account.request('get', url, headers=self.account.headers())
+            check_error(response)
+            found = response.json().get('externalId')
+            # Returned as an ExternalId object, {"id": ...}, by later versions of the API
+            if isinstance(found, dict):
+                found = found.get('id')
+            if found == external_id:
+                return agreement.echosign_id
+        return None
@@ -0,0 +1,141 @@
+import functools
+import threading
+import weakref
+from typing import TYPE_CHECKING, Iterable, List
+
+from .users import User
+
+if TYPE_CHECKING:
+    from .account import EchosignAccount
+    from .agreement import Agreement
+
+__all__ = ['ParticipantIndex']
+
+
+class ParticipantIndex(object):
+    """ The participants of an account's agreements, shared between agreements by email, and an index from each
+    participant to the agreements they take part in.
+
+    Each account has one ParticipantIndex, available as :attr:`EchosignAccount.participants
+    <pyEchosign.classes.account.EchosignAccount.participants>`. Agreements parsed for the account share one
+    :class:`User <pyEchosign.classes.users.User>` per email (matched case-insensitively) rather than each holding its
+    own, and :meth:`EchosignAccount.get_agreements <pyEchosign.classes.account.EchosignAccount.get_agreements>` keeps
+    the index of their agreements up to date, so finding every agreement of a participant doesn't scan them all.
+    Agreements are held weakly: the index only finds agreements the application still holds, and never keeps one
+    alive itself.
+
+    Note:
+        Users from agreement listings are shared, so changes to one (such as setting a password) are seen by every
+        agreement it is a participant of. Signing URLs are kept per agreement.
+    """
+    _indexes_lock = threading.Lock()
+
+    def __init__(self):
+        self._users = weakref.WeakValueDictionary()
+        self._agreements = {}  # echosign_id -> weak reference to the Agreement
+        self._collected = []  # (echosign_id, reference) of indexed agreements since garbage collected
+        self._emails = {}  # echosign_id -> the emails it was indexed under
+        self._by_email = {}  # email -> set of echosign_ids
+        self._lock = threading.RLock()
+
+    @classmethod
+    def for_account(cls, account):
+        # type: (EchosignAccount) -> ParticipantIndex
+        """ The ParticipantIndex of an account, created if needed """
+        # Kept on the account, since the index refers back to it through its agreements
+        with cls._indexes_lock:
+            index = account.__dict__.get('_participants')
+            if index is None:
+                index = account._participants = cls()
+            return index
+
+    def __len__(self):
+        """ The number of participants with indexed agreements """
+        with self._lock:
+            self._prune()
+            return len(self._by_email)
+
+    def __contains__(self, email):
+        with self._lock:
+            self._prune()
+            return email.lower() in self._by_email
+
+    def user(self, email, full_name=None, company=None):
+        # type: (str, str, str) -> User
+        """ The User for an email, created if there isn't one already. Details missing from an existing User are
+        filled in from full_name and company. """
+        key = email.lower() if email else email
+        with self._lock:
+            user = self._users.get(key)
+            if user is None:
+                user = User(email, full_name=full_name, company=company)
+                if key is not None:
+                    self._users[key] = user
+            else:
+                if user.full_name is None:
+                    user.full_name = full_name
+                if user.company is None:
+                    user.company = company
+            return user
+
+    def agreements(self, email):
+        # type: (str) -> List[Agreement]
+        """ The indexed agreements a participant (matched by email, case-insensitively) takes part in """
+        with self._lock:
+            self._prune()
+            agreements = (self._agreements[echosign_id]() for echosign_id in self._by_email.get(email.lower(), ()))
+            return [agreement for agreement in agreements if agreement is not None]
+
+    def update(self, agreements, complete=False):
+        # type: (Iterable[Agreement], bool) -> None
+        """ Index agreements under their participants, replacing any earlier entries for the same agreements.
+
+        Args:
+            agreements: The agreements to index
+            complete: (optional) Whether agreements is every agreement of the account, in which case agreements
+                indexed earlier but not among them are removed
+        """
+        with self._lock:
+            self._prune()
+            seen = set()
+            for agreement in agreements:
+                seen.add(agreement.echosign_id)
+                self._remove(agreement.echosign_id)
+                emails = set(user.email.lower() for user in agreement.users if user.email)
+                self._agreements[agreement.echosign_id] = weakref.ref(
+                    agreement, functools.partial(self._forget, agreement.echosign_id))
+                self._emails[agreement.echosign_id] = emails
+                for email in emails:
+                    self._by_email.setdefault(email, set()).add(agreement.echosign_id)
+
+            if complete:
+                for echosign_id in set(self._agreements) - seen:
+                    self._remove(echosign_id)
+
+    def remove(self, agreement):
+        # type: (Agreement) -> None
+        with self._lock:
+            self._remove(agreement.echosign_id)
+
+    def _forget(self, echosign_id, reference):
+        # Called by the garbage collector, possibly while the lock is held, so the agreement is only noted here and
+        # removed from the index by the next call to take the lock
+        self._collected.append((echosign_id, reference))
+
+    def _prune(self):
+        """ Remove agreements which have been garbage collected. Must be called with the lock held. """
+        while self._collected:
+            echosign_id, reference = self._collected.pop()
+            # The agreement may have been indexed again since, as a different object
+            if self._agreements.get(echosign_id) is reference:
+                self._remove(echosign_id)
+
+    def _remove(self, echosign_id):
+        if self._agreements.pop(echosign_id, None) is None:
+            return
+        for email in self._emails.pop(echosign_id):
+            ids = self._by_email.get(email)
+            if ids is not None:
+                ids.discard(echosign_id)
+                if not ids:
+                    del self._by_email[email]
@@ -0,0 +1,240 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, List
+
+from pyEchosign.classes.agreement import Agreement
+from pyEchosign.classes.scheduler import RequestScheduler
+from pyEchosign.utils.lazy import arrow
+from pyEchosign.utils.rate_limit import TokenBucket
+
+log = logging.getLogger('pyEchosign.' + __name__)
+
+if TYPE_CHECKING:
+    from .account import EchosignAccount
+
+__all__ = ['PollingScheduler']
+
+
+class _PollEntry(object):
+    def __init__(self, agreement, deadline, interval):
+        self.agreement = agreement
+        self.deadline = deadline
+        self.interval = interval
+        self.due = None
+
+
+class PollingScheduler(object):
+    """ Polls the status of outstanding agreements, for those that can't use a
+    :class:`CallbackReceiver <pyEchosign.classes.callbacks.CallbackReceiver>`.
+
+    Rather than polling every agreement at a fixed interval, each agreement is kept in a priority queue keyed by when
+    it is next expected to change. Agreements whose status hasn't changed are polled less and less often, those that
+    changed recently are polled again soon, and those approaching their signing deadline are polled more often. Once
+    an agreement reaches a final status (such as SIGNED or EXPIRED) it is no longer polled.
+
+    Each poll is a single :meth:`EchosignAccount.get_agreements
+    <pyEchosign.classes.account.EchosignAccount.get_agreements>` call which refreshes every tracked agreement in the
+    listing, so any number of due agreements costs one request. Polls are limited to ``requests_per_hour``.
+
+    Args:
+        account: The :class:`EchosignAccount <pyEchosign.classes.account.EchosignAccount>` the agreements belong to
+
+    Keyword Args:
+        min_interval (float): The shortest time in seconds between polls of one agreement. Defaults to one minute.
+        max_interval (float): The longest time in seconds between polls of one agreement. Defaults to six hours.
+        backoff (float): What the interval of an agreement is multiplied by each time it is polled without changing
+        requests_per_hour (float): The most listing calls made per hour
+        query (str): A search query passed to get_agreements, to narrow the listing to the tracked agreements
+        clock: The function used to get the current time. Defaults to time.time.
+    """
+    FINAL_STATUSES = Agreement.FINAL_STATUSES
+
+    def __init__(self, account, min_interval=60, max_interval=6 * 60 * 60, backoff=2.0, requests_per_hour=60,
+                 query=None, clock=time.time):
+        # type: (EchosignAccount, float, float, float, float, str, Callable[[], float]) -> None
+        self.account = account
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.query = query
+        self.clock = clock
+        self.budget = TokenBucket(requests_per_hour / 3600.0, capacity=max(1, requests_per_hour / 60.0), clock=clock)
+
+        self._entries = {}
+        self._queue = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, agreement):
+        return agreement.echosign_id in self._entries
+
+    def track(self, agreement, days_until_signing_deadline=None):
+        # type: (Agreement, int) -> None
+        """ Start polling an agreement.
+
+        Args:
+            agreement: The :class:`Agreement <pyEchosign.classes.agreement.Agreement>` to keep up to date
+            days_until_signing_deadline: (optional) The number of days the agreement was sent with until it expires,
+                counted from the agreement's date. Agreements are polled more often as their deadline approaches.
+        """
+        if getattr(agreement, 'status', None) in self.FINAL_STATUSES:
+            return
+
+        deadline = None
+        if days_until_signing_deadline:
+            sent = arrow.get(agreement.date).float_timestamp if agreement.date is not None else self.clock()
+            deadline = sent + days_until_signing_deadline * 24 * 60 * 60
+
+        with self._lock:
+            entry = _PollEntry(agreement, deadline, self.min_interval)
+            self._entries[agreement.echosign_id] = entry
+            self._schedule(entry, self.clock())
+
+    def untrack(self, agreement):
+        # type: (Agreement) -> None
+        with self._lock:
+            self._entries.pop(agreement.echosign_id, None)
+
+    def next_due(self):
+        # type: () -> float
+        """ The number of seconds until the next poll is due, 0 if one is due now, or None if nothing is tracked """
+        with self._lock:
+            self._discard_stale()
+            if not self._queue:
+                return None
+            return max(0.0, self._queue[0][0] - self.clock())
+
+    def poll(self):
+        # type: () -> List[Agreement]
+        """ Refresh the tracked agreements if any are due and the request budget allows.
+
+        Returns: The agreements whose status changed
+
+        Raises:
+            Any error raised by the listing, such as a CircuitOpenError. The agreements which were due are rescheduled
+            with back off first.
+        """
+        now = self.clock()
+        with self._lock:
+            self._discard_stale()
+            if not self._queue or self._queue[0][0] > now:
+                return []
+            due = set()
+            while self._queue and self._queue[0][0] <= now:
+                due_time, _, echosign_id = heapq.heappop(self._queue)
+                entry = self._entries.get(echosign_id)
+                if entry is not None and entry.due == due_time:
+                    due.add(echosign_id)
+
+        wait = self.budget.try_acquire()
+        if wait > 0:
+            log.debug('Polling budget exhausted, delaying poll by {:.0f}s'.format(wait))
+            with self._lock:
+                for echosign_id in due:
+                    if echosign_id in self._entries:
+                        self._push(self._entries[echosign_id], now + wait)
+            return []
+
+        try:
+            listing = dict((agreement.echosign_id, agreement)
+                           for agreement in self.account.get_agreements(self.query))
+        except Exception:
+            # The due agreements were taken off the queue, so they must be put back to be polled again
+            with self._lock:
+                for echosign_id in due:
+                    if echosign_id in self._entries:
+                        self._back_off(self._entries[echosign_id], self.clock())
+            raise
+        now = self.clock()
+
+        changed = []
+        with self._lock:
+            for echosign_id, entry in list(self._entries.items()):
+                fresh = listing.get(echosign_id)
+                if fresh is None:
+                    if echosign_id in due:
+                        # Not in the listing (e.g. outside the query) - try again later
+                        self._back_off(entry, now)
+                    continue
+
+                agreement = entry.agreement
+                previous = getattr(agreement, 'status', None)
+                status = getattr(fresh, 'status', None)
+                agreement.status = status
+                agreement.date = fresh.date
+
+                if status != previous:
+                    changed.append(agreement)
+                    entry.interval = self.min_interval
+                    if status in self.FINAL_STATUSES:
+                        del self._entries[echosign_id]
+                    else:
+                        self._schedule(entry, now)
+                elif echosign_id in due:
+                    self._back_off(entry, now)
+                else:
+                    # Seen without being due - the next poll can wait a full interval from now
+                    self._schedule(entry, now)
+
+        return changed
+
+    def run(self, on_change=None, stop_event=None):
+        # type: (Callable[[Agreement], None], threading.Event) -> None
+        """ Poll until every tracked agreement is final, or until stop_event is set.
+
+        Args:
+            on_change: (optional) Called with each agreement whose status changed
+            stop_event: (optional) A threading.Event which stops polling when set
+        """
+        if stop_event is None:
+            stop_event = threading.Event()
+
+        while not stop_event.is_set():
+            wait = self.next_due()
+            if wait is None:
+                return
+            if wait > 0:
+                stop_event.wait(wait)
+                continue
+            try:
+                with RequestScheduler.priority(RequestScheduler.BATCH):
+                    changed = self.poll()
+            except Exception as e:
+                # The agreements which were due are rescheduled, so polling carries on
+                log.warning('Polling agreements failed: {}'.format(e))
+                continue
+            for agreement in changed:
+                if on_change is not None:
+                    on_change(agreement)
+
+    def _back_off(self, entry, now):
+        entry.interval = min(self.max_interval, entry.interval * self.backoff)
+        self._schedule(entry, now)
+
+    def _schedule(self, entry, now):
+        delay = entry.interval
+        if entry.deadline is not None:
+            remaining = entry.deadline - now
+            if remaining > 0:
+                # Poll more often as the deadline approaches, and once just after it passes
+                delay = min(delay, max(self.min_interval, remaining / 4.0), remaining + 1)
+        self._push(entry, now + delay)
+
+    def _push(self, entry, due):
+        entry.due = due
+        heapq.heappush(self._queue, (due, next(self._counter), entry.agreement.echosign_id))
+
+    def _discard_stale(self):
+        # Entries are rescheduled by pushing again, so skip queue items that no longer match their entry
+        while self._queue:
+            due, _, echosign_id = self._queue[0]
+            entry = self._entries.get(echosign_id)
+            if entry is not None and entry.due == due:
+                return
+            heapq.heappop(self._queue)
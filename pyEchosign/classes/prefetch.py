@@ -0,0 +1,91 @@
+import logging
+from collections import deque
+from typing import TYPE_CHECKING, Iterable, Iterator
+
+from pyEchosign.classes import tracing
+from pyEchosign.classes.resilience import Deadline
+from pyEchosign.classes.scheduler import RequestScheduler
+
+log = logging.getLogger('pyEchosign.' + __name__)
+
+if TYPE_CHECKING:
+    from .agreement import Agreement
+
+__all__ = ['AgreementPrefetcher']
+
+
+class AgreementPrefetcher(object):
+    """ Iterates over agreements while retrieving their documents and signing URLs in the background, a number of
+    agreements ahead of the one being used, so that code reading ``agreement.documents`` or ``user.signing_url`` in a
+    loop rarely waits on a request.
+
+    At most ``ahead`` agreements are retrieved ahead of the consumer and at most ``workers`` requests are made at
+    once, so memory and concurrency stay bounded however long the listing is. Each agreement is yielded once its own
+    retrieval has finished, by which time those after it are already in progress. Errors in the background are not
+    raised; the request is made again when the attribute is read, and raises then.
+
+    Example::
+
+        for agreement in AgreementPrefetcher(account.iter_agreements(), signing_urls=True):
+            print(agreement.documents, [user.signing_url for user in agreement.users])
+
+    Args:
+        agreements: The agreements to iterate over, such as the result of :meth:`EchosignAccount.iter_agreements
+            <pyEchosign.classes.account.EchosignAccount.iter_agreements>` or :meth:`get_agreements
+            <pyEchosign.classes.account.EchosignAccount.get_agreements>`
+
+    Keyword Args:
+        documents (bool): Whether to retrieve each agreement's :attr:`documents
+            <pyEchosign.classes.agreement.Agreement.documents>`. Defaults to True.
+        signing_urls (bool): Whether to retrieve the signing URLs of each agreement's users. Defaults to False.
+        ahead (int): How many agreements are retrieved ahead of the consumer. Defaults to 8.
+        workers (int): How many requests are made at once. Defaults to 4.
+    """
+    def __init__(self, agreements, documents=True, signing_urls=False, ahead=8, workers=4):
+        # type: (Iterable[Agreement], bool, bool, int, int) -> None
+        self.agreements = agreements
+        self.documents = documents
+        self.signing_urls = signing_urls
+        self.ahead = max(1, ahead)
+        self.workers = workers
+
+    def __iter__(self):
+        # type: () -> Iterator[Agreement]
+        from concurrent.futures import ThreadPoolExecutor
+
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        retrieve = tracing.bind(Deadline.bind(RequestScheduler.bind(self._retrieve)))
+        window = deque()
+        agreements = iter(self.agreements)
+        try:
+            for agreement in agreements:
+                window.append((agreement, executor.submit(retrieve, agreement)))
+                if len(window) >= self.ahead:
+                    yield self._next(window)
+            while window:
+                yield self._next(window)
+        finally:
+            # Stop retrieving agreements the consumer won't reach, such as when it breaks out of the loop
+            for _, future in window:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    @staticmethod
+    def _next(window):
+        agreement, future = window.popleft()
+        future.result()
+        return agreement
+
+    def _retrieve(self, agreement):
+        # type: (Agreement) -> None
+        try:
+            if self.documents:
+                agreement.documents
+            if self.signing_urls:
+                with agreement._lock:
+                    missing = any(user._signing_url is None for user in agreement.users)
+                # Requested without the lock held, so the consumer isn't blocked on the agreement meanwhile
+                if missing:
+                    agreement.get_signing_urls()
+        except Exception as e:
+            log.debug('Prefetching agreement {} failed: {}'.format(agreement.echosign_id, e))
@@ -0,0 +1,230 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict
+
+from pyEchosign.exceptions.internal import QuotaExceeded
+
+log = logging.getLogger('pyEchosign.' + __name__)
+
+__all__ = ['QuotaTracker']
+
+
+class QuotaTracker(object):
+    """ Counts the API calls made by an account over a rolling window, by class of endpoint, so that bulk jobs can
+    see how much of the account's transaction limits remain and slow down before Echosign starts rejecting calls.
+
+    Pass a QuotaTracker to :class:`EchosignAccount <pyEchosign.classes.account.EchosignAccount>` as ``quota`` and
+    every call it makes is counted as one of:
+
+    * ``QuotaTracker.READ``: GET requests
+    * ``QuotaTracker.UPLOAD``: TransientDocument uploads
+    * ``QuotaTracker.SEND``: Agreements sent
+    * ``QuotaTracker.WRITE``: Any other change, such as cancellations and reminders
+
+    Counts are kept in buckets of ``resolution`` seconds. With a ``path``, they are saved to a SQLite database so
+    they survive restarts and are shared by every process using the same file.
+
+    Example::
+
+        quota = QuotaTracker({QuotaTracker.SEND: 1000}, path='/var/lib/myapp/echosign-quota.sqlite3')
+        account = EchosignAccount(token, quota=quota)
+
+        for agreement in agreements_to_send:
+            time.sleep(quota.wait_time(QuotaTracker.SEND, reserve=50))
+            agreement.send(recipients)
+
+    Args:
+        limits: A dict of endpoint class to the most calls of that class allowed within the window. Classes without
+            a limit are counted but never throttled.
+
+    Keyword Args:
+        window (float): The length of the rolling window in seconds. Defaults to 30 days.
+        resolution (float): The length of each bucket in seconds. Defaults to one hour.
+        path (str): A SQLite database to keep the counts in. Defaults to None, for counts held in memory only.
+        enforce (bool): Whether the account raises :class:`QuotaExceeded
+            <pyEchosign.exceptions.internal.QuotaExceeded>` instead of making a call once its class has no budget
+            remaining. Defaults to False.
+        flush_interval (float): The most seconds counts are held in memory before being written to path. Defaults
+            to 10.
+    """
+    READ = 'read'
+    UPLOAD = 'upload'
+    SEND = 'send'
+    WRITE = 'write'
+
+    def __init__(self, limits=None, window=30 * 24 * 60 * 60, resolution=60 * 60, path=None, enforce=False,
+                 flush_interval=10):
+        # type: (Dict[str, int], float, float, str, bool, float) -> None
+        self.limits = dict(limits or {})
+        self.window = window
+        self.resolution = resolution
+        self.path = path
+        self.enforce = enforce
+        self.flush_interval = flush_interval
+
+        self._pending = {}  # (endpoint class, bucket) -> count not yet written to path
+        self._lock = threading.Lock()
+        self._db = None
+        self._pid = None
+        self._flushed = time.time()
+
+        if path is not None:
+            with self._lock:
+                with self._connection() as db:
+                    db.execute('CREATE TABLE IF NOT EXISTS counts (endpoint_class TEXT NOT NULL, '
+                               'bucket REAL NOT NULL, count INTEGER NOT NULL, PRIMARY KEY (endpoint_class, bucket))')
+
+    @classmethod
+    def classify(cls, method, url):
+        # type: (str, str) -> str
+        """ The endpoint class of a request """
+        method = method.lower()
+        if method == 'get':
+            return cls.READ
+        path = url.split('?', 1)[0].rstrip('/')
+        if method == 'post' and path.endswith('/transientDocuments'):
+            return cls.UPLOAD
+        if method == 'post' and path.endswith('/agreements'):
+            return cls.SEND
+        return cls.WRITE
+
+    def _connection(self):
+        """ This process's connection to the database. Must be called with the lock held. """
+        if self._pid != os.getpid():
+            self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._pid = os.getpid()
+        return self._db
+
+    def _bucket(self, now):
+        return now - now % self.resolution
+
+    def check(self, endpoint_class):
+        # type: (str) -> None
+        """ Raise QuotaExceeded if enforce is set and no budget remains for endpoint_class """
+        if self.enforce and self.remaining(endpoint_class) == 0:
+            raise QuotaExceeded('No {} calls remain in the quota, wait {:.0f}s'.format(
+                endpoint_class, self.wait_time(endpoint_class)))
+
+    def record(self, endpoint_class, count=1):
+        # type: (str, int) -> None
+        """ Count calls of an endpoint class made now """
+        now = time.time()
+        with self._lock:
+            self._record(endpoint_class, count, now)
+
+    def reserve(self, endpoint_class):
+        # type: (str) -> None
+        """ Count a call of an endpoint class about to be made, first raising QuotaExceeded if enforce is set and no
+        budget remains for it. Unlike :meth:`check` followed by :meth:`record`, concurrent callers in this process
+        can't both take the last of the budget. """
+        now = time.time()
+        limit = self.limits.get(endpoint_class)
+        with self._lock:
+            if not self.enforce or limit is None or sum(self._window(endpoint_class, now).values()) < limit:
+                self._record(endpoint_class, 1, now)
+                return
+        raise QuotaExceeded('No {} calls remain in the quota, wait {:.0f}s'.format(
+            endpoint_class, self.wait_time(endpoint_class)))
+
+    def _record(self, endpoint_class, count, now):
+        """ Must be called with the lock held """
+        key = (endpoint_class, self._bucket(now))
+        self._pending[key] = self._pending.get(key, 0) + count
+        if self.path is not None and now - self._flushed >= self.flush_interval:
+            self._flush(now)
+
+    def flush(self):
+        """ Write counts held in memory to path """
+        if self.path is None:
+            return
+        with self._lock:
+            self._flush(time.time())
+
+    def _flush(self, now):
+        pending, self._pending = self._pending, {}
+        self._flushed = now
+        with self._connection() as db:
+            for (endpoint_class, bucket), count in pending.items():
+                db.execute('INSERT OR IGNORE INTO counts (endpoint_class, bucket, count) VALUES (?, ?, 0)',
+                           (endpoint_class, bucket))
+                db.execute('UPDATE counts SET count = count + ? WHERE endpoint_class = ? AND bucket = ?',
+                           (count, endpoint_class, bucket))
+            db.execute('DELETE FROM counts WHERE bucket < ?', (now - self.window - self.resolution, ))
+
+    def _buckets(self, endpoint_class, now):
+        """ The counts of endpoint_class within the window, as a dict of bucket start to count """
+        with self._lock:
+            return self._window(endpoint_class, now)
+
+    def _window(self, endpoint_class, now):
+        """ As :meth:`_buckets`. Must be called with the lock held. """
+        start = now - self.window
+        # Buckets that have left the window are dropped from memory as well
+        for key in [key for key in self._pending if key[1] + self.resolution <= start]:
+            del self._pending[key]
+        buckets = dict((bucket, count) for (name, bucket), count in self._pending.items()
+                       if name == endpoint_class)
+        if self.path is not None:
+            rows = self._connection().execute(
+                'SELECT bucket, count FROM counts WHERE endpoint_class = ? AND bucket + ? > ?',
+                (endpoint_class, self.resolution, start)).fetchall()
+            for bucket, count in rows:
+                buckets[bucket] = buckets.get(bucket, 0) + count
+        return buckets
+
+    def used(self, endpoint_class):
+        # type: (str) -> int
+        """ The number of calls of an endpoint class made within the window """
+        return sum(self._buckets(endpoint_class, time.time()).values())
+
+    def remaining(self, endpoint_class):
+        # type: (str) -> int
+        """ How many more calls of an endpoint class may be made within the window, or None if it has no limit """
+        limit = self.limits.get(endpoint_class)
+        if limit is None:
+            return None
+        return max(0, limit - self.used(endpoint_class))
+
+    def rate(self, endpoint_class, period=24 * 60 * 60):
+        # type: (str, float) -> float
+        """ The average calls per second of an endpoint class over the last period seconds """
+        now = time.time()
+        start = now - min(period, self.window)
+        recent = sum(count for bucket, count in self._buckets(endpoint_class, now).items()
+                     if bucket + self.resolution > start)
+        return recent / float(now - start)
+
+    def forecast(self, endpoint_class, period=24 * 60 * 60):
+        # type: (str, float) -> float
+        """ The number of seconds until the budget of an endpoint class runs out if calls continue at the rate of the
+        last period seconds. None if it has no limit or no calls were made. """
+        remaining = self.remaining(endpoint_class)
+        if remaining is None:
+            return None
+        rate = self.rate(endpoint_class, period)
+        if rate == 0:
+            return None
+        return remaining / rate
+
+    def wait_time(self, endpoint_class, count=1, reserve=0):
+        # type: (str, int, int) -> float
+        """ How many seconds to wait before count more calls of an endpoint class can be made while leaving reserve
+        calls of budget, as older calls leave the window. 0 if they can be made now or the class has no limit. """
+        limit = self.limits.get(endpoint_class)
+        if limit is None:
+            return 0.0
+        now = time.time()
+        buckets = self._buckets(endpoint_class, now)
+        excess = sum(buckets.values()) + count + reserve - limit
+        if excess <= 0:
+            return 0.0
+        for bucket in sorted(buckets):
+            excess -= buckets[bucket]
+            if excess <= 0:
+                return max(0.0, bucket + self.resolution + self.window - now)
+        # More calls are wanted than the limit allows at all
+        return float(self.window)
@@ -0,0 +1,332 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+from pyEchosign.classes.scheduler import RequestScheduler
+from pyEchosign.utils.rate_limit import TokenBucket
+
+log = logging.getLogger('pyEchosign.' + __name__)
+
+if TYPE_CHECKING:
+    from .agreement import Agreement
+
+__all__ = ['ReminderScheduler', 'ScheduledReminder']
+
+
+class ScheduledReminder(object):
+    """ A reminder accepted by a :class:`ReminderScheduler`. Every request to remind the same agreement before the
+    reminder is sent returns the same ScheduledReminder, with its comment merged in.
+
+    Attributes:
+        agreement: The :class:`Agreement <pyEchosign.classes.agreement.Agreement>` to remind
+        comments: The distinct comments requested, in the order they were first requested
+        queued: When the first request was made, as a UNIX timestamp
+        status: PENDING, SENDING, SENT, SKIPPED (the agreement was reminded within the dedupe window) or FAILED
+        error: The exception the reminder failed with, if any
+    """
+    PENDING = 'PENDING'
+    SENDING = 'SENDING'
+    SENT = 'SENT'
+    SKIPPED = 'SKIPPED'
+    FAILED = 'FAILED'
+
+    def __init__(self, agreement, queued, separator='\n\n'):
+        # type: (Agreement, float, str) -> None
+        self.agreement = agreement
+        self.comments = []
+        self.queued = queued
+        self.status = self.PENDING
+        self.error = None
+        self._separator = separator
+        self._done = threading.Event()
+
+    def __repr__(self):
+        return 'ScheduledReminder: {} {}'.format(self.agreement.echosign_id, self.status)
+
+    @property
+    def comment(self):
+        # type: () -> str
+        """ The comment sent with the reminder, the requested comments joined together """
+        return self._separator.join(self.comments)
+
+    def add_comment(self, comment):
+        # type: (str) -> None
+        if comment and comment not in self.comments:
+            self.comments.append(comment)
+
+    def wait(self, timeout=None):
+        # type: (float) -> bool
+        """ Block until the reminder is SENT, SKIPPED or FAILED. Returns False if timeout passed first. """
+        return self._done.wait(timeout)
+
+    def _finish(self, status, error=None):
+        self.status = status
+        self.error = error
+        self._done.set()
+
+
+class _SentTimes(object):
+    """ When each agreement was last reminded, optionally kept in a SQLite database shared between processes """
+    def __init__(self, path=None):
+        # type: (str) -> None
+        self.path = path
+        self._sent = {}
+        self._lock = threading.Lock()
+        self._db = None
+        self._pid = None
+        if path is not None:
+            with self._lock:
+                with self._connection() as db:
+                    db.execute('CREATE TABLE IF NOT EXISTS reminded '
+                               '(agreement_id TEXT PRIMARY KEY, sent REAL NOT NULL)')
+
+    def _connection(self):
+        """ This process's connection to the database. Must be called with the lock held. """
+        if self._pid != os.getpid():
+            self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._pid = os.getpid()
+        return self._db
+
+    def get(self, agreement_id):
+        # type: (str) -> float
+        with self._lock:
+            if self.path is None:
+                return self._sent.get(agreement_id)
+            row = self._connection().execute('SELECT sent FROM reminded WHERE agreement_id = ?',
+                                             (agreement_id, )).fetchone()
+            return row[0] if row is not None else None
+
+    def claim(self, agreement_id, now, window):
+        # type: (str, float, float) -> bool
+        """ Record agreement_id as reminded now, unless it was reminded within window. Returns whether it was. """
+        with self._lock:
+            if self.path is None:
+                sent = self._sent.get(agreement_id)
+                if sent is not None and now - sent < window:
+                    return False
+                self._sent[agreement_id] = now
+                return True
+
+            # Checked and set in one transaction, so two processes can't both claim an agreement
+            with self._connection() as db:
+                db.execute('INSERT OR IGNORE INTO reminded (agreement_id, sent) VALUES (?, 0)', (agreement_id, ))
+                return db.execute('UPDATE reminded SET sent = ? WHERE agreement_id = ? AND sent <= ?',
+                                  (now, agreement_id, now - window)).rowcount == 1
+
+    def release(self, agreement_id):
+        # type: (str) -> None
+        """ Forget a claim whose reminder failed, so the agreement can be reminded again straight away """
+        with self._lock:
+            if self.path is None:
+                self._sent.pop(agreement_id, None)
+                return
+            with self._connection() as db:
+                db.execute('DELETE FROM reminded WHERE agreement_id = ?', (agreement_id, ))
+
+
+class ReminderScheduler(object):
+    """ Coalesces reminders for agreements, so that several parts of an application reminding the same agreement
+    result in one reminder to its participants rather than one each.
+
+    A reminder is held for ``delay`` seconds after it is first requested. Requests for the same agreement in that time
+    are merged into it, with their distinct comments joined together. Once sent, further requests to remind the
+    agreement within ``window`` seconds are skipped. With a ``path``, the times agreements were reminded are kept in a
+    SQLite database, so the window applies across every process sharing it.
+
+    Reminders are sent in the background by at most ``workers`` threads at once and at most ``rate`` per second, as
+    batch requests of a :class:`RequestScheduler <pyEchosign.classes.scheduler.RequestScheduler>`. Reminders which
+    fail are not retried; queue them in an :class:`OutboundQueue <pyEchosign.classes.outbound.OutboundQueue>` when
+    they must be delivered.
+
+    Example::
+
+        with ReminderScheduler(window=24 * 60 * 60, path='/var/lib/myapp/reminders.sqlite3') as reminders:
+            for agreement in overdue_agreements:
+                reminders.remind(agreement, 'Please sign by Friday')
+
+    Keyword Args:
+        window (float): Seconds after an agreement is reminded during which it is not reminded again. Defaults to one
+            day.
+        delay (float): Seconds a reminder is held to merge further requests into it. Defaults to 60.
+        rate (float): The most reminders sent per second. Defaults to 1, None for no limit.
+        burst (float): The most reminders which may be sent at once after a quiet period. Defaults to rate.
+        workers (int): The most reminders sent at once. Defaults to 2.
+        path (str): A SQLite database to keep the times agreements were reminded in. Defaults to None, for times
+            held in memory only.
+        separator (str): The text between merged comments. Defaults to a blank line.
+    """
+    def __init__(self, window=24 * 60 * 60, delay=60, rate=1.0, burst=None, workers=2, path=None, separator='\n\n'):
+        # type: (float, float, float, float, int, str, str) -> None
+        self.window = window
+        self.delay = delay
+        self.workers = workers
+        self.separator = separator
+        self.bucket = TokenBucket(rate, burst) if rate is not None else None
+
+        self._sent = _SentTimes(path)
+        self._pending = OrderedDict()  # echosign_id -> ScheduledReminder, in the order they were first requested
+        self._sending = {}  # echosign_id -> ScheduledReminder
+        self._slots = threading.BoundedSemaphore(workers)
+        self._changed = threading.Condition(threading.Lock())
+        self._executor = None
+        self._thread = None
+        self._stopping = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def __len__(self):
+        """ The number of reminders not yet sent """
+        with self._changed:
+            return len(self._pending) + len(self._sending)
+
+    def remind(self, agreement, comment=''):
+        # type: (Agreement, str) -> ScheduledReminder
+        """ Request a reminder for an agreement.
+
+        Args:
+            agreement: The :class:`Agreement <pyEchosign.classes.agreement.Agreement>` to remind
+            comment: (optional) A comment to send with the reminder, merged with those of other requests
+
+        Returns: The :class:`ScheduledReminder` the request was merged into. It is already SKIPPED if the agreement was
+            reminded within the window. A reminder already being sent is returned as is, without the comment.
+
+        """
+        echosign_id = agreement.echosign_id
+        now = time.time()
+        with self._changed:
+            reminder = self._pending.get(echosign_id) or self._sending.get(echosign_id)
+            if reminder is not None:
+                if reminder.status == ScheduledReminder.PENDING:
+                    reminder.add_comment(comment)
+                return reminder
+
+            reminder = ScheduledReminder(agreement, now, self.separator)
+            reminder.add_comment(comment)
+            sent = self._sent.get(echosign_id)
+            if sent is not None and now - sent < self.window:
+                log.debug('Agreement {} was reminded {:.0f}s ago, skipping'.format(echosign_id, now - sent))
+                reminder._finish(ScheduledReminder.SKIPPED)
+                return reminder
+
+            self._pending[echosign_id] = reminder
+            self._changed.notify_all()
+            return reminder
+
+    def start(self):
+        """ Start sending reminders in the background as they become due """
+        with self._changed:
+            self._stopping = False
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._work, name='ReminderScheduler')
+                self._thread.daemon = True
+                self._thread.start()
+
+    def stop(self, flush=True):
+        # type: (bool) -> None
+        """ Stop sending reminders in the background.
+
+        Args:
+            flush: (optional) Whether to send the reminders still held first. Defaults to True.
+        """
+        with self._changed:
+            self._stopping = True
+            self._changed.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if flush:
+            self.flush()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def flush(self):
+        """ Send every reminder still held without waiting for its delay, and wait until they are sent """
+        dispatched = []
+        while True:
+            with self._changed:
+                reminder = self._take(force=True)
+            if reminder is None:
+                break
+            self._dispatch(reminder)
+            dispatched.append(reminder)
+        for reminder in dispatched:
+            reminder.wait()
+
+    def _take(self, force=False):
+        """ The earliest reminder which is due, moved from pending to sending. Must be called with the lock held. """
+        if not self._pending:
+            return None
+        echosign_id, reminder = next(iter(self._pending.items()))
+        if not force and reminder.queued + self.delay > time.time():
+            return None
+        del self._pending[echosign_id]
+        reminder.status = ScheduledReminder.SENDING
+        self._sending[echosign_id] = reminder
+        return reminder
+
+    def _wait_time(self):
+        """ Seconds until the earliest reminder is due, or None if none are held. Must be called with the lock held. """
+        if not self._pending:
+            return None
+        reminder = next(iter(self._pending.values()))
+        return max(0.0, reminder.queued + self.delay - time.time())
+
+    def _work(self):
+        while True:
+            with self._changed:
+                reminder = None
+                while not self._stopping:
+                    reminder = self._take()
+                    if reminder is not None:
+                        break
+                    self._changed.wait(self._wait_time())
+                if self._stopping:
+                    return
+            self._dispatch(reminder)
+
+    def _dispatch(self, reminder):
+        # type: (ScheduledReminder) -> None
+        self._slots.acquire()
+        if self.bucket is not None:
+            self.bucket.acquire()
+        with self._changed:
+            if self._executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+                self._executor = ThreadPoolExecutor(max_workers=self.workers)
+            executor = self._executor
+        executor.submit(self._send, reminder)
+
+    def _send(self, reminder):
+        # type: (ScheduledReminder) -> None
+        echosign_id = reminder.agreement.echosign_id
+        status, error = ScheduledReminder.SENT, None
+        try:
+            if not self._sent.claim(echosign_id, time.time(), self.window):
+                log.debug('Agreement {} was reminded elsewhere, skipping'.format(echosign_id))
+                status = ScheduledReminder.SKIPPED
+            else:
+                try:
+                    with RequestScheduler.priority(RequestScheduler.BATCH):
+                        reminder.agreement.send_reminder(reminder.comment)
+                except Exception:
+                    self._sent.release(echosign_id)
+                    raise
+        except Exception as e:
+            log.warning('Reminder for agreement {} failed: {}'.format(echosign_id, e))
+            status, error = ScheduledReminder.FAILED, e
+        finally:
+            self._slots.release()
+            with self._changed:
+                del self._sending[echosign_id]
+            reminder._finish(status, error)
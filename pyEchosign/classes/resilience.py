@@ -0,0 +1,170 @@
+import logging
+import threading
+import time
+
+from pyEchosign.exceptions.internal import CircuitOpenError
+
+log = logging.getLogger('pyEchosign.' + __name__)
+
+__all__ = ['Deadline', 'CircuitBreaker']
+
+_local = threading.local()
+
+
+def _deadlines():
+    if not hasattr(_local, 'deadlines'):
+        _local.deadlines = []
+    return _local.deadlines
+
+
+class Deadline(object):
+    """ Limits the total time a group of operations may take. Every request made within the block on the same thread
+    has its timeout shortened to the time remaining, and once the deadline has passed requests fail immediately with
+    :class:`DeadlineExceeded <pyEchosign.exceptions.internal.DeadlineExceeded>` rather than being made.
+
+    Deadlines may be nested, in which case the earliest applies.
+
+    Example::
+
+        with Deadline(30):
+            document = TransientDocument(account, 'contract.pdf', file)
+            agreement.files = [document]
+            agreement.send(recipients)
+            agreement.get_signing_urls()
+
+    Args:
+        seconds: How long the operations within the block may take in total
+    """
+    def __init__(self, seconds):
+        # type: (float) -> None
+        self.seconds = seconds
+        self.expires = None
+
+    def __enter__(self):
+        self.expires = time.time() + self.seconds
+        current = Deadline.current()
+        if current is not None:
+            self.expires = min(self.expires, current.expires)
+        _deadlines().append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        _deadlines().remove(self)
+
+    @property
+    def remaining(self):
+        # type: () -> float
+        """ The number of seconds until the deadline, which is negative once it has passed """
+        return self.expires - time.time()
+
+    @staticmethod
+    def current():
+        # type: () -> Deadline
+        """ The innermost Deadline active on this thread, or None """
+        deadlines = _deadlines()
+        return deadlines[-1] if deadlines else None
+
+    @staticmethod
+    def bind(function):
+        """ Wrap a function so that it runs under the current thread's deadline wherever it is called, such as in a
+        worker thread. Returns the function unchanged if no deadline is active. """
+        current = Deadline.current()
+        if current is None:
+            return function
+
+        def bound(*args, **kwargs):
+            with Deadline(current.remaining):
+                return function(*args, **kwargs)
+        return bound
+
+
+class CircuitBreaker(object):
+    """ Stops requests being made to an api_access_point which is failing, so that callers fail fast rather than
+    waiting on requests which are likely to time out.
+
+    After ``failure_threshold`` consecutive failures (connection errors, timeouts, 5xx responses, or responses slower
+    than ``slow_call_threshold``) the circuit opens, and requests raise
+    :class:`CircuitOpenError <pyEchosign.exceptions.internal.CircuitOpenError>` without being made. After
+    ``recovery_timeout`` seconds a single request is let through to probe the access point: if it succeeds the circuit
+    closes again, otherwise it stays open for another ``recovery_timeout``.
+
+    By default every :class:`EchosignAccount <pyEchosign.classes.account.EchosignAccount>` on the same
+    api_access_point shares one CircuitBreaker, see :meth:`for_access_point`.
+
+    Keyword Args:
+        failure_threshold (int): How many consecutive failures open the circuit. Defaults to 5.
+        recovery_timeout (float): Seconds the circuit stays open before a probe is allowed. Defaults to 30.
+        slow_call_threshold (float): Seconds after which a successful response is counted as a failure, to shed load
+            from an access point that is degrading. Defaults to None, for no limit.
+    """
+    CLOSED = 'CLOSED'
+    OPEN = 'OPEN'
+    HALF_OPEN = 'HALF_OPEN'
+
+    _registry = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, failure_threshold=5, recovery_timeout=30, slow_call_threshold=None):
+        # type: (int, float, float) -> None
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.slow_call_threshold = slow_call_threshold
+
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_access_point(cls, api_access_point):
+        # type: (str) -> CircuitBreaker
+        """ The CircuitBreaker shared by all accounts on an api_access_point, created with the defaults if needed """
+        with cls._registry_lock:
+            breaker = cls._registry.get(api_access_point)
+            if breaker is None:
+                breaker = cls._registry[api_access_point] = cls()
+            return breaker
+
+    def before_call(self):
+        """ Raises CircuitOpenError if a request should not be made right now """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN and time.time() - self._opened >= self.recovery_timeout:
+                log.debug('Circuit half open, allowing a probe request')
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+        raise CircuitOpenError()
+
+    def record_success(self, duration=0):
+        # type: (float) -> None
+        if self.slow_call_threshold is not None and duration > self.slow_call_threshold:
+            log.debug('Request took {:.1f}s, counting as a failure'.format(duration))
+            self.record_failure()
+            return
+        with self._lock:
+            if self.state != self.CLOSED:
+                log.debug('Circuit closed')
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_ignored(self):
+        """ Record a call which neither succeeded nor failed, such as one cut short by the caller's Deadline, so that
+        another probe may be made if it was the probe """
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    log.warning('Circuit opened after {} consecutive failures'.format(self.failures))
+                self.state = self.OPEN
+                self._opened = time.time()
+                self._probing = False
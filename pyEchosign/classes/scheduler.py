@@ -0,0 +1,165 @@
+import logging
+import threading
+import time
+
+from pyEchosign.utils.rate_limit import TokenBucket
+
+log = logging.getLogger('pyEchosign.' + __name__)
+
+__all__ = ['RequestScheduler']
+
+_local = threading.local()
+
+
+def _priorities():
+    if not hasattr(_local, 'priorities'):
+        _local.priorities = []
+    return _local.priorities
+
+
+class _Priority(object):
+    """ Marks the requests made within a block on the same thread as being of one priority """
+    def __init__(self, priority):
+        # type: (str) -> None
+        self.priority = priority
+
+    def __enter__(self):
+        _priorities().append(self.priority)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        _priorities().pop()
+
+
+class RequestScheduler(object):
+    """ Shares an account's connections and rate budget between interactive and batch requests, so that interactive
+    calls such as :meth:`Agreement.send <pyEchosign.classes.agreement.Agreement.send>` and
+    :meth:`Agreement.get_signing_urls <pyEchosign.classes.agreement.Agreement.get_signing_urls>` don't wait behind
+    archival or reminder jobs.
+
+    Pass a RequestScheduler to :class:`EchosignAccount <pyEchosign.classes.account.EchosignAccount>` as
+    ``scheduler`` (several accounts may share one) and every request waits for one of ``max_concurrent`` slots, and
+    for the rate budget if ``rate`` is given, before it is made. Requests are either:
+
+    * ``RequestScheduler.INTERACTIVE``: Always served before any queued batch request, and may use every slot
+    * ``RequestScheduler.BATCH``: Only served while no interactive request is waiting, and never uses the
+      ``reserved`` slots, which are kept free for interactive requests
+
+    A request made in progress is never interrupted; interactive requests go ahead of batch requests which are still
+    waiting. Requests are interactive unless made within :meth:`priority`. The background work of
+    :class:`AgreementExporter <pyEchosign.classes.exporter.AgreementExporter>`,
+    :class:`PollingScheduler <pyEchosign.classes.polling.PollingScheduler>` and
+    :class:`OutboundQueue <pyEchosign.classes.outbound.OutboundQueue>` is made as batch.
+
+    Example::
+
+        scheduler = RequestScheduler(max_concurrent=8, rate=10)
+        account = EchosignAccount(token, scheduler=scheduler)
+
+        with RequestScheduler.priority(RequestScheduler.BATCH):
+            for agreement in account.get_agreements():
+                agreement.send_reminder()
+
+    Keyword Args:
+        max_concurrent (int): The most requests made at once. Defaults to 4.
+        reserved (int): How many of the slots batch requests may not use. Defaults to 1.
+        rate (float): The most requests started per second, shared by both priorities. Defaults to None, for no
+            limit.
+        burst (float): The most requests which may start at once after a quiet period. Defaults to rate.
+    """
+    INTERACTIVE = 'interactive'
+    BATCH = 'batch'
+
+    def __init__(self, max_concurrent=4, reserved=1, rate=None, burst=None):
+        # type: (int, int, float, float) -> None
+        self.max_concurrent = max_concurrent
+        self.reserved = min(reserved, max_concurrent - 1)
+        self.bucket = TokenBucket(rate, burst) if rate is not None else None
+
+        self._running = 0
+        self._waiting = {self.INTERACTIVE: 0, self.BATCH: 0}
+        self._changed = threading.Condition(threading.Lock())
+
+    @staticmethod
+    def priority(priority):
+        """ A context manager under which requests made on the current thread have a priority, either
+        ``RequestScheduler.INTERACTIVE`` or ``RequestScheduler.BATCH``. May be nested, in which case the innermost
+        applies. """
+        return _Priority(priority)
+
+    @classmethod
+    def current_priority(cls):
+        # type: () -> str
+        """ The priority of requests made on the current thread """
+        priorities = _priorities()
+        return priorities[-1] if priorities else cls.INTERACTIVE
+
+    @classmethod
+    def bind(cls, function):
+        """ Wrap a function so that it runs with the current thread's priority wherever it is called, such as in a
+        worker thread """
+        priority = cls.current_priority()
+
+        def bound(*args, **kwargs):
+            with _Priority(priority):
+                return function(*args, **kwargs)
+        return bound
+
+    @property
+    def running(self):
+        # type: () -> int
+        """ The number of requests being made """
+        return self._running
+
+    def waiting(self, priority):
+        # type: (str) -> int
+        """ The number of requests of a priority waiting for a slot """
+        return self._waiting[priority]
+
+    def _can_start(self, priority):
+        if priority == self.INTERACTIVE:
+            return self._running < self.max_concurrent
+        return self._waiting[self.INTERACTIVE] == 0 and self._running < self.max_concurrent - self.reserved
+
+    def acquire(self, priority=None, timeout=None):
+        # type: (str, float) -> bool
+        """ Wait until a request of a priority may be made, and take a slot for it. Every successful acquire must be
+        followed by a :meth:`release`.
+
+        Args:
+            priority: (optional) The priority of the request. Defaults to :meth:`current_priority`.
+            timeout: (optional) The most seconds to wait
+
+        Returns: False if timeout passed before a slot was taken, otherwise True
+
+        """
+        if priority is None:
+            priority = self.current_priority()
+        expires = time.time() + timeout if timeout is not None else None
+
+        with self._changed:
+            self._waiting[priority] += 1
+            try:
+                while True:
+                    wait = None
+                    if self._can_start(priority):
+                        wait = self.bucket.try_acquire() if self.bucket is not None else 0
+                        if wait == 0:
+                            self._running += 1
+                            return True
+                    if expires is not None:
+                        remaining = expires - time.time()
+                        if remaining <= 0:
+                            return False
+                        wait = min(wait, remaining) if wait is not None else remaining
+                    self._changed.wait(wait)
+            finally:
+                self._waiting[priority] -= 1
+                # Batch requests may be able to start now that this request is no longer waiting
+                self._changed.notify_all()
+
+    def release(self):
+        """ Give back a slot taken by :meth:`acquire` once its request is complete """
+        with self._changed:
+            self._running -= 1
+            self._changed.notify_all()
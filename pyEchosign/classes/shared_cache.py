@@ -0,0 +1,121 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+log = logging.getLogger('pyEchosign.' + __name__)
+
+__all__ = ['SharedCache']
+
+
+class SharedCache(object):
+    """ A cache of API responses which every process on a host can share, such as the pre-forked workers of a web
+    server. Entries are kept in a SQLite database in WAL mode, so readers in any process don't block each other or the
+    writer, and a response fetched by one process is served from the cache to all of them.
+
+    An account with a SharedCache caches its base_uris lookup, library document listings and details, and agreement
+    documents lists, keyed by the URL and the account's :attr:`cache_identity
+    <pyEchosign.classes.account.EchosignAccount.cache_identity>`, so one tenant is never served another's data and
+    entries outlive a refresh of the access token.
+
+    The cache may be created before the processes are forked: each process opens its own connection on first use.
+
+    Args:
+        path: The SQLite database file to use. Created if it does not exist.
+
+    Keyword Args:
+        ttl (float): Seconds after which an entry is fetched again. Defaults to an hour. None for no expiry.
+    """
+    # How many writes are made between removals of expired entries
+    PURGE_INTERVAL = 100
+
+    def __init__(self, path, ttl=60 * 60):
+        # type: (str, float) -> None
+        self.path = path
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._db = None
+        self._pid = None
+        self._writes = 0
+
+        with self._lock:
+            with self._connection() as db:
+                db.execute('CREATE TABLE IF NOT EXISTS entries '
+                           '(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL)')
+
+    @staticmethod
+    def key(url, identity):
+        # type: (str, str) -> str
+        """ The key the response for a URL is cached under, for the :attr:`cache_identity
+        <pyEchosign.classes.account.EchosignAccount.cache_identity>` of the account requesting it """
+        return hashlib.sha256('{}\n{}'.format(identity, url).encode('utf-8')).hexdigest()
+
+    def _connection(self):
+        """ This process's connection to the database. Must be called with the lock held. """
+        if self._pid != os.getpid():
+            # A connection inherited across a fork must not be used by the child
+            self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._pid = os.getpid()
+        return self._db
+
+    def __len__(self):
+        with self._lock:
+            return self._connection().execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+    def get(self, key):
+        """ The value cached under key, or None if there is none or it has expired """
+        with self._lock:
+            row = self._connection().execute('SELECT value, expires FROM entries WHERE key = ?', (key, )).fetchone()
+        if row is None:
+            return None
+        value, expires = row
+        if expires is not None and expires < time.time():
+            return None
+        return json.loads(value)
+
+    def set(self, key, value, ttl=None):
+        """ Cache a JSON serialisable value under key.
+
+        Args:
+            ttl: (optional) Seconds until the entry expires, overriding the cache's ttl
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            with self._connection() as db:
+                db.execute('INSERT OR REPLACE INTO entries (key, value, expires) VALUES (?, ?, ?)',
+                           (key, json.dumps(value), expires))
+            self._writes += 1
+            if self._writes % self.PURGE_INTERVAL == 0:
+                self._purge()
+
+    def get_or_set(self, key, fetch):
+        """ The value cached under key, or the result of calling fetch, which is then cached """
+        value = self.get(key)
+        if value is None:
+            value = fetch()
+            if value is not None:
+                self.set(key, value)
+        else:
+            log.debug('Serving {} from shared cache'.format(key))
+        return value
+
+    def invalidate(self, key):
+        with self._lock:
+            with self._connection() as db:
+                db.execute('DELETE FROM entries WHERE key = ?', (key, ))
+
+    def clear(self):
+        """ Remove every entry, for every process """
+        with self._lock:
+            with self._connection() as db:
+                db.execute('DELETE FROM entries')
+
+    def _purge(self):
+        with self._connection() as db:
+            db.execute('DELETE FROM entries WHERE expires < ?', (time.time(), ))
@@ -0,0 +1,236 @@
+import logging
+import os
+import struct
+import time
+import zlib
+from typing import TYPE_CHECKING, List
+
+from pyEchosign.exceptions.internal import InvalidSnapshot
+from pyEchosign.utils.lazy import arrow
+from pyEchosign.utils.utils import replace_file
+
+log = logging.getLogger('pyEchosign.' + __name__)
+
+if TYPE_CHECKING:
+    from .account import EchosignAccount
+    from .agreement import Agreement
+    from .library_document import LibraryDocument
+
+__all__ = ['Snapshot']
+
+_MAGIC = b'PYES'
+_HEADER = struct.Struct('>4sHd')
+_COUNT = struct.Struct('>I')
+_AGREEMENT = struct.Struct('>IIIdhH')  # echosign_id, name, status, timestamp, UTC offset (minutes), user count
+_USER = struct.Struct('>III')  # email, full_name, company
+_LIBRARY_DOCUMENT = struct.Struct('>IIIdhH')  # echosign_id, name, scope, timestamp, UTC offset, template type count
+_INDEX = struct.Struct('>I')
+
+# Dates are stored as a timestamp and UTC offset, with NaN for no date
+_NO_DATE = float('nan')
+
+
+class _Writer(object):
+    """ Packs records, storing each distinct string once in a table and referring to it by index """
+    def __init__(self):
+        self.strings = [None]
+        self.indexes = {None: 0}
+        self.records = []
+
+    def string(self, value):
+        index = self.indexes.get(value)
+        if index is None:
+            index = self.indexes[value] = len(self.strings)
+            self.strings.append(value)
+        return index
+
+    def pack(self, record, *values):
+        self.records.append(record.pack(*values))
+
+    def getvalue(self):
+        table = [_COUNT.pack(len(self.strings) - 1)]
+        for value in self.strings[1:]:
+            encoded = value.encode('utf-8')
+            table.append(_COUNT.pack(len(encoded)))
+            table.append(encoded)
+        return b''.join(table + self.records)
+
+
+class _Reader(object):
+    def __init__(self, data):
+        self.data = data
+        self.offset = 0
+        self.strings = [None]
+
+        for _ in range(self.unpack(_COUNT)[0]):
+            length = self.unpack(_COUNT)[0]
+            self.strings.append(data[self.offset:self.offset + length].decode('utf-8'))
+            self.offset += length
+
+    def unpack(self, record):
+        values = record.unpack_from(self.data, self.offset)
+        self.offset += record.size
+        return values
+
+
+def _pack_date(date):
+    """ The timestamp and UTC offset in minutes of a date, datetime or Arrow """
+    if date is None:
+        return _NO_DATE, 0
+    date = arrow.get(date)
+    return date.float_timestamp, int(date.utcoffset().total_seconds() // 60)
+
+
+class Snapshot(object):
+    """ A compact binary snapshot of agreement and library document listings, including their users and parsed dates,
+    which can be saved to a file and loaded by another process much faster than the listings can be requested and
+    parsed again.
+
+    A process can therefore start warm from a snapshot, then bring it up to date with a fresh listing, such as by
+    updating an :class:`AgreementCollection <pyEchosign.classes.collection.AgreementCollection>` built from the
+    snapshot.
+
+    Example::
+
+        Snapshot(agreements=account.get_agreements()).save('agreements.snapshot')
+
+        # In another process
+        snapshot = Snapshot.load(account, 'agreements.snapshot')
+        agreements = snapshot.agreements
+
+    Snapshot files start with a format version, and loading a file written in a different version raises
+    :class:`InvalidSnapshot <pyEchosign.exceptions.internal.InvalidSnapshot>` rather than returning wrong data.
+
+    Keyword Args:
+        agreements: The :class:`Agreements <pyEchosign.classes.agreement.Agreement>` to snapshot
+        library_documents: The :class:`LibraryDocuments <pyEchosign.classes.library_document.LibraryDocument>` to
+            snapshot
+        created (float): When the listings were retrieved, as a UNIX timestamp. Defaults to now.
+
+    Attributes:
+        agreements: The snapshot's agreements
+        library_documents: The snapshot's library documents
+        created: When the listings were retrieved, as a UNIX timestamp
+    """
+    VERSION = 1
+
+    def __init__(self, agreements=None, library_documents=None, created=None):
+        # type: (List[Agreement], List[LibraryDocument], float) -> None
+        self.agreements = list(agreements or [])
+        self.library_documents = list(library_documents or [])
+        self.created = created if created is not None else time.time()
+
+    @property
+    def age(self):
+        # type: () -> float
+        """ Seconds since the listings were retrieved """
+        return time.time() - self.created
+
+    def dumps(self):
+        # type: () -> bytes
+        """ The snapshot as bytes """
+        writer = _Writer()
+        string = writer.string
+
+        writer.pack(_COUNT, len(self.agreements))
+        for agreement in self.agreements:
+            timestamp, offset = _pack_date(agreement.date)
+            writer.pack(_AGREEMENT, string(agreement.echosign_id), string(agreement.name),
+                        string(getattr(agreement, 'status', None)), timestamp, offset, len(agreement.users))
+            for user in agreement.users:
+                writer.pack(_USER, string(user.email), string(user.full_name), string(user.company))
+
+        writer.pack(_COUNT, len(self.library_documents))
+        for document in self.library_documents:
+            timestamp, offset = _pack_date(document.modified_date)
+            flags = (('DOCUMENT', document.document), ('FORM_FIELD_LAYER', document.form_field_layer))
+            template_types = [template_type for template_type, flag in flags if flag]
+            writer.pack(_LIBRARY_DOCUMENT, string(document.echosign_id), string(document.name),
+                        string(document.scope), timestamp, offset, len(template_types))
+            for template_type in template_types:
+                writer.pack(_INDEX, string(template_type))
+
+        return _HEADER.pack(_MAGIC, self.VERSION, self.created) + zlib.compress(writer.getvalue())
+
+    @classmethod
+    def loads(cls, account, data):
+        # type: (EchosignAccount, bytes) -> Snapshot
+        """ Build a snapshot from bytes returned by :meth:`dumps`, associating its agreements and library documents
+        with an account """
+        from dateutil.tz import tzoffset
+
+        from .agreement import Agreement
+        from .library_document import LibraryDocument
+        from .participants import ParticipantIndex
+
+        if len(data) < _HEADER.size:
+            raise InvalidSnapshot('Snapshot is truncated')
+        magic, version, created = _HEADER.unpack_from(data)
+        if magic != _MAGIC:
+            raise InvalidSnapshot('Not a pyEchosign snapshot')
+        if version != cls.VERSION:
+            raise InvalidSnapshot('Snapshot is version {}, expected version {}'.format(version, cls.VERSION))
+
+        try:
+            reader = _Reader(zlib.decompress(data[_HEADER.size:]))
+        except (zlib.error, struct.error, UnicodeDecodeError) as e:
+            raise InvalidSnapshot('Snapshot is corrupt: {}'.format(e))
+        strings = reader.strings
+        timezones = {}
+        participants = ParticipantIndex.for_account(account)
+
+        def to_date(timestamp, offset):
+            if timestamp != timestamp:
+                return None
+            timezone = timezones.get(offset)
+            if timezone is None:
+                timezone = timezones[offset] = tzoffset(None, offset * 60)
+            return arrow.Arrow.fromtimestamp(timestamp, tzinfo=timezone)
+
+        try:
+            agreements = []
+            for _ in range(reader.unpack(_COUNT)[0]):
+                echosign_id, name, status, timestamp, offset, user_count = reader.unpack(_AGREEMENT)
+                agreement = Agreement(account, echosign_id=strings[echosign_id], name=strings[name],
+                                      status=strings[status], date=to_date(timestamp, offset))
+                users = []
+                for _ in range(user_count):
+                    email, full_name, company = reader.unpack(_USER)
+                    users.append(participants.user(strings[email], full_name=strings[full_name],
+                                                   company=strings[company]))
+                agreement.users = users
+                agreements.append(agreement)
+
+            library_documents = []
+            for _ in range(reader.unpack(_COUNT)[0]):
+                echosign_id, name, scope, timestamp, offset, type_count = reader.unpack(_LIBRARY_DOCUMENT)
+                template_types = [strings[reader.unpack(_INDEX)[0]] for _ in range(type_count)]
+                modified_date = to_date(timestamp, offset)
+                library_documents.append(LibraryDocument(account, strings[echosign_id], template_types, strings[name],
+                                                         modified_date.datetime if modified_date else None,
+                                                         strings[scope]))
+        except (struct.error, IndexError) as e:
+            raise InvalidSnapshot('Snapshot is corrupt: {}'.format(e))
+
+        return cls(agreements, library_documents, created)
+
+    def save(self, path):
+        # type: (str) -> None
+        """ Write the snapshot to a file. The file is replaced atomically, so readers never see a partial snapshot. """
+        partial = path + '.part'
+        with open(partial, 'wb') as file:
+            file.write(self.dumps())
+            file.flush()
+            os.fsync(file.fileno())
+        replace_file(partial, path)
+        log.debug('Saved snapshot of {} agreements and {} library documents to {}'.format(
+            len(self.agreements), len(self.library_documents), path))
+
+    @classmethod
+    def load(cls, account, path):
+        # type: (EchosignAccount, str) -> Snapshot
+        """ Read a snapshot written by :meth:`save`, associating its agreements and library documents with an
+        account """
+        with open(path, 'rb') as file:
+            return cls.loads(account, file.read())
+
@@ -0,0 +1,233 @@
+import logging
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Set
+
+from pyEchosign.classes.exporter import ExportProgress
+
+log = logging.getLogger('pyEchosign.' + __name__)
+
+if TYPE_CHECKING:
+    from .account import EchosignAccount
+    from .agreement import Agreement
+
+__all__ = ['ShardedSync', 'SyncProgress']
+
+
+class SyncProgress(ExportProgress):
+    """ Throughput of a :class:`ShardedSync <pyEchosign.classes.sync.ShardedSync>` run. Has the attributes of
+    :class:`ExportProgress <pyEchosign.classes.exporter.ExportProgress>`, with failed mapping agreement IDs to the
+    message of the error raised while syncing them. """
+    def __str__(self):
+        eta = self.eta
+        return 'Synced {}/{} agreements ({} failed), {:.2f} agreements/s, ETA {}'.format(
+            self.completed, self.total, len(self.failed), self.rate,
+            '{:.0f}s'.format(eta) if eta is not None else 'unknown')
+
+
+class _Checkpoint(object):
+    """ The agreements completed by a sync, kept in a SQLite database every worker process writes to """
+    def __init__(self, path):
+        # type: (str) -> None
+        self.path = path
+        self._db = None
+        self._pid = None
+        self._lock = threading.Lock()
+        with self._lock:
+            with self._connection() as db:
+                db.execute('CREATE TABLE IF NOT EXISTS completed '
+                           '(agreement_id TEXT PRIMARY KEY, shard INTEGER NOT NULL, completed REAL NOT NULL)')
+
+    def _connection(self):
+        """ This process's connection to the database. Must be called with the lock held. """
+        if self._pid != os.getpid():
+            self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._pid = os.getpid()
+        return self._db
+
+    def __getstate__(self):
+        # Only the path is sent to worker processes, which open their own connection
+        return dict(path=self.path)
+
+    def __setstate__(self, state):
+        self.__init__(state['path'])
+
+    def completed(self):
+        # type: () -> Set[str]
+        with self._lock:
+            return set(row[0] for row in self._connection().execute('SELECT agreement_id FROM completed'))
+
+    def count(self):
+        # type: () -> int
+        with self._lock:
+            return self._connection().execute('SELECT COUNT(*) FROM completed').fetchone()[0]
+
+    def mark(self, agreement_id, shard):
+        # type: (str, int) -> None
+        with self._lock:
+            with self._connection() as db:
+                db.execute('INSERT OR REPLACE INTO completed (agreement_id, shard, completed) VALUES (?, ?, ?)',
+                           (agreement_id, shard, time.time()))
+
+    def clear(self):
+        with self._lock:
+            with self._connection() as db:
+                db.execute('DELETE FROM completed')
+
+
+def _sync_shard(account_factory, handler, checkpoint, shard, agreements_data):
+    """ Sync one shard's agreements in a worker process. Returns a dict of agreement ID to error message for those
+    which failed. """
+    from .agreement import Agreement
+
+    account = account_factory()
+    failed = {}
+    for data in agreements_data:
+        echosign_id = data.get('agreementId')
+        try:
+            handler(Agreement.json_to_agreement(account, data))
+        except Exception as e:
+            log.error('Failed to sync agreement {}: {}'.format(echosign_id, e))
+            failed[echosign_id] = '{}: {}'.format(type(e).__name__, e)
+        else:
+            checkpoint.mark(echosign_id, shard)
+    return failed
+
+
+class ShardedSync(object):
+    """ Syncs the agreements of an account across a pool of processes, so that parsing, building agreements and
+    post-processing them (such as downloading their documents) scale with the number of cores rather than contending
+    for one interpreter.
+
+    Agreement IDs are partitioned into one shard per process by a stable hash, and each process makes its own
+    account, and so its own connections, with ``account_factory``. Every agreement ``handler`` completes is recorded
+    in a checkpoint database shared by the processes, so a run which is interrupted, or in which some agreements
+    fail, can simply be started again and only syncs the agreements not yet completed.
+
+    ``account_factory`` and ``handler`` are called in other processes, so must be functions defined at the top level
+    of a module.
+
+    Example::
+
+        def make_account():
+            return EchosignAccount(os.environ['ECHOSIGN_TOKEN'])
+
+        def archive(agreement):
+            for document in agreement.documents:
+                ...
+
+        progress = ShardedSync(make_account, archive, '/var/lib/myapp/sync.sqlite3').run()
+
+    Args:
+        account_factory: A function returning the :class:`EchosignAccount
+            <pyEchosign.classes.account.EchosignAccount>` to sync with. Called once in this process to list
+            agreements and once in each worker process.
+        handler: A function called with each :class:`Agreement <pyEchosign.classes.agreement.Agreement>` to sync.
+            The agreement is recorded as completed once it returns.
+        checkpoint: The path of the checkpoint database
+
+    Keyword Args:
+        processes (int): How many shards, and worker processes, to sync with. Defaults to the number of CPUs.
+        query (str): A search query used to filter agreements, as in :meth:`EchosignAccount.get_agreements
+            <pyEchosign.classes.account.EchosignAccount.get_agreements>`
+        statuses (tuple): Only agreements with one of these :class:`Agreement.Status
+            <pyEchosign.classes.agreement.Agreement.Status>` are synced. Defaults to None, for every agreement.
+        progress_interval (float): Seconds between progress updates while the workers run. Defaults to 1.
+    """
+    def __init__(self, account_factory, handler, checkpoint, processes=None, query=None, statuses=None,
+                 progress_interval=1.0):
+        # type: (Callable[[], EchosignAccount], Callable[[Agreement], None], str, int, str, tuple, float) -> None
+        self.account_factory = account_factory
+        self.handler = handler
+        self.checkpoint = _Checkpoint(checkpoint)
+        self.processes = processes if processes is not None else multiprocessing.cpu_count()
+        self.query = query
+        self.statuses = statuses
+        self.progress_interval = progress_interval
+
+    def shard(self, agreement_id):
+        # type: (str) -> int
+        """ The shard an agreement ID belongs to. The same in every process and run. """
+        return (zlib.crc32(agreement_id.encode('utf-8')) & 0xffffffff) % self.processes
+
+    def completed_ids(self):
+        # type: () -> Set[str]
+        """ The IDs of the agreements completed by this and earlier runs """
+        return self.checkpoint.completed()
+
+    def reset(self):
+        """ Forget every completed agreement, so the next run syncs them all again """
+        self.checkpoint.clear()
+
+    def partition(self, agreements_data):
+        # type: (Iterable[dict]) -> Dict[int, list]
+        """ Split the JSON of agreements into shards, as a dict of shard to the agreements in it """
+        shards = {}
+        for data in agreements_data:
+            shards.setdefault(self.shard(data['agreementId']), []).append(data)
+        return shards
+
+    def pending(self):
+        """ The JSON of the agreements which still need to be synced, and the number skipped because an earlier run
+        completed them """
+        completed = self.completed_ids()
+        agreements = self.account_factory().get_agreements(self.query, raw=True)
+        if self.statuses is not None:
+            agreements = [agreement for agreement in agreements if agreement.status in self.statuses]
+        pending = [agreement.data for agreement in agreements if agreement.echosign_id not in completed]
+        return pending, len(agreements) - len(pending)
+
+    def run(self, progress_callback=None):
+        # type: (Callable[[SyncProgress], None]) -> SyncProgress
+        """ Sync every pending agreement.
+
+        Args:
+            progress_callback: (optional) Called with a :class:`SyncProgress` every progress_interval while the
+                workers run, and once they have all finished
+
+        Returns: The :class:`SyncProgress` of the completed run
+
+        """
+        from concurrent.futures import ProcessPoolExecutor, wait
+
+        pending, skipped = self.pending()
+        progress = SyncProgress(len(pending), skipped)
+        shards = self.partition(pending)
+        log.info('Syncing {} agreements in {} shards, {} already synced'.format(progress.total, len(shards), skipped))
+
+        completed_before = self.checkpoint.count()
+        executor = ProcessPoolExecutor(max_workers=max(1, len(shards)))
+        try:
+            futures = dict((executor.submit(_sync_shard, self.account_factory, self.handler, self.checkpoint, shard,
+                                            agreements_data), shard) for shard, agreements_data in shards.items())
+            not_done = set(futures)
+            while not_done:
+                done, not_done = wait(not_done, timeout=self.progress_interval)
+                for future in done:
+                    self._collect(future, shards[futures[future]], progress)
+                progress.completed = self.checkpoint.count() - completed_before
+                if not_done and progress_callback is not None:
+                    progress_callback(progress)
+        finally:
+            executor.shutdown(wait=True)
+
+        log.info(str(progress))
+        if progress_callback is not None:
+            progress_callback(progress)
+        return progress
+
+    def _collect(self, future, agreements_data, progress):
+        try:
+            progress.failed.update(future.result())
+        except Exception as e:
+            # The worker process died, so the shard's agreements it didn't complete are failed
+            log.error('Sync worker failed: {}'.format(e))
+            completed = self.completed_ids()
+            for data in agreements_data:
+                if data['agreementId'] not in completed:
+                    progress.failed[data['agreementId']] = '{}: {}'.format(type(e).__name__, e)
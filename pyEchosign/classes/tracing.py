@@ -0,0 +1,306 @@
+import functools
+import json
+import logging
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Callable, Dict, List
+
+log = logging.getLogger('pyEchosign.' + __name__)
+
+__all__ = ['Tracer', 'Span', 'SpanCollector', 'JsonLinesExporter']
+
+_tracer = None
+_local = threading.local()
+
+
+def _stack():
+    if not hasattr(_local, 'spans'):
+        _local.spans = []
+    return _local.spans
+
+
+class Span(object):
+    """ One timed operation, such as an HTTP call or :meth:`Agreement.send
+    <pyEchosign.classes.agreement.Agreement.send>`. Spans opened while another is open on the same thread are its
+    children, and share its trace_id.
+
+    Attributes:
+        name: What the operation was, such as 'Agreement.send' or 'http'
+        trace_id: The ID shared by the outermost span and everything within it
+        span_id: The ID of this span
+        parent_id: The span_id of the enclosing span, or None for the outermost span
+        start: When the span opened, as a UNIX timestamp
+        end: When the span closed, or None while it is open
+        attributes: Details of the operation, such as agreement_id, document_id, url or status_code
+        error: The exception the operation raised, formatted as a string, if any
+        profile: For spans that took longer than the tracer's slow_threshold, a dict of sampled call stacks (as
+            semicolon separated frames, outermost first) to how many times each was sampled. None otherwise.
+    """
+    def __init__(self, name, parent=None, **attributes):
+        # type: (str, Span) -> None
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.trace_id = parent.trace_id if parent is not None else uuid.uuid4().hex
+        self.parent_id = parent.span_id if parent is not None else None
+        self.start = time.time()
+        self.end = None
+        self.attributes = dict((key, value) for key, value in attributes.items() if value is not None)
+        self.error = None
+        self.profile = None
+        self.thread_id = threading.current_thread().ident
+
+    def __repr__(self):
+        return 'Span: {} ({})'.format(self.name, self.span_id)
+
+    @property
+    def duration(self):
+        # type: () -> float
+        """ How long the span was open in seconds, or has been so far if it is still open """
+        return (self.end if self.end is not None else time.time()) - self.start
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def to_dict(self):
+        # type: () -> dict
+        return dict(name=self.name, trace_id=self.trace_id, span_id=self.span_id, parent_id=self.parent_id,
+                    start=self.start, end=self.end, duration=self.duration, attributes=self.attributes,
+                    error=self.error, profile=dict(self.profile) if self.profile is not None else None)
+
+
+class SpanCollector(object):
+    """ Keeps finished spans in memory, for inspection in tests or a debugging endpoint.
+
+    Keyword Args:
+        max_spans (int): How many of the most recent spans are kept. Defaults to 10000.
+    """
+    def __init__(self, max_spans=10000):
+        # type: (int) -> None
+        self._spans = deque(maxlen=max_spans)
+
+    def export(self, span):
+        # type: (Span) -> None
+        self._spans.append(span)
+
+    @property
+    def spans(self):
+        # type: () -> List[Span]
+        """ The collected spans, in the order they finished """
+        return list(self._spans)
+
+    def clear(self):
+        self._spans.clear()
+
+
+class JsonLinesExporter(object):
+    """ Appends each finished span to a file as one line of JSON.
+
+    Args:
+        path: The file to append to
+    """
+    def __init__(self, path):
+        # type: (str) -> None
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        # type: (Span) -> None
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            with open(self.path, 'a') as file:
+                file.write(line + '\n')
+
+
+class Tracer(object):
+    """ Records nested :class:`Spans <Span>` around pyEchosign's operations and HTTP calls while installed, and passes
+    each to its exporters once it finishes. Spans carry the IDs of the agreements and documents involved, so a slow
+    upload, send and signing URL flow can be broken down step by step. Nothing is recorded while no tracer is installed.
+
+    Example::
+
+        collector = SpanCollector()
+        Tracer([collector, JsonLinesExporter('spans.jsonl')], slow_threshold=2).install()
+
+    Args:
+        exporters: Objects with an ``export(span)`` method, such as a :class:`SpanCollector` or
+            :class:`JsonLinesExporter`
+
+    Keyword Args:
+        slow_threshold (float): Seconds after which an open span is profiled, by sampling the call stack of its thread
+            every ``sample_interval`` seconds. The samples are attached to the span as its ``profile``. Defaults to
+            None, for no profiling.
+        sample_interval (float): Seconds between samples of slow spans. Defaults to 0.01.
+        on_slow_span: (optional) Called with each span that took longer than slow_threshold, once it finishes
+    """
+    def __init__(self, exporters=(), slow_threshold=None, sample_interval=0.01, on_slow_span=None):
+        # type: (list, float, float, Callable[[Span], None]) -> None
+        self.exporters = list(exporters)
+        self.slow_threshold = slow_threshold
+        self.sample_interval = sample_interval
+        self.on_slow_span = on_slow_span
+
+        self._open = {}  # type: Dict[str, Span]
+        self._lock = threading.Lock()
+        self._sampler = None
+
+    def install(self):
+        # type: () -> Tracer
+        """ Make this the tracer spans are recorded with, replacing any other """
+        global _tracer
+        _tracer = self
+        return self
+
+    def uninstall(self):
+        """ Stop recording spans, if this is the installed tracer """
+        global _tracer
+        if _tracer is self:
+            _tracer = None
+
+    def start_span(self, name, **attributes):
+        # type: (str) -> Span
+        stack = _stack()
+        span = Span(name, stack[-1] if stack else None, **attributes)
+        stack.append(span)
+        if self.slow_threshold is not None:
+            with self._lock:
+                self._open[span.span_id] = span
+                if self._sampler is None:
+                    self._sampler = threading.Thread(target=self._sample, name='pyEchosign span sampler')
+                    self._sampler.daemon = True
+                    self._sampler.start()
+        return span
+
+    def finish_span(self, span):
+        # type: (Span) -> None
+        span.end = time.time()
+        stack = _stack()
+        if span in stack:
+            stack.remove(span)
+        if self.slow_threshold is not None:
+            with self._lock:
+                self._open.pop(span.span_id, None)
+            if span.duration > self.slow_threshold and self.on_slow_span is not None:
+                self.on_slow_span(span)
+
+        for exporter in self.exporters:
+            try:
+                exporter.export(span)
+            except Exception:
+                log.exception('Failed to export span {}'.format(span))
+
+    def _sample(self):
+        while True:
+            time.sleep(self.sample_interval)
+            with self._lock:
+                if not self._open:
+                    self._sampler = None
+                    return
+                now = time.time()
+                slow = [span for span in self._open.values() if now - span.start > self.slow_threshold]
+            if not slow:
+                continue
+
+            frames = sys._current_frames()
+            samples = []
+            for span in slow:
+                frame = frames.get(span.thread_id)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append('{}:{}:{}'.format(code.co_filename, frame.f_lineno, code.co_name))
+                    frame = frame.f_back
+                samples.append((span, ';'.join(reversed(stack))))
+
+            with self._lock:
+                for span, key in samples:
+                    # A span which finished since the stacks were sampled is being exported, so is left as it is
+                    if span.span_id not in self._open:
+                        continue
+                    if span.profile is None:
+                        span.profile = {}
+                    span.profile[key] = span.profile.get(key, 0) + 1
+
+
+class _NoSpan(object):
+    """ Stands in for a span while no tracer is installed """
+    def set_attribute(self, key, value):
+        pass
+
+
+_no_span = _NoSpan()
+
+
+class trace(object):
+    """ A context manager recording a span with the installed tracer, if any.
+
+    Args:
+        name: The name of the span
+        **attributes: Attributes of the span, such as agreement_id. Those which are None are left out.
+    """
+    def __init__(self, name, **attributes):
+        self.name = name
+        self.attributes = attributes
+        self.span = None
+        self.tracer = None
+
+    def __enter__(self):
+        self.tracer = _tracer
+        if self.tracer is None:
+            return _no_span
+        self.span = self.tracer.start_span(self.name, **self.attributes)
+        return self.span
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.span is not None:
+            if exc_val is not None:
+                self.span.error = '{}: {}'.format(exc_type.__name__, exc_val)
+            self.tracer.finish_span(self.span)
+
+
+def traced(name, **attribute_getters):
+    """ Decorates a method so each call is recorded in a span.
+
+    Args:
+        name: The name of the span
+        **attribute_getters: Functions taking the method's self and returning an attribute of the span, such as
+            ``agreement_id=lambda agreement: agreement.echosign_id``
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if _tracer is None:
+                return method(self, *args, **kwargs)
+            attributes = dict((key, getter(self)) for key, getter in attribute_getters.items())
+            with trace(name, **attributes):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_span():
+    """ The innermost open span on this thread, or a stand-in which ignores attributes if there is none """
+    stack = _stack()
+    return stack[-1] if stack else _no_span
+
+
+def bind(function):
+    """ Wrap a function so that spans it opens are children of the current span, wherever it is called, such as in a
+    worker thread. Returns the function unchanged if no span is open. """
+    stack = _stack()
+    if not stack:
+        return function
+    parent = stack[-1]
+
+    def bound(*args, **kwargs):
+        spans = _stack()
+        spans.append(parent)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            spans.remove(parent)
+    return bound
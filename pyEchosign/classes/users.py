@@ -41,23 +41,31 @@ class User(object):
             return self.email
 
     @classmethod
-    def json_to_user(cls, user_data, agreement=None):
+    def json_to_user(cls, user_data, agreement=None, participants=None):
+        """ Build a User from a DisplayUserInfo. If a :class:`ParticipantIndex
+        <pyEchosign.classes.participants.ParticipantIndex>` is provided, the User it holds for the email is returned
+        instead of a new one. """
         email = user_data.get('email')
         name = user_data.get('fullName', None)
         company = user_data.get('company', None)
+        if participants is not None:
+            return participants.user(email, full_name=name, company=company)
         user = User(email, full_name=name, company=company, agreement=agreement)
         return user
 
     @classmethod
-    def json_to_users(cls, user_data, agreement=None):
-        return [cls.json_to_user(data, agreement) for data in user_data]
+    def json_to_users(cls, user_data, agreement=None, participants=None):
+        return [cls.json_to_user(data, agreement, participants) for data in user_data]
 
     @property
     def signing_url(self):
         if self._signing_url is None:
             if self.agreement is None:
                 raise MissingAgreement('An agreement must be tied to this User in order to retrieve the signing URL')
-            self.agreement.get_signing_urls()
+            # Users of the same agreement wait for one request for all of their signing URLs
+            with self.agreement._lock:
+                if self._signing_url is None:
+                    self.agreement.get_signing_urls()
 
         return self._signing_url
 
@@ -3,7 +3,25 @@ from pyEchosign.exceptions.echosign import BaseEchosignException
 
 class ApiError(BaseEchosignException):
     base_echosign_error = 'Received an error HTTP response code from the Echosign API'
+    # The HTTP status code received, if the error was raised for a response
+    status_code = None
 
 
 class MissingAgreement(BaseEchosignException):
     base_echosign_error = 'An agreement is required'
+
+
+class DeadlineExceeded(BaseEchosignException):
+    base_echosign_error = 'The deadline for this operation passed before it could be completed'
+
+
+class CircuitOpenError(BaseEchosignException):
+    base_echosign_error = 'Requests to this Echosign API access point are failing, so the request was not made'
+
+
+class InvalidSnapshot(BaseEchosignException, ValueError):
+    base_echosign_error = 'The snapshot could not be read'
+
+
+class QuotaExceeded(BaseEchosignException):
+    base_echosign_error = 'The transaction quota for this account has been used up'
@@ -0,0 +1,14 @@
+def cached(account, url, fetch):
+    """ The result of fetch, served from the account's :class:`SharedCache
+    <pyEchosign.classes.shared_cache.SharedCache>` if it has one and the response for url is cached there.
+
+    Args:
+        account: The :class:`EchosignAccount <pyEchosign.classes.account.EchosignAccount>` making the request
+        url: The URL fetch requests, used with the account's cache_identity as the cache key
+        fetch: A function which makes the request and returns its JSON serialisable result
+
+    """
+    cache = account.cache
+    if cache is None:
+        return fetch()
+    return cache.get_or_set(cache.key(url, account.cache_identity), fetch)
@@ -0,0 +1,84 @@
+import threading
+
+from pyEchosign.exceptions.internal import DeadlineExceeded
+
+
+class _Call(object):
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight(object):
+    """ Ensures only one call is in flight per key. Callers arriving while a call for their key is in progress wait
+    for it and receive its result (or exception), rather than making the call again. """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, function, timeout=None, share=None):
+        """ Call function, unless a call for key is already in flight, in which case wait for and return its result.
+
+        Args:
+            key: Identifies calls which may share a result
+            function: Makes the call
+            timeout: (optional) The most seconds to wait for a call already in flight
+            share: (optional) Called with the result when other callers waited for it, returning what every caller
+                receives instead. A result nobody else waited for is returned as it is.
+
+        Raises:
+            DeadlineExceeded: If timeout passed while waiting for a call already in flight
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+
+        if not leader:
+            if not call.event.wait(max(timeout, 0) if timeout is not None else None):
+                raise DeadlineExceeded()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        result = None
+        try:
+            result = function()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            # No caller can join once the call is removed, so the number waiting is final
+            if call.error is None and call.waiters and share is not None:
+                result = share(result)
+            call.result = result
+            call.event.set()
+
+        return result
+
+
+class SharedResponse(object):
+    """ Wraps a response shared between several callers, so that its JSON is only decoded once. The decoded JSON is
+    shared too, and should be treated as read-only. """
+    def __init__(self, response):
+        self._response = response
+        self._json = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, item):
+        return getattr(self._response, item)
+
+    def json(self, **kwargs):
+        if kwargs:
+            return self._response.json(**kwargs)
+        with self._lock:
+            if self._json is None:
+                self._json = self._response.json()
+            return self._json
@@ -0,0 +1,38 @@
+from pyEchosign.utils.handle_response import check_error, write_response
+from pyEchosign.utils.request_parameters import get_headers
+
+
+def download(account, endpoint, file, final=False):
+    """ Streams the file at an API endpoint into a file-like object. If the account has a
+    :class:`BlobStore <pyEchosign.classes.blob_store.BlobStore>`, a previously downloaded copy is used instead of
+    requesting it again, and new downloads are added to the store. Files which may still change are only stored if the
+    store has a ttl.
+
+    Args:
+        account: The :class:`EchosignAccount <pyEchosign.classes.account.EchosignAccount>` to download with
+        endpoint: The full URL of the file
+        file: A file-like object opened for writing bytes
+        final: Whether the file will no longer change, such as the documents of a signed agreement
+
+    Returns: The number of bytes written
+
+    """
+    store = account.blob_store
+    key = None
+
+    if store is not None and not final and store.ttl is None:
+        store = None
+
+    if store is not None:
+        key = store.key(endpoint, account.cache_identity)
+        written = store.copy_to(key, file)
+        if written is not None:
+            return written
+
+    response = account.request('get', endpoint, headers=get_headers(account.access_token), stream=True)
+    check_error(response)
+
+    if store is not None:
+        return store.store_response(key, response, file)
+
+    return write_response(response, file)
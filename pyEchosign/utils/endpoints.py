@@ -1,3 +1,5 @@
 BASE_URIS = 'https://api.echosign.com/api/rest/v5/base_uris'
 
 API_URL_EXTENSION = 'api/rest/v5/'
+
+OAUTH_REFRESH = 'oauth/refresh'
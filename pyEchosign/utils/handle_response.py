@@ -1,8 +1,11 @@
-from requests import Response
+from typing import TYPE_CHECKING
 
 from pyEchosign.exceptions.echosign import PermissionDenied
 from pyEchosign.exceptions.internal import ApiError
 
+if TYPE_CHECKING:
+    from requests import Response
+
 
 def check_error(response):
     # type: (Response) -> None
@@ -16,10 +19,27 @@ def check_error(response):
             json_response = response.json()
         except ValueError:
             json_response = ''
-        raise ApiError('Received status code {} from the Echosign API with the following JSON: "{}" and content: "{}"'
-                       .format(response.status_code, json_response, response.content))
+        error = ApiError('Received status code {} from the Echosign API with the following JSON: "{}" and content: '
+                         '"{}"'.format(response.status_code, json_response, response.content))
+        error.status_code = response.status_code
+        raise error
 
 
 def response_success(response):
     # type: (Response) -> bool
     return 199 < response.status_code < 300
+
+
+def write_response(response, file, chunk_size=64 * 1024):
+    # type: (Response, object, int) -> int
+    """ Writes the body of a response requested with stream=True to a file in chunks, rather than reading it into
+    memory all at once. Returns the number of bytes written. """
+    written = 0
+    try:
+        for chunk in response.iter_content(chunk_size):
+            if chunk:
+                file.write(chunk)
+                written += len(chunk)
+    finally:
+        response.close()
+    return written
@@ -0,0 +1,107 @@
+import codecs
+import json
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+
+
+class _Buffer(object):
+    """ Text decoded from a stream of byte chunks, read on demand and discarded once consumed """
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self.text = ''
+        self.position = 0
+        self.exhausted = False
+
+    def read_more(self):
+        # type: () -> bool
+        """ Append the next chunk to the buffer, dropping text already consumed. Returns False at the end of the
+        stream. """
+        if self.exhausted:
+            return False
+        self.text = self.text[self.position:]
+        self.position = 0
+        for chunk in self._chunks:
+            if chunk:
+                self.text += self._decoder.decode(chunk)
+                return True
+        self.text += self._decoder.decode(b'', final=True)
+        self.exhausted = True
+        return False
+
+    def next_character(self):
+        # type: () -> str
+        """ Skips whitespace and returns the next character without consuming it, or '' at the end of the stream """
+        while True:
+            while self.position < len(self.text) and self.text[self.position] in _WHITESPACE:
+                self.position += 1
+            if self.position < len(self.text):
+                return self.text[self.position]
+            if not self.read_more():
+                return ''
+
+    def expect(self, character):
+        if self.next_character() != character:
+            raise ValueError('Expected "{}" at position {} of JSON stream'.format(character, self.position))
+        self.position += 1
+
+    def decode_value(self):
+        """ Decodes and consumes the next complete JSON value, reading more of the stream as needed """
+        self.next_character()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.position)
+            except ValueError:
+                # Most likely the value isn't complete yet
+                if not self.read_more():
+                    raise
+                continue
+            # A number at the very end of the buffer may continue in the next chunk
+            is_number = isinstance(value, (int, float)) and not isinstance(value, bool)
+            if end == len(self.text) and is_number and self.read_more():
+                continue
+            self.position = end
+            return value
+
+
+def iter_json_array(chunks, key):
+    """ Incrementally parses a JSON object from a stream of byte chunks, yielding each element of the array under
+    key as soon as it is complete. Only one element is held in memory at a time, rather than the whole document.
+
+    Args:
+        chunks: An iterable of bytes, such as ``response.iter_content(chunk_size)``
+        key: The key of the top-level array to yield elements from, such as userAgreementList
+
+    """
+    buffer = _Buffer(chunks)
+    buffer.expect('{')
+
+    while True:
+        character = buffer.next_character()
+        if character == '}':
+            return
+        if character == ',':
+            buffer.position += 1
+            continue
+
+        name = buffer.decode_value()
+        buffer.expect(':')
+
+        if name != key:
+            # Skip values of any other keys
+            buffer.decode_value()
+            continue
+
+        buffer.expect('[')
+        while True:
+            character = buffer.next_character()
+            if character == ']':
+                buffer.position += 1
+                break
+            if character == ',':
+                buffer.position += 1
+                continue
+            if character == '':
+                raise ValueError('JSON stream ended inside {}'.format(key))
+            yield buffer.decode_value()
@@ -0,0 +1,63 @@
+import importlib
+import sys
+import types
+
+
+class LazyModule(object):
+    """ Stands in for a module, which is only imported the first time one of its attributes is used. This keeps
+    heavy dependencies such as requests and arrow out of the cost of importing pyEchosign.
+
+    Attributes set on the LazyModule (such as by ``mock.patch``) take precedence over those of the module.
+    """
+    def __init__(self, name):
+        # type: (str) -> None
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, item):
+        # Only called for attributes not set on the LazyModule itself
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, item)
+
+    def __repr__(self):
+        return '<LazyModule {}>'.format(self._name)
+
+
+class LazyPackage(types.ModuleType):
+    """ Stands in for a package, importing each of its public names from the module it is defined in the first time it
+    is used, so that importing the package doesn't import every module in it. Installed by :func:`lazy_package`. """
+    def __getattr__(self, item):
+        # Only called for attributes not yet set on the package
+        attributes = self.__dict__.get('_lazy_attributes', {})
+        if item not in attributes:
+            raise AttributeError('module {!r} has no attribute {!r}'.format(self.__name__, item))
+        module, attribute = attributes[item]
+        value = importlib.import_module(module, self.__name__)
+        if attribute is not None:
+            value = getattr(value, attribute)
+        setattr(self, item, value)
+        return value
+
+    def __dir__(self):
+        return sorted(set(self.__dict__) | set(self._lazy_attributes))
+
+
+def lazy_package(name, attributes):
+    """ Replace the package being imported as name with a :class:`LazyPackage`. Unlike a module level
+    ``__getattr__``, this works on every version of Python.
+
+    Args:
+        name: The name of the package, its ``__name__``
+        attributes: A dict of each name to import lazily to a (module, attribute) tuple, where module is relative to
+            the package and attribute is None for the module itself
+    """
+    package = sys.modules[name]
+    lazy = LazyPackage(name, package.__doc__)
+    lazy.__dict__.update(package.__dict__)
+    lazy._lazy_attributes = attributes
+    sys.modules[name] = lazy
+
+
+requests = LazyModule('requests')
+arrow = LazyModule('arrow')
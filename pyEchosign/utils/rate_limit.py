@@ -0,0 +1,48 @@
+import threading
+import time
+from typing import Callable
+
+
+class TokenBucket(object):
+    """ A thread-safe token bucket, used to hold a group of requests to a shared rate budget.
+
+    Args:
+        rate: How many tokens are added to the bucket per second
+        capacity: The most tokens the bucket can hold, i.e. the largest burst allowed. Defaults to ``rate``.
+        clock: The function used to get the current time. Defaults to time.time.
+    """
+    def __init__(self, rate, capacity=None, clock=time.time):
+        # type: (float, float, Callable[[], float]) -> None
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self.clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens=1):
+        # type: (float) -> float
+        """ Take tokens from the bucket if they are available.
+
+        Returns: 0 if the tokens were taken, otherwise the number of seconds until they will be available
+
+        """
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens=1):
+        # type: (float) -> None
+        """ Block until the requested number of tokens could be taken from the bucket """
+        wait = self.try_acquire(tokens)
+        while wait > 0:
+            time.sleep(wait)
+            wait = self.try_acquire(tokens)
@@ -1,3 +1,6 @@
+import os
+
+
 def find_user_in_list(lst, key, value):
     """ Loops through a list of Users, and checks to see if the attribute "key" matches "value". If so, it returns that
     user.
@@ -12,3 +15,21 @@ def find_user_in_list(lst, key, value):
         if getattr(user, key) == value:
             return user
     return None
+
+
+def replace_file(source, destination):
+    """ Moves the file at source to destination, atomically replacing any file already there where the platform
+    allows, so that readers never see a partially written destination.
+
+    Args:
+        source: The path of the complete file, such as a temporary file written alongside destination
+        destination: The path to move it to
+
+    """
+    try:
+        os.replace(source, destination)
+    except AttributeError:
+        # Python 2
+        if os.path.exists(destination) and os.name == 'nt':
+            os.remove(destination)
+        os.rename(source, destination)
@@ -14,7 +14,8 @@ setup(
     author_email='jensaiden@gmail.com',
     description='Connect to the Echosign API without constructing HTTP requests',
     long_description=open('README.rst').read(),
-    install_requires=['requests>=2.12.4, <3.0.0', 'arrow>=0.10.0, <1.0.0'],
+    install_requires=['requests>=2.12.4, <3.0.0', 'arrow>=0.10.0, <1.0.0', 'python-dateutil>=2.0',
+                      'futures>=3.0.0; python_version < "3"'],
     tests_require=['coverage', 'nose'],
     keywords='adobe echosign',
     classifiers=[
@@ -1,3 +1,5 @@
+import threading
+import time
 from unittest import TestCase
 try:
     from unittest.mock import Mock, patch
@@ -5,6 +7,7 @@ except ImportError:
     from mock import Mock, patch
 
 from pyEchosign.classes.account import EchosignAccount
+from pyEchosign.utils.request_parameters import get_headers
 
 
 class TestAccount(TestCase):
@@ -13,6 +16,11 @@ class TestAccount(TestCase):
         cls.mock_get_patcher = patch('pyEchosign.classes.account.requests.get')
         cls.mock_get = cls.mock_get_patcher.start()
 
+    @classmethod
+    def teardown_class(cls):
+        # Stop the patchers started by the class and its tests, so they don't leak into other test modules
+        patch.stopall()
+
     def test_account_response(self):
         self.mock_get.return_value.ok = True
         e = EchosignAccount('a string')
@@ -49,3 +57,71 @@ class TestAccount(TestCase):
         mock_response.status_code = 200
         # Assign our mock response as the result of our patched function
         self.mock_get.return_value = mock_response
+
+
+class TestTokenRefresh(TestCase):
+    def setUp(self):
+        self.refreshes = 0
+        self.session = Mock()
+        self.session.get.side_effect = self.get
+        self.session.post.side_effect = self.post
+        self.account = EchosignAccount('expired', api_access_point='http://echosign.com/api/rest/v5/',
+                                       session=self.session, refresh_token='refresh', client_id='id',
+                                       client_secret='secret')
+
+    def get(self, url, **kwargs):
+        return Mock(status_code=401 if kwargs['headers']['Access-Token'] == 'expired' else 200)
+
+    def post(self, url, **kwargs):
+        self.assertEqual(url, 'http://echosign.com/oauth/refresh')
+        self.assertEqual(kwargs['data']['grant_type'], 'refresh_token')
+        # Give other threads the chance to pile up behind the refresh
+        time.sleep(0.05)
+        self.refreshes += 1
+        response = Mock(status_code=200)
+        response.json.return_value = dict(access_token='fresh', expires_in=3600)
+        return response
+
+    def test_request_replayed_with_new_token(self):
+        refreshed = []
+        self.account.on_token_refresh = refreshed.append
+
+        response = self.account.request('get', 'http://echosign.com/api/rest/v5/agreements',
+                                        headers=get_headers(self.account.access_token))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.account.access_token, 'fresh')
+        self.assertEqual(refreshed, [self.account])
+
+    def test_concurrent_401s_refresh_once(self):
+        responses = []
+
+        def make_request():
+            responses.append(self.account.request('get', 'http://echosign.com/api/rest/v5/agreements',
+                                                  headers=get_headers('expired')))
+
+        threads = [threading.Thread(target=make_request) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.refreshes, 1)
+        self.assertEqual([response.status_code for response in responses], [200] * 8)
+
+    def test_stale_token_after_refresh_is_not_refreshed_again(self):
+        self.account.access_token = 'fresh'
+
+        # Built before another thread refreshed the token, so rejected, but replayed without another refresh
+        response = self.account.request('get', 'http://echosign.com/api/rest/v5/agreements',
+                                        headers=get_headers('expired'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.refreshes, 0)
+
+    def test_refresh_uses_account_timeout(self):
+        self.account.timeout = 5
+
+        self.account.refresh_access_token()
+
+        self.assertEqual(self.session.post.call_args[1]['timeout'], 5)
@@ -0,0 +1,68 @@
+from unittest import TestCase
+
+try:
+    from unittest.mock import Mock, patch
+except ImportError:
+    from mock import Mock, patch
+
+from pyEchosign.classes.account import EchosignAccount
+from pyEchosign.classes.account_pool import AccountPool
+
+
+class TestAccountPool(TestCase):
+    def setUp(self):
+        self.session_patcher = patch('pyEchosign.classes.account_pool.requests.Session')
+        self.mock_session = self.session_patcher.start()
+        self.mock_session.side_effect = lambda: Mock()
+
+    def tearDown(self):
+        self.session_patcher.stop()
+
+    def test_accounts_on_same_access_point_share_connections(self):
+        pool = AccountPool()
+        first = pool.get_account('token 1', api_access_point='http://shard1.echosign.com/')
+        second = pool.get_account('token 2', api_access_point='http://shard1.echosign.com/')
+        third = pool.get_account('token 3', api_access_point='http://shard2.echosign.com/')
+
+        self.assertIs(first.session.shard, second.session.shard)
+        self.assertIsNot(first.session.shard, third.session.shard)
+        self.assertEqual(len(pool.shards), 2)
+
+        response = Mock(status_code=200)
+        first.session.shard.session.request.return_value = response
+        self.assertIs(first.request('get', 'http://shard1.echosign.com/agreements'), response)
+        first.session.shard.session.request.assert_called_once_with('GET', 'http://shard1.echosign.com/agreements',
+                                                                    timeout=EchosignAccount.DEFAULT_TIMEOUT)
+
+    def test_same_token_returns_pooled_account(self):
+        pool = AccountPool()
+        account = pool.get_account('token', api_access_point='http://shard1.echosign.com/')
+        self.assertIs(pool.get_account('token'), account)
+        self.assertEqual(len(pool), 1)
+
+    def test_least_recently_used_account_evicted(self):
+        pool = AccountPool(max_accounts=2)
+        pool.get_account('token 1', api_access_point='http://shard1.echosign.com/')
+        pool.get_account('token 2', api_access_point='http://shard1.echosign.com/')
+        pool.get_account('token 1')
+        pool.get_account('token 3', api_access_point='http://shard1.echosign.com/')
+
+        self.assertIn('token 1', pool)
+        self.assertNotIn('token 2', pool)
+        self.assertIn('token 3', pool)
+
+    def test_idle_accounts_evicted_behind_recently_used_account(self):
+        pool = AccountPool(idle_timeout=60)
+        busy = pool.get_account('token 1', api_access_point='http://shard1.echosign.com/')
+        idle = pool.get_account('token 2', api_access_point='http://shard1.echosign.com/')
+        idle.session.last_used -= 120
+        busy.session.last_used += 1
+
+        pool.get_account('token 3', api_access_point='http://shard1.echosign.com/')
+
+        self.assertIn('token 1', pool)
+        self.assertNotIn('token 2', pool)
+
+    def test_session_rejected(self):
+        with self.assertRaises(TypeError):
+            AccountPool().get_account('token', session=Mock(), api_access_point='http://shard1.echosign.com/')
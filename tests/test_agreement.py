@@ -1,3 +1,4 @@
+import json
 from unittest import TestCase
 
 from six import StringIO
@@ -5,35 +6,28 @@ from six import StringIO
 from pyEchosign.exceptions.echosign import PermissionDenied
 
 try:
-    from unittest.mock import Mock, patch
+    from unittest.mock import Mock
 except ImportError:
-    from mock import Mock, patch
+    from mock import Mock
 
 from pyEchosign.classes.agreement import Agreement
 from pyEchosign.classes.account import EchosignAccount
+from pyEchosign.classes.library_document import LibraryDocument
+from pyEchosign.classes.users import User
 from pyEchosign.exceptions.internal import ApiError
 
 
 class TestAccount(TestCase):
-    @classmethod
-    def setup_class(cls):
-        cls.mock_get_patcher = patch('pyEchosign.classes.account.requests.get')
-        cls.mock_get = cls.mock_get_patcher.start()
-
-        cls.mock_put_patcher = patch('pyEchosign.classes.agreement.requests.put')
-        cls.mock_put = cls.mock_put_patcher.start()
-
-        cls.mock_post_patcher = patch('pyEchosign.classes.agreement.requests.post')
-        cls.mock_post = cls.mock_post_patcher.start()
+    def setUp(self):
+        self.session = Mock()
+        self.mock_get = self.session.get
+        self.mock_put = self.session.put
+        self.mock_post = self.session.post
         
     def test_cancel_agreement_passes(self):
         mock_response = Mock()
 
-        self.mock_get_patcher = patch('pyEchosign.classes.account.requests.get')
-        self.mock_get = self.mock_get_patcher.start()
-
-        e = EchosignAccount('a string')
-        e.api_access_point = 'http://echosign.com'
+        e = EchosignAccount('a string', session=self.session, api_access_point='http://echosign.com')
         agreement = Agreement(account=e)
         agreement.name = 'Test Agreement'
         agreement.fully_retrieved = False
@@ -41,7 +35,7 @@ class TestAccount(TestCase):
         agreement.date = '2017-02-19T08:22:34-08:00'
 
         mock_response.status_code = 200
-        # Assign our mock response as the result of our patched function
+        # Assign our mock response as the result of the account's session
         self.mock_put.return_value = mock_response
 
         agreement.cancel()
@@ -49,11 +43,7 @@ class TestAccount(TestCase):
     def test_cancel_agreement_401_raises_error(self):
         mock_response = Mock()
 
-        self.mock_get_patcher = patch('pyEchosign.classes.account.requests.get')
-        self.mock_get = self.mock_get_patcher.start()
-
-        e = EchosignAccount('an invalid string')
-        e.api_access_point = 'http://echosign.com'
+        e = EchosignAccount('an invalid string', session=self.session, api_access_point='http://echosign.com')
         agreement = Agreement(account=e)
         agreement.name = 'Test Agreement'
         agreement.fully_retrieved = False
@@ -61,7 +51,7 @@ class TestAccount(TestCase):
         agreement.date = '2017-02-19T08:22:34-08:00'
 
         mock_response.status_code = 401
-        # Assign our mock response as the result of our patched function
+        # Assign our mock response as the result of the account's session
         self.mock_put.return_value = mock_response
 
         with self.assertRaises(PermissionDenied):
@@ -71,11 +61,7 @@ class TestAccount(TestCase):
         """ Test that an invalid response due to an issue with the API, not the package, raises an Exception """
         mock_response = Mock()
 
-        self.mock_get_patcher = patch('pyEchosign.classes.account.requests.get')
-        self.mock_get = self.mock_get_patcher.start()
-
-        account = EchosignAccount('an invalid string')
-        account.api_access_point = 'http://echosign.com'
+        account = EchosignAccount('an invalid string', session=self.session, api_access_point='http://echosign.com')
 
         agreement = Agreement(account=account)
         agreement.name = 'Test Agreement'
@@ -84,7 +70,7 @@ class TestAccount(TestCase):
         agreement.date = '2017-02-19T08:22:34-08:00'
 
         mock_response.status_code = 500
-        # Assign our mock response as the result of our patched function
+        # Assign our mock response as the result of the account's session
         self.mock_put.return_value = mock_response
 
         with self.assertRaises(ApiError):
@@ -93,11 +79,7 @@ class TestAccount(TestCase):
     def test_delete_agreement_passes(self):
         mock_response = Mock()
 
-        self.mock_get_patcher = patch('pyEchosign.classes.account.requests.get')
-        self.mock_get = self.mock_get_patcher.start()
-
-        account = EchosignAccount('an invalid string')
-        account.api_access_point = 'http://echosign.com'
+        account = EchosignAccount('an invalid string', session=self.session, api_access_point='http://echosign.com')
 
         agreement = Agreement(account=account)
         agreement.name = 'Test Agreement'
@@ -106,7 +88,7 @@ class TestAccount(TestCase):
         agreement.date = '2017-02-19T08:22:34-08:00'
 
         mock_response.status_code = 200
-        # Assign our mock response as the result of our patched function
+        # Assign our mock response as the result of the account's session
         self.mock_put.return_value = mock_response
 
         agreement.cancel()
@@ -114,11 +96,7 @@ class TestAccount(TestCase):
     def test_delete_agreement_401_raises_error(self):
         mock_response = Mock()
 
-        self.mock_get_patcher = patch('pyEchosign.classes.account.requests.get')
-        self.mock_get = self.mock_get_patcher.start()
-
-        account = EchosignAccount('an invalid string')
-        account.api_access_point = 'http://echosign.com'
+        account = EchosignAccount('an invalid string', session=self.session, api_access_point='http://echosign.com')
 
         agreement = Agreement(account=account)
         agreement.name = 'Test Agreement'
@@ -127,7 +105,7 @@ class TestAccount(TestCase):
         agreement.date = '2017-02-19T08:22:34-08:00'
 
         mock_response.status_code = 401
-        # Assign our mock response as the result of our patched function
+        # Assign our mock response as the result of the account's session
         self.mock_put.return_value = mock_response
 
         with self.assertRaises(PermissionDenied):
@@ -140,36 +118,23 @@ class TestAccount(TestCase):
 
         mock_response = Mock()
 
-        self.mock_get_patcher = patch('pyEchosign.classes.account.requests.get')
-        self.mock_get = self.mock_get_patcher.start()
-
-        account = EchosignAccount('account')
-        account.api_access_point = 'http://echosign.com'
+        account = EchosignAccount('account', session=self.session, api_access_point='http://echosign.com')
         mock_response.json.return_value = json_response
         mock_response.status_code = 200
 
-        mock_agreement_get_patcher = patch('pyEchosign.classes.agreement.requests.get')
-        mock_agreement_get = mock_agreement_get_patcher.start()
-
-        mock_agreement_get.return_value = mock_response
+        self.mock_get.return_value = mock_response
 
         agreements = account.get_agreements()
         agreements = list(agreements)
 
         self.assertEqual(len(agreements), 1)
         self.assertEqual(agreements[0].name, 'test_agreement')
-
-        # Reset the patch for the Account - otherwise exceptions will ensue
-
-        self.mock_get_patcher = patch('pyEchosign.classes.account.requests.get')
-        self.mock_get = self.mock_get_patcher.start()
         
     def test_send_reminder(self):
         """ Test that reminders are sent without exceptions """
         mock_response = Mock()
         
-        account = EchosignAccount('account')
-        account.api_access_point = 'http://echosign.com'
+        account = EchosignAccount('account', session=self.session, api_access_point='http://echosign.com')
         mock_response.status_code = 200
 
         self.mock_post.return_value = mock_response
@@ -190,8 +155,7 @@ class TestAccount(TestCase):
         """ Test that form data is retrieved and returned correctly """
         mock_response = Mock()
 
-        account = EchosignAccount('account')
-        account.api_access_point = 'http://echosign.com'
+        account = EchosignAccount('account', session=self.session, api_access_point='http://echosign.com')
         mock_response.status_code = 200
 
         agreement = Agreement(account=account)
@@ -203,10 +167,7 @@ class TestAccount(TestCase):
         mock_response.text = 'Column,Column2,Column3'
         mock_response.status_code = 200
 
-        mock_get_patcher = patch('pyEchosign.classes.agreement.requests.get')
-        mock_get = mock_get_patcher.start()
-
-        mock_get.return_value = mock_response
+        self.mock_get.return_value = mock_response
 
         form_data = agreement.get_form_data()
 
@@ -215,4 +176,68 @@ class TestAccount(TestCase):
         data = form_data.read()
         self.assertEqual(data, mock_response.text)
 
-        mock_get_patcher.stop()
\ No newline at end of file
+
+class TestAgreementView(TestCase):
+    def setUp(self):
+        self.json_response = dict(userAgreementList=[
+            dict(displayDate='2017-09-09T09:33:53-07:00', esign=True, agreementId='123', name='first',
+                 displayUserSetInfos=[{'displayUserSetMemberInfos': [{'email': 'test@email.com'}]}],
+                 latestVersionId='v1', status='OUT_FOR_SIGNATURE'),
+            dict(displayDate='2017-09-10T09:33:53-07:00', esign=True, agreementId='456', name='second',
+                 displayUserSetInfos=[{'displayUserSetMemberInfos': [{'email': 'other@email.com'}]}],
+                 latestVersionId='v1', status='SIGNED')])
+
+    def test_views_read_json_lazily(self):
+        account = Mock()
+        views = Agreement.json_to_agreements(account, self.json_response, raw=True)
+
+        signed = [view for view in views if view.status == Agreement.Status.SIGNED]
+        self.assertEqual([view.name for view in signed], ['second'])
+        self.assertIsNone(signed[0]._users)
+        self.assertEqual(signed[0].emails, ['other@email.com'])
+        self.assertEqual(signed[0].users[0].email, 'other@email.com')
+        self.assertEqual(signed[0].date.year, 2017)
+        self.assertIs(signed[0].data, self.json_response['userAgreementList'][1])
+
+    def test_view_materializes_agreement(self):
+        account = Mock()
+        view = Agreement.json_to_agreements(account, self.json_response, raw=True)[0]
+
+        self.assertIsNone(view._agreement)
+        self.assertEqual(view.files, [])
+        self.assertIsInstance(view.to_agreement(), Agreement)
+        self.assertEqual(view.to_agreement().echosign_id, '123')
+
+
+class TestLibrarySend(TestCase):
+    def setUp(self):
+        self.session = Mock()
+        self.session.post.return_value = Mock(status_code=201, json=Mock(return_value=dict(agreementId='agreement 1')))
+        self.account = EchosignAccount('token', session=self.session, api_access_point='http://echosign.com/',
+                                       circuit_breaker=False)
+        self.document = LibraryDocument(self.account, 'library 1', ['DOCUMENT'], 'Standard Contract',
+                                        '2017-03-01T10:00:00+00:00', LibraryDocument.SHARED)
+
+    def sent(self):
+        (url, ), kwargs = self.session.post.call_args
+        self.assertEqual(url, 'http://echosign.com/agreements')
+        return json.loads(kwargs['data'])['documentCreationInfo']
+
+    def test_library_document_sent_without_upload(self):
+        response = self.document.send([User('signer@pyechosign.com')], external_id='order 1')
+
+        self.assertEqual(response.agreement_id, 'agreement 1')
+        self.assertEqual(self.session.post.call_count, 1)
+        sent = self.sent()
+        self.assertEqual(sent['fileInfos'], [dict(libraryDocumentId='library 1')])
+        self.assertEqual(sent['name'], 'Standard Contract')
+        self.assertEqual(sent['externalId'], 'order 1')
+
+    def test_agreement_sends_library_document_id_with_files(self):
+        agreement = Agreement(self.account, name='Contract')
+        agreement.files = [Mock(document_id='document 1'), self.document]
+        agreement.send([User('signer@pyechosign.com')], library_document_id='library 2')
+
+        self.assertEqual(self.sent()['fileInfos'], [dict(transientDocumentId='document 1'),
+                                                    dict(libraryDocumentId='library 1'),
+                                                    dict(libraryDocumentId='library 2')])
@@ -0,0 +1,83 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import TestCase
+
+try:
+    from unittest.mock import Mock
+except ImportError:
+    from mock import Mock
+
+from pyEchosign.classes.account import EchosignAccount
+from pyEchosign.classes.agreement import Agreement
+from pyEchosign.classes.blob_store import BlobStore
+
+
+def streamed_response(*chunks):
+    response = Mock()
+    response.status_code = 200
+    response.iter_content.return_value = list(chunks)
+    return response
+
+
+class TestBlobStore(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_identical_files_stored_once(self):
+        store = BlobStore(self.directory)
+        store.store_response('first', streamed_response(b'same ', b'pdf'))
+        store.store_response('second', streamed_response(b'same pdf'))
+
+        self.assertEqual(len(store), 1)
+        self.assertEqual(store.size, 8)
+        self.assertEqual(store.lookup('first'), store.lookup('second'))
+
+        file = BytesIO()
+        self.assertEqual(store.copy_to('second', file), 8)
+        self.assertEqual(file.getvalue(), b'same pdf')
+        self.assertIsNone(store.copy_to('third', BytesIO()))
+
+    def test_least_recently_read_evicted(self):
+        store = BlobStore(self.directory, max_bytes=10)
+        store.store_response('first', streamed_response(b'12345'))
+        store.store_response('second', streamed_response(b'67890'))
+        store.copy_to('first', BytesIO())
+        store.store_response('third', streamed_response(b'abcde'))
+
+        self.assertIsNotNone(store.lookup('first'))
+        self.assertIsNone(store.lookup('second'))
+        self.assertLessEqual(store.size, 10)
+
+    def test_repeat_download_read_from_store(self):
+        account = self.account(BlobStore(self.directory))
+
+        agreement = Agreement(account, echosign_id='123', status='SIGNED')
+        self.assertEqual(agreement.combined_document.read(), b'%PDF')
+        # A refreshed access token still reads the stored file
+        account.access_token = 'refreshed token'
+        self.assertEqual(agreement.combined_document.read(), b'%PDF')
+        self.assertEqual(account.request.call_count, 1)
+
+    def test_changing_files_only_stored_with_ttl(self):
+        account = self.account(BlobStore(self.directory))
+        agreement = Agreement(account, echosign_id='123', status='OUT_FOR_SIGNATURE')
+        agreement.combined_document
+        agreement.combined_document
+        self.assertEqual(account.request.call_count, 2)
+        self.assertEqual(len(account.blob_store), 0)
+
+        account = self.account(BlobStore(self.directory, ttl=60))
+        agreement = Agreement(account, echosign_id='123', status='OUT_FOR_SIGNATURE')
+        agreement.combined_document
+        agreement.combined_document
+        self.assertEqual(account.request.call_count, 1)
+
+    def account(self, store):
+        account = EchosignAccount('token', api_access_point='http://echosign.com/', blob_store=store,
+                                  refresh_token='refresh token')
+        account.request = Mock(side_effect=lambda *args, **kwargs: streamed_response(b'%PDF'))
+        return account
@@ -0,0 +1,61 @@
+from unittest import TestCase
+
+import requests
+
+try:
+    from unittest.mock import Mock
+except ImportError:
+    from mock import Mock
+
+from pyEchosign.classes.agreement import Agreement
+from pyEchosign.classes.callbacks import CallbackReceiver
+
+
+class TestCallbackReceiver(TestCase):
+    def setUp(self):
+        self.agreement = Agreement(Mock(), echosign_id='123', status='OUT_FOR_SIGNATURE')
+
+    def test_notification_updates_agreement_and_dispatches(self):
+        receiver = CallbackReceiver()
+        receiver.track(self.agreement)
+        signed = []
+        everything = []
+        receiver.add_handler(lambda notification, agreement: signed.append(agreement), status='SIGNED')
+        receiver.add_handler(lambda notification, agreement: everything.append(notification))
+
+        receiver.handle({'documentKey': ['123'], 'status': ['SIGNED'], 'eventType': ['ESIGNED']})
+        receiver.handle({'documentKey': ['456'], 'status': ['RECALLED']})
+
+        self.assertEqual(self.agreement.status, Agreement.Status.SIGNED)
+        self.assertEqual(signed, [self.agreement])
+        self.assertEqual([n.agreement_id for n in everything], ['123', '456'])
+        self.assertEqual(everything[0].event_type, 'ESIGNED')
+
+    def test_invalid_token_rejected(self):
+        receiver = CallbackReceiver(token='secret')
+        receiver.track(self.agreement)
+
+        self.assertIsNone(receiver.handle({'documentKey': '123', 'status': 'SIGNED', 'token': 'wrong'}))
+        self.assertEqual(self.agreement.status, Agreement.Status.OUT_FOR_SIGNATURE)
+
+    def test_receives_notifications_over_http(self):
+        """ Stand in for Echosign by calling the receiver's callback URL locally """
+        with CallbackReceiver(token='secret') as receiver:
+            receiver.track(self.agreement)
+
+            response = requests.get(receiver.callback_url, params=dict(documentKey='123', status='SIGNED'))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(self.agreement.status, Agreement.Status.SIGNED)
+
+            response = requests.post(receiver.callback_url, data=dict(documentKey='123', status='EXPIRED'))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(self.agreement.status, Agreement.Status.EXPIRED)
+
+            response = requests.get(receiver.callback_url.split('?')[0], params=dict(documentKey='123'))
+            self.assertEqual(response.status_code, 400)
+
+            response = requests.post(receiver.callback_url, json=['documentKey', '123'])
+            self.assertEqual(response.status_code, 400)
+            response = requests.post(receiver.callback_url, json=dict(documentKey='123', status='SIGNED'))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(self.agreement.status, Agreement.Status.SIGNED)
@@ -0,0 +1,110 @@
+import copy
+import pickle
+import threading
+import time
+from unittest import TestCase
+
+try:
+    from unittest.mock import Mock
+except ImportError:
+    from mock import Mock
+
+from pyEchosign.classes.account import EchosignAccount
+from pyEchosign.classes.agreement import Agreement
+from pyEchosign.classes.resilience import Deadline
+from pyEchosign.exceptions.internal import DeadlineExceeded
+from pyEchosign.utils.coalesce import SingleFlight
+
+
+def run_concurrently(function, count=8):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(function())) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class TestCoalescing(TestCase):
+    def setUp(self):
+        self.calls = []
+        self.session = Mock()
+        self.session.get.side_effect = self.get
+        self.account = EchosignAccount('token', api_access_point='http://echosign.com/', session=self.session)
+
+    def get(self, url, **kwargs):
+        self.calls.append(url)
+        time.sleep(0.05)
+        response = Mock(status_code=200)
+        response.json.return_value = dict(documents=[dict(documentId='1', name='contract.pdf', numPages=1)])
+        return response
+
+    def test_identical_reads_share_one_request(self):
+        results = run_concurrently(lambda: self.account.request('get', 'http://echosign.com/agreements',
+                                                                 headers={'Access-Token': 'token'}))
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(len(set(id(result.json()) for result in results)), 1)
+
+        self.account.request('get', 'http://echosign.com/agreements', headers={'Access-Token': 'token'})
+        self.assertEqual(len(self.calls), 2)
+
+    def test_documents_retrieved_once(self):
+        agreement = Agreement(self.account, echosign_id='123')
+        results = run_concurrently(lambda: agreement.documents)
+
+        self.assertEqual(len(self.calls), 1)
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(results[0][0].echosign_id, '1')
+
+    def test_errors_shared_with_waiting_callers(self):
+        single_flight = SingleFlight()
+        errors = []
+
+        def fail():
+            time.sleep(0.05)
+            raise ValueError('failed')
+
+        def call():
+            try:
+                single_flight.do('key', fail)
+            except ValueError as e:
+                errors.append(e)
+
+        run_concurrently(call, 4)
+        self.assertEqual(len(errors), 4)
+
+    def test_waiting_callers_bounded_by_deadline(self):
+        release = threading.Event()
+        self.session.get.side_effect = lambda url, **kwargs: release.wait() and Mock(status_code=200)
+        leader = threading.Thread(target=self.account.request, args=('get', 'http://echosign.com/agreements'))
+        leader.start()
+        time.sleep(0.02)
+
+        try:
+            started = time.time()
+            with Deadline(0.05):
+                self.assertRaises(DeadlineExceeded, self.account.request, 'get', 'http://echosign.com/agreements')
+            self.assertLess(time.time() - started, 1)
+        finally:
+            release.set()
+            leader.join()
+
+    def test_list_params_coalesced(self):
+        results = run_concurrently(lambda: self.account.request('get', 'http://echosign.com/agreements',
+                                                                 params={'status': ['SIGNED', 'OUT_FOR_SIGNATURE']}))
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(len(results), 8)
+
+
+class TestCopying(TestCase):
+    def test_agreement_pickled_and_copied(self):
+        account = EchosignAccount('token', api_access_point='http://echosign.com/')
+        agreement = Agreement(account, echosign_id='123', name='Contract')
+
+        for copied in (pickle.loads(pickle.dumps(agreement)), copy.deepcopy(agreement)):
+            self.assertEqual(copied.echosign_id, '123')
+            self.assertEqual(copied.account.access_token, 'token')
+            self.assertIsNot(copied._lock, agreement._lock)
+            with copied._lock:
+                pass
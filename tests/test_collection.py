@@ -0,0 +1,50 @@
+from unittest import TestCase
+
+try:
+    from unittest.mock import Mock
+except ImportError:
+    from mock import Mock
+
+import arrow
+
+from pyEchosign.classes.agreement import Agreement
+from pyEchosign.classes.collection import AgreementCollection
+from pyEchosign.classes.users import User
+
+
+class TestAgreementCollection(TestCase):
+    def setUp(self):
+        account = Mock()
+        self.nda = Agreement(account, echosign_id='1', name='Mutual NDA', status='SIGNED',
+                             date=arrow.get('2017-01-15'), users=[User('Alice@example.com')])
+        self.msa = Agreement(account, echosign_id='2', name='Master Services Agreement', status='OUT_FOR_SIGNATURE',
+                             date=arrow.get('2017-02-15'), users=[User('alice@example.com'), User('bob@example.com')])
+        self.sow = Agreement(account, echosign_id='3', name='Statement of Work - Services', status='OUT_FOR_SIGNATURE',
+                             date=arrow.get('2017-03-15'), users=[User('bob@example.com')])
+        self.collection = AgreementCollection([self.nda, self.msa, self.sow])
+
+    def test_lookups(self):
+        self.assertEqual(len(self.collection), 3)
+        self.assertEqual(set(self.collection.by_status(Agreement.Status.OUT_FOR_SIGNATURE)), {self.msa, self.sow})
+        self.assertEqual(set(self.collection.by_participant('ALICE@example.com')), {self.nda, self.msa})
+        self.assertEqual(self.collection.between('2017-02-01', '2017-03-15'), [self.msa, self.sow])
+        self.assertEqual(self.collection.between(end='2017-01-31'), [self.nda])
+        self.assertEqual(set(self.collection.search('serv')), {self.msa, self.sow})
+        self.assertEqual(self.collection.search('mast serv'), [self.msa])
+        self.assertEqual(self.collection.search('missing'), [])
+
+    def test_refresh_updates_indexes(self):
+        self.msa.status = Agreement.Status.SIGNED
+        self.msa.name = 'Renamed'
+        self.msa.date = arrow.get('2018-01-01')
+        self.collection.refresh(self.msa)
+
+        self.assertEqual(self.collection.by_status(Agreement.Status.OUT_FOR_SIGNATURE), [self.sow])
+        self.assertEqual(set(self.collection.by_status(Agreement.Status.SIGNED)), {self.nda, self.msa})
+        self.assertEqual(self.collection.search('master'), [])
+        self.assertEqual(self.collection.between('2018-01-01'), [self.msa])
+
+        self.collection.remove(self.msa)
+        self.assertNotIn(self.msa, self.collection)
+        self.assertEqual(self.collection.by_participant('alice@example.com'), [self.nda])
+        self.assertEqual(self.collection.search('renamed'), [])
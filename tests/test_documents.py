@@ -1,24 +1,28 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+from io import BytesIO
 from unittest import TestCase
 
-from mock import patch, Mock
+from mock import Mock
 
 from pyEchosign import TransientDocument
 from pyEchosign.classes.agreement import Agreement
 from pyEchosign.classes.account import EchosignAccount
-from pyEchosign.exceptions.internal import ApiError
+from pyEchosign.classes.documents import AgreementDocument, PendingDocument
+from pyEchosign.classes.resilience import Deadline
+from pyEchosign.classes.scheduler import RequestScheduler
+from pyEchosign.exceptions.internal import ApiError, DeadlineExceeded
 
 
 class TestAccount(TestCase):
-    @classmethod
-    def setup_class(cls):
-        cls.mock_get_patcher = patch('pyEchosign.classes.account.requests.get')
-        cls.mock_get = cls.mock_get_patcher.start()
-
-        cls.mock_put_patcher = patch('pyEchosign.classes.documents.requests.put')
-        cls.mock_put = cls.mock_put_patcher.start()
-
-        cls.mock_post_patcher = patch('pyEchosign.classes.documents.requests.post')
-        cls.mock_post = cls.mock_post_patcher.start()
+    def setUp(self):
+        self.session = Mock()
+        self.mock_get = self.session.get
+        self.mock_put = self.session.put
+        self.mock_post = self.session.post
 
     def test_create_transient_document_without_mime_type(self):
         response = Mock()
@@ -28,8 +32,7 @@ class TestAccount(TestCase):
 
         self.mock_post.return_value = response
 
-        account = EchosignAccount('a string')
-        account.api_access_point = 'http://echosign.com'
+        account = EchosignAccount('a string', session=self.session, api_access_point='http://echosign.com')
 
         td = TransientDocument(account, 'test.pdf', open('requirements.txt', 'r'))
 
@@ -43,8 +46,125 @@ class TestAccount(TestCase):
 
         self.mock_post.return_value = response
 
-        account = EchosignAccount('a string')
-        account.api_access_point = 'http://echosign.com'
+        account = EchosignAccount('a string', session=self.session, api_access_point='http://echosign.com')
+
+        with self.assertRaises(ApiError):
+            td = TransientDocument(account, 'test.pdf', open('requirements.txt', 'r'))
+
 
+class TestAgreementDocument(TestCase):
+    def setUp(self):
+        self.account = Mock()
+        self.account.api_access_point = 'http://echosign.com/'
+        self.account.access_token = 'token'
+        self.account.blob_store = None
+        self.account.cache = None
+        self.account.request.side_effect = self.request
+        self.agreement = Agreement(account=self.account, echosign_id='123')
+
+    def test_file_name_is_never_a_directory(self):
+        for name, file_name in (('../contract.pdf', '.._contract.pdf'), ('..', '1'), ('.', '1'), ('', '1'),
+                                (None, '1')):
+            self.assertEqual(AgreementDocument('1', 'application/pdf', name, 1).file_name, file_name)
+
+    def request(self, method, url, **kwargs):
+        response = Mock()
+        response.status_code = 200
+        if url.endswith('/documents'):
+            response.json.return_value = dict(
+                documents=[dict(documentId='1', mimeType='application/pdf', name='contract.pdf', numPages=2),
+                           dict(documentId='2', mimeType='application/pdf', name='contract.pdf', numPages=1)],
+                supportingDocuments=[dict(supportingDocumentId='3', mimeType='image/png', name='id.png',
+                                          numPages=1, fieldName='identification')])
+        else:
+            response.iter_content.return_value = [url.rsplit('/', 1)[1].encode('utf-8')]
+        return response
+
+    def test_download_single_document(self):
+        document = self.agreement.documents[2]
+        self.assertTrue(document.supporting_document)
+        self.assertEqual(document.file.read(), b'3')
+        self.account.request.assert_called_with('get', 'http://echosign.com/agreements/123/documents/3',
+                                                headers={'Access-Token': 'token', 'Content-Type': 'application/json'},
+                                                stream=True)
+
+    def test_download_all_documents(self):
+        directory = tempfile.mkdtemp()
+        try:
+            paths = self.agreement.download_documents(directory)
+            self.assertEqual(sorted(os.path.basename(path) for path in paths.values()),
+                             ['1_contract.pdf', '2_contract.pdf', 'id.png'])
+            for document, path in paths.items():
+                with open(path, 'rb') as file:
+                    self.assertEqual(file.read(), document.echosign_id.encode('utf-8'))
+        finally:
+            shutil.rmtree(directory)
+
+
+class TestPendingDocument(TestCase):
+    def setUp(self):
+        self.session = Mock()
+        self.account = EchosignAccount('token', session=self.session, api_access_point='http://echosign.com/',
+                                       circuit_breaker=False)
+        self.uploading = threading.Semaphore(0)
+        self.release = threading.Event()
+
+    def post(self, url, **kwargs):
+        if url.endswith('transientDocuments'):
+            self.uploading.release()
+            self.release.wait(5)
+            name = kwargs['files']['File'][0]
+            return Mock(status_code=201, json=Mock(return_value=dict(transientDocumentId='id ' + name)))
+        self.sent = json.loads(kwargs['data'])
+        return Mock(status_code=201, json=Mock(return_value=dict(agreementId='agreement 1')))
+
+    def test_uploads_run_in_parallel_until_send(self):
+        self.session.post.side_effect = self.post
+        documents = [TransientDocument.upload_async(self.account, name, BytesIO(b'pdf'))
+                     for name in ('first.pdf', 'second.pdf')]
+        self.assertIsInstance(documents[0], PendingDocument)
+
+        # Both uploads are in flight at once
+        self.assertTrue(self.uploading.acquire(timeout=5))
+        self.assertTrue(self.uploading.acquire(timeout=5))
+        self.assertFalse(documents[0].done())
+
+        self.release.set()
+        agreement = Agreement(self.account, name='Contract', files=documents)
+        agreement.send([])
+
+        self.assertEqual(self.sent['documentCreationInfo']['fileInfos'],
+                         [dict(transientDocumentId='id first.pdf'), dict(transientDocumentId='id second.pdf')])
+        self.assertEqual(documents[1].result().file_name, 'second.pdf')
+
+    def test_upload_errors_raised_by_send(self):
+        self.session.post.return_value = Mock(status_code=500, json=Mock(return_value={}), content=b'')
+        document = TransientDocument.upload_async(self.account, 'contract.pdf', BytesIO(b'pdf'))
+        agreement = Agreement(self.account, name='Contract', files=[document])
         with self.assertRaises(ApiError):
-            td = TransientDocument(account, 'test.pdf', open('requirements.txt', 'r'))
\ No newline at end of file
+            agreement.send([])
+
+    def test_waiting_bounded_by_deadline(self):
+        self.session.post.side_effect = self.post
+        document = TransientDocument.upload_async(self.account, 'contract.pdf', BytesIO(b'pdf'))
+        self.assertTrue(self.uploading.acquire(timeout=5))
+        try:
+            with Deadline(0.05):
+                with self.assertRaises(DeadlineExceeded):
+                    document.document_id
+        finally:
+            self.release.set()
+        self.assertEqual(document.document_id, 'id contract.pdf')
+
+    def test_upload_keeps_caller_priority(self):
+        priorities = []
+
+        def post(url, **kwargs):
+            priorities.append(RequestScheduler.current_priority())
+            return Mock(status_code=201, json=Mock(return_value=dict(transientDocumentId='id')))
+        self.session.post.side_effect = post
+
+        with RequestScheduler.priority(RequestScheduler.BATCH):
+            document = TransientDocument.upload_async(self.account, 'contract.pdf', BytesIO(b'pdf'))
+        document.result()
+        self.assertEqual(priorities, [RequestScheduler.BATCH])
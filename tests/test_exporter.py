@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+try:
+    from unittest.mock import Mock
+except ImportError:
+    from mock import Mock
+
+from pyEchosign.classes.agreement import Agreement
+from pyEchosign.classes.exporter import AgreementExporter
+
+
+class TestAgreementExporter(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.account = Mock()
+        self.account.api_access_point = 'http://echosign.com/'
+        self.account.access_token = 'token'
+        self.account.blob_store = None
+        self.account.cache = None
+        self.requested = []
+        self.account.request.side_effect = self.request
+
+        self.agreements = [Agreement(self.account, echosign_id=echosign_id, status='SIGNED')
+                           for echosign_id in ('1', '2')]
+        self.agreements.append(Agreement(self.account, echosign_id='3', status='OUT_FOR_SIGNATURE'))
+        self.account.get_agreements.return_value = self.agreements
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def request(self, method, url, **kwargs):
+        self.requested.append(url)
+        response = Mock()
+        response.status_code = 200
+        response.iter_content.return_value = [b'some ', b'bytes']
+        return response
+
+    def test_exports_signed_agreements(self):
+        progress = AgreementExporter(self.account, self.directory).run()
+
+        self.assertEqual(progress.completed, 2)
+        self.assertEqual(progress.bytes_written, 60)
+        self.assertEqual(progress.eta, 0)
+        with open(os.path.join(self.directory, '1', AgreementExporter.COMBINED_DOCUMENT), 'rb') as f:
+            self.assertEqual(f.read(), b'some bytes')
+        self.assertFalse(os.path.exists(os.path.join(self.directory, '3')))
+
+    def test_resumes_from_checkpoint(self):
+        exporter = AgreementExporter(self.account, self.directory)
+
+        def fail_second(method, url, **kwargs):
+            if '/2/' in url:
+                raise IOError('Connection reset')
+            return self.request(method, url, **kwargs)
+
+        self.account.request.side_effect = fail_second
+        progress = exporter.run()
+        self.assertEqual(progress.completed, 1)
+        self.assertIn('2', progress.failed)
+        self.assertEqual(exporter.exported_ids(), {'1'})
+
+        self.account.request.side_effect = self.request
+        self.requested = []
+        progress = exporter.run()
+        self.assertEqual(progress.skipped, 1)
+        self.assertEqual(progress.completed, 1)
+        self.assertTrue(all('/2/' in url for url in self.requested))
+        self.assertEqual(exporter.exported_ids(), {'1', '2'})
@@ -0,0 +1,26 @@
+import subprocess
+import sys
+from unittest import TestCase
+
+HEAVY_MODULES = ('requests', 'arrow', 'six', 'sqlite3', 'concurrent.futures', 'http.server')
+
+
+def modules_loaded_by(statement):
+    """ Runs statement in a fresh interpreter and returns the heavy modules it imported """
+    code = '{}\nimport sys\nprint(",".join(m for m in {!r} if m in sys.modules))'.format(statement, HEAVY_MODULES)
+    output = subprocess.check_output([sys.executable, '-c', code]).decode('utf-8').strip()
+    return set(output.split(',')) - {''}
+
+
+class TestImportTime(TestCase):
+    """ Guards against heavy dependencies creeping back into the cost of importing pyEchosign """
+    def test_import_package(self):
+        self.assertEqual(modules_loaded_by('import pyEchosign'), set())
+
+    def test_import_single_class(self):
+        self.assertEqual(modules_loaded_by('from pyEchosign import TransientDocument'), set())
+        self.assertEqual(modules_loaded_by('from pyEchosign.classes.account import EchosignAccount'), set())
+
+    def test_dependencies_loaded_when_used(self):
+        loaded = modules_loaded_by('from pyEchosign.utils.lazy import requests\nrequests.Session')
+        self.assertEqual(loaded, {'requests'})
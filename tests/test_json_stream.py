@@ -0,0 +1,61 @@
+import json
+from unittest import TestCase
+
+try:
+    from unittest.mock import Mock
+except ImportError:
+    from mock import Mock
+
+from pyEchosign.classes.account import EchosignAccount
+from pyEchosign.utils.json_stream import iter_json_array
+
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class TestJsonStream(TestCase):
+    def setUp(self):
+        self.document = {'page': {'count': 12, 'next': None},
+                         'userAgreementList': [{'agreementId': str(i), 'name': u'caf\u00e9 {}'.format(i), 'pages': i}
+                                               for i in range(50)],
+                         'trailing': [1, 2.5, True]}
+        self.data = json.dumps(self.document, indent=1).encode('utf-8')
+
+    def test_elements_match_regardless_of_chunking(self):
+        for size in (1, 7, 64, len(self.data)):
+            elements = list(iter_json_array(chunked(self.data, size), 'userAgreementList'))
+            self.assertEqual(elements, self.document['userAgreementList'])
+
+    def test_elements_yielded_before_stream_ends(self):
+        consumed = []
+
+        def chunks():
+            for chunk in chunked(self.data, 16):
+                consumed.append(chunk)
+                yield chunk
+
+        first = next(iter_json_array(chunks(), 'userAgreementList'))
+        self.assertEqual(first['agreementId'], '0')
+        self.assertLess(sum(len(chunk) for chunk in consumed), len(self.data) / 10)
+
+    def test_truncated_stream_raises(self):
+        with self.assertRaises(ValueError):
+            list(iter_json_array(chunked(self.data[:len(self.data) // 2], 64), 'userAgreementList'))
+
+    def test_iter_agreements(self):
+        response = Mock()
+        response.status_code = 200
+        listing = {'userAgreementList': [
+            {'agreementId': '123', 'name': 'test', 'status': 'SIGNED',
+             'displayUserSetInfos': [{'displayUserSetMemberInfos': [{'email': 'test@email.com'}]}]}]}
+        response.iter_content.return_value = chunked(json.dumps(listing).encode('utf-8'), 10)
+
+        session = Mock()
+        session.get.return_value = response
+        account = EchosignAccount('token', api_access_point='http://echosign.com/', session=session)
+
+        agreements = list(account.iter_agreements())
+        self.assertEqual(agreements[0].echosign_id, '123')
+        self.assertEqual(agreements[0].users[0].email, 'test@email.com')
+        self.assertTrue(response.close.called)
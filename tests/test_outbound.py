@@ -0,0 +1,166 @@
+import json
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import TestCase
+
+try:
+    from unittest.mock import Mock
+except ImportError:
+    from mock import Mock
+
+from pyEchosign.classes.agreement import Agreement
+from pyEchosign.classes.library_document import LibraryDocument
+from pyEchosign.classes.outbound import OutboundQueue, QueuedOperation
+from pyEchosign.classes.users import User
+
+
+def response(status_code, body=None):
+    return Mock(status_code=status_code, json=Mock(return_value=body or {}), content=b'')
+
+
+class TestOutboundQueue(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.account = Mock()
+        self.account.api_access_point = 'http://echosign.com/'
+        self.account.access_token = 'token'
+        self.account.headers.return_value = {}
+        self.account.get_agreements.return_value = []
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def queue(self):
+        return OutboundQueue(self.account, self.directory, retry_delay=0)
+
+    def test_upload_then_send(self):
+        def request(method, url, **kwargs):
+            if url.endswith('transientDocuments'):
+                return response(201, dict(transientDocumentId='document 1'))
+            self.sent = json.loads(kwargs['data'])
+            return response(201, dict(agreementId='agreement 1'))
+        self.account.request.side_effect = request
+
+        queue = self.queue()
+        upload = queue.upload('contract.pdf', BytesIO(b'pdf'))
+        agreement = Agreement(self.account, name='Contract')
+        agreement.files = [upload]
+        send = queue.send(agreement, [User('signer@pyechosign.com')], external_id='order 1')
+
+        with queue:
+            self.assertTrue(send.wait(5))
+
+        self.assertEqual(upload.result, dict(document_id='document 1'))
+        self.assertEqual(send.status, QueuedOperation.DONE)
+        self.assertEqual(send.result['agreement_id'], 'agreement 1')
+        file_infos = self.sent['documentCreationInfo']['fileInfos']
+        self.assertEqual(file_infos, [dict(transientDocumentId='document 1')])
+        self.assertEqual(self.sent['documentCreationInfo']['externalId'], 'order 1')
+
+    def test_send_library_document(self):
+        def request(method, url, **kwargs):
+            self.sent = json.loads(kwargs['data'])
+            return response(201, dict(agreementId='agreement 1'))
+        self.account.request.side_effect = request
+
+        queue = self.queue()
+        agreement = Agreement(self.account, name='Contract')
+        agreement.files = [LibraryDocument(self.account, 'library 1', ['DOCUMENT'], 'Standard Contract',
+                                           '2017-03-01T10:00:00+00:00', LibraryDocument.SHARED)]
+        send = queue.send(agreement, [User('signer@pyechosign.com')], external_id='order 1')
+
+        with queue:
+            self.assertTrue(send.wait(5))
+
+        self.assertEqual(send.status, QueuedOperation.DONE)
+        self.assertEqual(self.account.request.call_count, 1)
+        self.assertEqual(self.sent['documentCreationInfo']['fileInfos'], [dict(libraryDocumentId='library 1')])
+
+    def test_duplicate_keys_queued_once(self):
+        queue = self.queue()
+        agreement = Agreement(self.account, echosign_id='agreement 1')
+        first = queue.cancel(agreement)
+        self.assertEqual(queue.cancel(agreement).id, first.id)
+        self.assertEqual(len(queue), 1)
+
+    def test_operations_survive_restart(self):
+        agreement = Agreement(self.account, echosign_id='agreement 1')
+        operation = self.queue().send_reminder(agreement, 'Please sign')
+
+        self.account.request.return_value = response(200)
+        with self.queue() as queue:
+            self.assertTrue(queue.operations()[0].wait(5))
+
+        self.assertEqual(operation.status, QueuedOperation.DONE)
+        payload = json.loads(self.account.request.call_args[1]['data'])
+        self.assertEqual(payload, dict(agreementId='agreement 1', comment='Please sign'))
+
+    def test_failures_retried_then_failed(self):
+        self.account.request.return_value = response(500)
+        queue = OutboundQueue(self.account, self.directory, max_attempts=3, retry_delay=0)
+        operation = queue.delete(Agreement(self.account, echosign_id='agreement 1'))
+        with queue:
+            self.assertTrue(operation.wait(5))
+
+        self.assertEqual(operation.status, QueuedOperation.FAILED)
+        self.assertEqual(self.account.request.call_count, 3)
+
+    def test_permanent_errors_not_retried(self):
+        self.account.request.return_value = response(401)
+        queue = self.queue()
+        operation = queue.cancel(Agreement(self.account, echosign_id='agreement 1'))
+        with queue:
+            self.assertTrue(operation.wait(5))
+
+        self.assertEqual(operation.status, QueuedOperation.FAILED)
+        self.assertEqual(self.account.request.call_count, 1)
+        self.assertIn('401', operation.error)
+
+    def test_retried_send_not_duplicated(self):
+        def request(method, url, **kwargs):
+            if method == 'post':
+                return response(503)
+            # Both agreements mention the external ID, but only the second was sent with it
+            external_id = 'order 10' if url.endswith('agreement 1') else dict(id='order 1')
+            return response(200, dict(externalId=external_id))
+        self.account.request.side_effect = request
+        self.account.get_agreements.return_value = [Agreement(self.account, echosign_id='agreement 1'),
+                                                    Agreement(self.account, echosign_id='agreement 2')]
+
+        queue = OutboundQueue(self.account, self.directory, max_attempts=2, retry_delay=0)
+        operation = queue.send(Agreement(self.account, name='Contract'), [User('signer@pyechosign.com')],
+                               external_id='order 1')
+        with queue:
+            self.assertTrue(operation.wait(5))
+
+        self.assertEqual(operation.result['agreement_id'], 'agreement 2')
+        self.account.get_agreements.assert_called_once_with(query='order 1')
+        self.assertEqual([call[0][0] for call in self.account.request.call_args_list], ['post', 'get', 'get'])
+
+    def test_client_errors_not_retried(self):
+        self.account.request.return_value = response(404)
+        queue = self.queue()
+        operation = queue.send_reminder(Agreement(self.account, echosign_id='agreement 1'))
+        with queue:
+            self.assertTrue(operation.wait(5))
+
+        self.assertEqual(operation.status, QueuedOperation.FAILED)
+        self.assertEqual(self.account.request.call_count, 1)
+
+    def test_failed_operation_queued_again(self):
+        self.account.request.return_value = response(403)
+        queue = self.queue()
+        agreement = Agreement(self.account, echosign_id='agreement 1')
+        failed = queue.cancel(agreement)
+        with queue:
+            self.assertTrue(failed.wait(5))
+
+            self.account.request.return_value = response(200)
+            retried = queue.cancel(agreement)
+            self.assertNotEqual(retried.id, failed.id)
+            self.assertTrue(retried.wait(5))
+
+        self.assertEqual(failed.status, QueuedOperation.FAILED)
+        self.assertEqual(retried.status, QueuedOperation.DONE)
+        self.assertEqual(queue.cancel(agreement).id, retried.id)
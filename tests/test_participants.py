@@ -0,0 +1,100 @@
+import gc
+import json
+import weakref
+from unittest import TestCase
+
+try:
+    from unittest.mock import Mock
+except ImportError:
+    from mock import Mock
+
+from pyEchosign.classes.account import EchosignAccount
+
+
+def agreement_json(echosign_id, *emails):
+    return {
+        'agreementId': echosign_id,
+        'name': 'Contract',
+        'status': 'OUT_FOR_SIGNATURE',
+        'displayDate': '2017-02-19T08:22:34-08:00',
+        'displayUserSetInfos': [{'displayUserSetMemberInfos': [dict(email=email) for email in emails]}],
+    }
+
+
+class TestParticipantIndex(TestCase):
+    def setUp(self):
+        self.session = Mock()
+        self.account = EchosignAccount('token', session=self.session, api_access_point='http://echosign.com/',
+                                       circuit_breaker=False, coalesce_reads=False)
+
+    def listing(self, *agreements):
+        self.session.get.return_value = Mock(status_code=200,
+                                             json=Mock(return_value=dict(userAgreementList=list(agreements))))
+
+    def test_users_shared_between_agreements(self):
+        self.listing(agreement_json('1', 'signer@pyechosign.com', 'sender@pyechosign.com'),
+                     agreement_json('2', 'Signer@PyEchosign.com'))
+        first, second = self.account.get_agreements()
+        self.assertIs(first.users[0], second.users[0])
+        self.assertIsNot(first.users[0], first.users[1])
+
+    def test_get_agreements_maintains_index(self):
+        self.listing(agreement_json('1', 'signer@pyechosign.com'), agreement_json('2', 'signer@pyechosign.com'),
+                     agreement_json('3', 'other@pyechosign.com'))
+        # The index only holds agreements weakly, so they're kept here
+        listed = self.account.get_agreements()
+        participants = self.account.participants
+        self.assertEqual(sorted(a.echosign_id for a in participants.agreements('SIGNER@pyechosign.com')), ['1', '2'])
+
+        # A searched listing only updates the agreements it returns
+        self.listing(agreement_json('2', 'other@pyechosign.com'))
+        listed += self.account.get_agreements(query='Contract')
+        self.assertEqual([a.echosign_id for a in participants.agreements('signer@pyechosign.com')], ['1'])
+        self.assertEqual(sorted(a.echosign_id for a in participants.agreements('other@pyechosign.com')), ['2', '3'])
+
+        # A complete listing also removes agreements which are no longer listed
+        self.listing(agreement_json('3', 'other@pyechosign.com'))
+        listed += self.account.get_agreements()
+        self.assertEqual(participants.agreements('signer@pyechosign.com'), [])
+        self.assertNotIn('signer@pyechosign.com', participants)
+        self.assertEqual(len(participants), 1)
+
+    def test_signing_urls_kept_per_agreement(self):
+        self.listing(agreement_json('1', 'signer@pyechosign.com'), agreement_json('2', 'signer@pyechosign.com'))
+        first, second = self.account.get_agreements()
+
+        self.session.get.return_value = Mock(status_code=200, json=Mock(return_value=dict(signingUrlSetInfos=[
+            dict(signingUrls=[dict(email='signer@pyechosign.com', esignUrl='http://sign/1')])])))
+        first.get_signing_urls()
+
+        self.assertEqual(first.users[0].signing_url, 'http://sign/1')
+        self.assertIs(first.users[0].agreement, first)
+        self.assertIsNone(second.users[0]._signing_url)
+
+    def test_account_freed_with_its_index(self):
+        self.listing(agreement_json('1', 'signer@pyechosign.com'))
+        self.account.get_agreements()
+        account = weakref.ref(self.account)
+        index = weakref.ref(self.account.participants)
+
+        del self.account
+        gc.collect()
+        self.assertIsNone(account())
+        self.assertIsNone(index())
+
+    def test_iterated_agreements_freed(self):
+        listing = json.dumps(dict(userAgreementList=[agreement_json(str(index), 'signer@pyechosign.com')
+                                                     for index in range(50)])).encode('utf-8')
+        self.session.get.return_value = Mock(status_code=200, iter_content=Mock(return_value=[listing]))
+
+        references = []
+        for agreement in self.account.iter_agreements():
+            references.append(weakref.ref(agreement))
+            # Kept in the index, but only for as long as the agreement is held
+            self.assertEqual(self.account.participants.agreements('signer@pyechosign.com'), [agreement])
+        del agreement
+        gc.collect()
+
+        self.assertEqual([reference() for reference in references], [None] * 50)
+        self.assertEqual(self.account.participants.agreements('signer@pyechosign.com'), [])
+        self.assertEqual(len(self.account.participants), 0)
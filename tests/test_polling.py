@@ -0,0 +1,96 @@
+from unittest import TestCase
+
+try:
+    from unittest.mock import Mock
+except ImportError:
+    from mock import Mock
+
+from pyEchosign.classes.agreement import Agreement
+from pyEchosign.classes.polling import PollingScheduler
+
+
+class TestPollingScheduler(TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        self.account = Mock()
+        self.statuses = {'1': 'OUT_FOR_SIGNATURE', '2': 'OUT_FOR_SIGNATURE'}
+        self.account.get_agreements.side_effect = lambda query=None: [
+            Agreement(self.account, echosign_id=echosign_id, status=status)
+            for echosign_id, status in self.statuses.items()]
+
+    def scheduler(self, **kwargs):
+        kwargs.setdefault('requests_per_hour', 3600)
+        return PollingScheduler(self.account, min_interval=10, max_interval=100, clock=lambda: self.now, **kwargs)
+
+    def test_due_agreements_share_one_listing_call(self):
+        scheduler = self.scheduler()
+        first = Agreement(self.account, echosign_id='1', status='OUT_FOR_SIGNATURE')
+        second = Agreement(self.account, echosign_id='2', status='OUT_FOR_SIGNATURE')
+        scheduler.track(first)
+        scheduler.track(second)
+
+        self.assertEqual(scheduler.poll(), [])
+        self.assertEqual(self.account.get_agreements.call_count, 0)
+
+        self.now += 10
+        self.statuses['2'] = 'SIGNED'
+        self.assertEqual(scheduler.poll(), [second])
+        self.assertEqual(self.account.get_agreements.call_count, 1)
+        self.assertEqual(second.status, Agreement.Status.SIGNED)
+        # Final agreements are no longer polled
+        self.assertNotIn(second, scheduler)
+        self.assertIn(first, scheduler)
+
+    def test_unchanged_agreements_back_off(self):
+        scheduler = self.scheduler()
+        scheduler.track(Agreement(self.account, echosign_id='1', status='OUT_FOR_SIGNATURE'))
+
+        waits = []
+        for _ in range(5):
+            self.now += scheduler.next_due()
+            scheduler.poll()
+            waits.append(scheduler.next_due())
+
+        self.assertEqual(waits, [20, 40, 80, 100, 100])
+
+    def test_deadline_shortens_interval(self):
+        scheduler = self.scheduler()
+        agreement = Agreement(self.account, echosign_id='1', status='OUT_FOR_SIGNATURE', date=None)
+        scheduler.track(agreement)
+        for _ in range(4):
+            self.now += scheduler.next_due()
+            scheduler.poll()
+        self.assertEqual(scheduler.next_due(), 100)
+
+        near_deadline = self.scheduler()
+        near_deadline.track(agreement, days_until_signing_deadline=1)
+        near_deadline._entries['1'].deadline = self.now + 50
+        near_deadline._entries['1'].interval = 100
+        self.now += 10
+        near_deadline.poll()
+        self.assertLess(near_deadline.next_due(), 20)
+
+    def test_request_budget_respected(self):
+        scheduler = self.scheduler(requests_per_hour=1)
+        scheduler.track(Agreement(self.account, echosign_id='1', status='OUT_FOR_SIGNATURE'))
+
+        self.now += 10
+        scheduler.poll()
+        self.now += 20
+        scheduler.poll()
+        self.assertEqual(self.account.get_agreements.call_count, 1)
+
+        # The budget refills on the scheduler's clock
+        self.now += 3600
+        scheduler.poll()
+        self.assertEqual(self.account.get_agreements.call_count, 2)
+
+    def test_failed_listing_reschedules_due_agreements(self):
+        scheduler = self.scheduler()
+        scheduler.track(Agreement(self.account, echosign_id='1', status='OUT_FOR_SIGNATURE'))
+        self.account.get_agreements.side_effect = ValueError('Connection reset')
+
+        self.now += 10
+        with self.assertRaises(ValueError):
+            scheduler.poll()
+        self.assertEqual(scheduler.next_due(), 20)
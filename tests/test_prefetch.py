@@ -0,0 +1,116 @@
+import threading
+from unittest import TestCase
+
+try:
+    from unittest.mock import Mock
+except ImportError:
+    from mock import Mock
+
+from pyEchosign.classes.account import EchosignAccount
+from pyEchosign.classes.agreement import Agreement
+from pyEchosign.classes.prefetch import AgreementPrefetcher
+from pyEchosign.classes.users import User
+
+
+class TestAgreementPrefetcher(TestCase):
+    def setUp(self):
+        self.session = Mock()
+        self.session.get.side_effect = self.get
+        self.account = EchosignAccount('token', session=self.session, api_access_point='http://echosign.com/',
+                                       circuit_breaker=False, coalesce_reads=False)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.most_in_flight = 0
+        self.requested = []
+
+    def get(self, url, **kwargs):
+        with self.lock:
+            self.in_flight += 1
+            self.most_in_flight = max(self.most_in_flight, self.in_flight)
+            self.requested.append(url)
+        try:
+            echosign_id = url.split('/')[-2]
+            if url.endswith('/documents'):
+                body = dict(documents=[dict(documentId='document ' + echosign_id, name='contract.pdf', numPages=1)])
+            else:
+                body = dict(signingUrlSetInfos=[dict(signingUrls=[
+                    dict(email='signer@pyechosign.com', esignUrl='http://sign/' + echosign_id)])])
+            return Mock(status_code=200, json=Mock(return_value=body))
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def agreements(self, count):
+        agreements = []
+        for index in range(count):
+            agreement = Agreement(self.account, echosign_id=str(index))
+            agreement.users = [User('signer@pyechosign.com', agreement=agreement)]
+            agreements.append(agreement)
+        return agreements
+
+    def test_documents_and_signing_urls_retrieved_ahead(self):
+        agreements = self.agreements(20)
+        prefetched = AgreementPrefetcher(agreements, signing_urls=True, ahead=5, workers=2)
+
+        seen = []
+        for agreement in prefetched:
+            requests_made = len(self.requested)
+            seen.append((agreement.documents[0].echosign_id, agreement.users[0].signing_url))
+            # Reading them made no further requests
+            self.assertEqual(len(self.requested), requests_made)
+
+        self.assertEqual(seen, [('document {}'.format(index), 'http://sign/{}'.format(index)) for index in range(20)])
+        self.assertEqual(len(self.requested), 40)
+        self.assertLessEqual(self.most_in_flight, 2)
+
+    def test_signing_urls_requested_without_lock(self):
+        agreement = self.agreements(1)[0]
+        free = []
+
+        def check():
+            acquired = agreement._lock.acquire(False)
+            if acquired:
+                agreement._lock.release()
+            free.append(acquired)
+
+        def get(url, **kwargs):
+            if url.endswith('/signingUrls'):
+                # Another thread, such as the consumer, can use the agreement while its signing URLs are requested
+                thread = threading.Thread(target=check)
+                thread.start()
+                thread.join()
+            return self.get(url, **kwargs)
+        self.session.get.side_effect = get
+
+        list(AgreementPrefetcher([agreement], documents=False, signing_urls=True))
+        self.assertEqual(free, [True])
+        self.assertEqual(agreement.users[0].signing_url, 'http://sign/0')
+
+    def test_raw_views_prefetched(self):
+        listing = Mock(status_code=200)
+        listing.iter_content.return_value = [b'{"userAgreementList": [{"agreementId": "1", "displayUserSetInfos": '
+                                             b'[{"displayUserSetMemberInfos": [{"email": "signer@pyechosign.com"}]}]}]}']
+        self.session.get.side_effect = lambda url, **kwargs: listing if url.endswith('agreements') else self.get(url)
+
+        views = list(self.account.iter_agreements(raw=True, prefetch=dict(signing_urls=True)))
+        requests_made = len(self.requested)
+        self.assertEqual(views[0].users[0].signing_url, 'http://sign/1')
+        self.assertEqual(views[0].documents[0].echosign_id, 'document 1')
+        self.assertEqual(len(self.requested), requests_made)
+
+    def test_lookahead_bounded(self):
+        agreements = self.agreements(50)
+        iterator = iter(AgreementPrefetcher(agreements, ahead=4, workers=1))
+        next(iterator)
+        iterator.close()
+        self.assertLessEqual(len(self.requested), 4)
+
+    def test_iter_agreements_prefetch(self):
+        listing = Mock(status_code=200)
+        listing.iter_content.return_value = [b'{"userAgreementList": [{"agreementId": "1", "displayUserSetInfos": '
+                                             b'[{"displayUserSetMemberInfos": []}]}]}']
+        self.session.get.side_effect = lambda url, **kwargs: listing if url.endswith('agreements') else self.get(url)
+
+        agreements = list(self.account.iter_agreements(prefetch=dict(ahead=2)))
+        self.assertEqual(agreements[0].echosign_id, '1')
+        self.assertEqual(agreements[0]._documents[0].echosign_id, 'document 1')
@@ -0,0 +1,124 @@
+import os
+import shutil
+import tempfile
+import threading
+from unittest import TestCase
+
+try:
+    from unittest.mock import Mock, patch
+except ImportError:
+    from mock import Mock, patch
+
+from pyEchosign.classes.account import EchosignAccount
+from pyEchosign.classes.quota import QuotaTracker
+from pyEchosign.classes.resilience import CircuitBreaker
+from pyEchosign.exceptions.internal import CircuitOpenError, QuotaExceeded
+
+HOUR = 60 * 60
+
+
+class TestQuotaTracker(TestCase):
+    def setUp(self):
+        self.time_patcher = patch('pyEchosign.classes.quota.time.time')
+        self.time = self.time_patcher.start()
+        self.time.return_value = 100 * HOUR
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.time_patcher.stop()
+        shutil.rmtree(self.directory)
+
+    def test_calls_classified(self):
+        url = 'https://api.na1.echosign.com/api/rest/v5/'
+        self.assertEqual(QuotaTracker.classify('get', url + 'agreements'), QuotaTracker.READ)
+        self.assertEqual(QuotaTracker.classify('post', url + 'transientDocuments'), QuotaTracker.UPLOAD)
+        self.assertEqual(QuotaTracker.classify('post', url + 'agreements'), QuotaTracker.SEND)
+        self.assertEqual(QuotaTracker.classify('post', url + 'reminders'), QuotaTracker.WRITE)
+        self.assertEqual(QuotaTracker.classify('put', url + 'agreements/1/status'), QuotaTracker.WRITE)
+
+    def test_account_calls_counted(self):
+        quota = QuotaTracker({QuotaTracker.SEND: 2})
+        session = Mock()
+        session.post.return_value = Mock(status_code=200)
+        account = EchosignAccount('token', session=session, api_access_point='http://echosign.com/',
+                                  circuit_breaker=False, quota=quota)
+        account.request('post', 'http://echosign.com/agreements')
+        account.request('get', 'http://echosign.com/agreements')
+
+        self.assertEqual(quota.used(QuotaTracker.SEND), 1)
+        self.assertEqual(quota.used(QuotaTracker.READ), 1)
+        self.assertEqual(quota.remaining(QuotaTracker.SEND), 1)
+        self.assertIsNone(quota.remaining(QuotaTracker.READ))
+
+        quota.enforce = True
+        account.request('post', 'http://echosign.com/agreements')
+        with self.assertRaises(QuotaExceeded):
+            account.request('post', 'http://echosign.com/agreements')
+        self.assertEqual(session.post.call_count, 2)
+
+    def test_calls_refused_by_breaker_not_counted(self):
+        quota = QuotaTracker()
+        breaker = CircuitBreaker(failure_threshold=1)
+        breaker.record_failure()
+        account = EchosignAccount('token', session=Mock(), api_access_point='http://echosign.com/',
+                                  circuit_breaker=breaker, quota=quota)
+        with self.assertRaises(CircuitOpenError):
+            account.request('post', 'http://echosign.com/agreements')
+        self.assertEqual(quota.used(QuotaTracker.SEND), 0)
+
+    def test_reserve_never_exceeds_limit(self):
+        quota = QuotaTracker({QuotaTracker.SEND: 5}, enforce=True)
+        reserved = []
+
+        def reserve():
+            for _ in range(10):
+                try:
+                    quota.reserve(QuotaTracker.SEND)
+                    reserved.append(True)
+                except QuotaExceeded:
+                    pass
+
+        threads = [threading.Thread(target=reserve) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(reserved), 5)
+        self.assertEqual(quota.used(QuotaTracker.SEND), 5)
+
+    def test_rolling_window(self):
+        quota = QuotaTracker({QuotaTracker.READ: 10}, window=24 * HOUR)
+        quota.record(QuotaTracker.READ, 6)
+        self.time.return_value += 12 * HOUR
+        quota.record(QuotaTracker.READ, 4)
+
+        self.assertEqual(quota.remaining(QuotaTracker.READ), 0)
+        # The first calls leave the window 24 hours after their bucket ends
+        self.assertEqual(quota.wait_time(QuotaTracker.READ), 13 * HOUR)
+        self.assertEqual(quota.wait_time(QuotaTracker.READ, count=7), 25 * HOUR)
+
+        self.time.return_value += 13 * HOUR
+        self.assertEqual(quota.used(QuotaTracker.READ), 4)
+        self.assertEqual(quota.wait_time(QuotaTracker.READ, reserve=5), 0)
+
+    def test_forecast(self):
+        quota = QuotaTracker({QuotaTracker.SEND: 1000})
+        quota.record(QuotaTracker.SEND, 240)
+        # 240 sends in the last day leaves 760, which lasts just over three days at that rate
+        self.assertAlmostEqual(quota.forecast(QuotaTracker.SEND), 760 / (240 / float(24 * HOUR)))
+        self.assertIsNone(quota.forecast(QuotaTracker.UPLOAD))
+
+    def test_counts_persisted(self):
+        path = os.path.join(self.directory, 'quota.sqlite3')
+        quota = QuotaTracker({QuotaTracker.UPLOAD: 100}, path=path)
+        quota.record(QuotaTracker.UPLOAD, 30)
+        quota.flush()
+        quota.record(QuotaTracker.UPLOAD, 5)
+
+        other = QuotaTracker({QuotaTracker.UPLOAD: 100}, path=path)
+        self.assertEqual(other.used(QuotaTracker.UPLOAD), 30)
+        self.assertEqual(quota.used(QuotaTracker.UPLOAD), 35)
+
+        other.record(QuotaTracker.UPLOAD, 10)
+        other.flush()
+        self.assertEqual(quota.remaining(QuotaTracker.UPLOAD), 55)
@@ -0,0 +1,111 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import TestCase
+
+try:
+    from unittest.mock import Mock
+except ImportError:
+    from mock import Mock
+
+from pyEchosign.classes.reminders import ReminderScheduler, ScheduledReminder
+from pyEchosign.classes.scheduler import RequestScheduler
+
+
+def agreement(echosign_id):
+    return Mock(echosign_id=echosign_id)
+
+
+class TestReminderScheduler(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_requests_merged_into_one_reminder(self):
+        reminders = ReminderScheduler(rate=None)
+        first = agreement('agreement 1')
+        reminder = reminders.remind(first, 'Please sign')
+        self.assertIs(reminders.remind(agreement('agreement 1'), 'Due Friday'), reminder)
+        reminders.remind(first, 'Please sign')
+        reminders.remind(first)
+        other = reminders.remind(agreement('agreement 2'))
+        self.assertEqual(len(reminders), 2)
+
+        reminders.flush()
+
+        self.assertEqual(reminder.status, ScheduledReminder.SENT)
+        self.assertEqual(other.status, ScheduledReminder.SENT)
+        first.send_reminder.assert_called_once_with('Please sign\n\nDue Friday')
+        self.assertEqual(len(reminders), 0)
+
+    def test_reminded_agreements_skipped_within_window(self):
+        reminders = ReminderScheduler(rate=None, window=60)
+        first = agreement('agreement 1')
+        reminders.remind(first)
+        reminders.flush()
+
+        skipped = reminders.remind(first, 'Again')
+        self.assertEqual(skipped.status, ScheduledReminder.SKIPPED)
+        self.assertTrue(skipped.wait(0))
+        reminders.flush()
+        self.assertEqual(first.send_reminder.call_count, 1)
+
+    def test_window_shared_through_path(self):
+        path = os.path.join(self.directory, 'reminders.sqlite3')
+        first = agreement('agreement 1')
+        one = ReminderScheduler(rate=None, path=path)
+        other = ReminderScheduler(rate=None, path=path)
+
+        # Queued by both before either sends, so only the first to send reminds the agreement
+        queued_first = one.remind(first)
+        queued_second = other.remind(first)
+        one.flush()
+        other.flush()
+
+        self.assertEqual(queued_first.status, ScheduledReminder.SENT)
+        self.assertEqual(queued_second.status, ScheduledReminder.SKIPPED)
+        self.assertEqual(ReminderScheduler(rate=None, path=path).remind(first).status, ScheduledReminder.SKIPPED)
+        self.assertEqual(first.send_reminder.call_count, 1)
+
+    def test_failed_reminder_can_be_requested_again(self):
+        reminders = ReminderScheduler(rate=None)
+        first = agreement('agreement 1')
+        first.send_reminder.side_effect = [ValueError('API down'), None]
+        failed = reminders.remind(first)
+        reminders.flush()
+        self.assertEqual(failed.status, ScheduledReminder.FAILED)
+        self.assertIsInstance(failed.error, ValueError)
+
+        retried = reminders.remind(first)
+        reminders.flush()
+        self.assertEqual(retried.status, ScheduledReminder.SENT)
+
+    def test_background_sending_bounded_and_batch(self):
+        lock = threading.Lock()
+        state = dict(in_flight=0, most=0, priorities=set())
+
+        def send_reminder(comment):
+            with lock:
+                state['in_flight'] += 1
+                state['most'] = max(state['most'], state['in_flight'])
+                state['priorities'].add(RequestScheduler.current_priority())
+            time.sleep(0.02)
+            with lock:
+                state['in_flight'] -= 1
+
+        agreements = [agreement('agreement {}'.format(index)) for index in range(6)]
+        for each in agreements:
+            each.send_reminder.side_effect = send_reminder
+
+        with ReminderScheduler(rate=None, delay=0, workers=2) as reminders:
+            scheduled = [reminders.remind(each) for each in agreements]
+            for reminder in scheduled:
+                self.assertTrue(reminder.wait(5))
+
+        self.assertTrue(all(reminder.status == ScheduledReminder.SENT for reminder in scheduled))
+        self.assertLessEqual(state['most'], 2)
+        self.assertEqual(state['priorities'], set([RequestScheduler.BATCH]))
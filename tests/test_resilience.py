@@ -0,0 +1,139 @@
+import threading
+from unittest import TestCase
+
+try:
+    from unittest.mock import Mock, patch
+except ImportError:
+    from mock import Mock, patch
+
+from pyEchosign.classes.account import EchosignAccount
+from pyEchosign.classes.resilience import CircuitBreaker, Deadline
+from pyEchosign.exceptions.internal import CircuitOpenError, DeadlineExceeded
+from pyEchosign.utils.lazy import requests
+
+
+class TestDeadline(TestCase):
+    def setUp(self):
+        self.session = Mock()
+        self.session.get.return_value = Mock(status_code=200)
+        self.account = EchosignAccount('token', session=self.session, api_access_point='http://echosign.com/',
+                                       circuit_breaker=False, timeout=(5, 60))
+
+    def test_timeout_applied_to_calls(self):
+        self.account.request('get', 'http://echosign.com/agreements')
+        self.assertEqual(self.session.get.call_args[1]['timeout'], (5, 60))
+
+        self.account.request('get', 'http://echosign.com/agreements/1', timeout=2)
+        self.assertEqual(self.session.get.call_args[1]['timeout'], 2)
+
+    def test_deadline_caps_timeout(self):
+        with Deadline(10):
+            self.account.request('get', 'http://echosign.com/agreements')
+        connect, read = self.session.get.call_args[1]['timeout']
+        self.assertEqual(connect, 5)
+        self.assertLessEqual(read, 10)
+
+    def test_nested_deadline_uses_earliest(self):
+        with Deadline(1):
+            with Deadline(60) as inner:
+                self.assertLessEqual(inner.remaining, 1)
+
+    def test_passed_deadline_fails_without_request(self):
+        with Deadline(-1):
+            with self.assertRaises(DeadlineExceeded):
+                self.account.request('post', 'http://echosign.com/agreements')
+        self.session.post.assert_not_called()
+        self.assertIsNone(Deadline.current())
+
+    def test_bind_carries_deadline_to_other_threads(self):
+        seen = []
+        with Deadline(30):
+            function = Deadline.bind(lambda: seen.append(Deadline.current()))
+        thread = threading.Thread(target=function)
+        thread.start()
+        thread.join()
+        self.assertLessEqual(seen[0].remaining, 30)
+
+
+class TestCircuitBreaker(TestCase):
+    def setUp(self):
+        self.breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=30)
+        self.session = Mock()
+        self.account = EchosignAccount('token', session=self.session, api_access_point='http://echosign.com/',
+                                       circuit_breaker=self.breaker, coalesce_reads=False)
+
+    def test_opens_after_consecutive_failures(self):
+        self.session.get.return_value = Mock(status_code=503)
+        self.account.request('get', 'http://echosign.com/agreements')
+        self.account.request('get', 'http://echosign.com/agreements')
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+        with self.assertRaises(CircuitOpenError):
+            self.account.request('get', 'http://echosign.com/agreements')
+        self.assertEqual(self.session.get.call_count, 2)
+
+    def test_client_errors_do_not_count(self):
+        self.session.get.return_value = Mock(status_code=404)
+        for _ in range(3):
+            self.account.request('get', 'http://echosign.com/agreements')
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    @patch('pyEchosign.classes.resilience.time.time')
+    def test_probe_closes_circuit(self, mock_time):
+        mock_time.return_value = 1000
+        self.session.get.side_effect = IOError('connection refused')
+        for _ in range(2):
+            with self.assertRaises(IOError):
+                self.account.request('get', 'http://echosign.com/agreements')
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+        mock_time.return_value = 1031
+        self.breaker.before_call()
+        # Only one probe is let through while half open
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_timeouts_shortened_by_deadline_do_not_count(self):
+        self.session.get.side_effect = requests.exceptions.ReadTimeout()
+        for _ in range(3):
+            with Deadline(1):
+                with self.assertRaises(requests.exceptions.Timeout):
+                    self.account.request('get', 'http://echosign.com/agreements')
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+        for _ in range(2):
+            with self.assertRaises(requests.exceptions.Timeout):
+                self.account.request('get', 'http://echosign.com/agreements')
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+    @patch('pyEchosign.classes.resilience.time.time')
+    def test_interrupted_probe_allows_another(self, mock_time):
+        mock_time.return_value = 1000
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        mock_time.return_value = 1031
+
+        self.session.get.side_effect = KeyboardInterrupt()
+        with self.assertRaises(KeyboardInterrupt):
+            self.account.request('get', 'http://echosign.com/agreements')
+
+        self.breaker.before_call()
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+
+    def test_default_timeout(self):
+        account = EchosignAccount('token', session=self.session, api_access_point='http://echosign.com/')
+        self.assertEqual(account.timeout, EchosignAccount.DEFAULT_TIMEOUT)
+
+    def test_slow_responses_count_as_failures(self):
+        breaker = CircuitBreaker(failure_threshold=1, slow_call_threshold=5)
+        breaker.record_success(duration=6)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+    def test_shared_per_access_point(self):
+        self.assertIs(CircuitBreaker.for_access_point('http://a.echosign.com/'),
+                      CircuitBreaker.for_access_point('http://a.echosign.com/'))
+        self.assertIsNot(CircuitBreaker.for_access_point('http://a.echosign.com/'),
+                         CircuitBreaker.for_access_point('http://b.echosign.com/'))
@@ -0,0 +1,94 @@
+import threading
+import time
+from unittest import TestCase
+
+try:
+    from unittest.mock import Mock
+except ImportError:
+    from mock import Mock
+
+from pyEchosign.classes.account import EchosignAccount
+from pyEchosign.classes.resilience import Deadline
+from pyEchosign.classes.scheduler import RequestScheduler
+from pyEchosign.exceptions.internal import DeadlineExceeded
+
+
+class TestRequestScheduler(TestCase):
+    def wait_for(self, condition):
+        for _ in range(500):
+            if condition():
+                return
+            time.sleep(0.01)
+        self.fail('Timed out waiting')
+
+    def start(self, scheduler, priority, order):
+        def acquire():
+            scheduler.acquire(priority)
+            order.append(priority)
+            scheduler.release()
+        thread = threading.Thread(target=acquire)
+        thread.start()
+        return thread
+
+    def test_interactive_served_before_queued_batch(self):
+        scheduler = RequestScheduler(max_concurrent=1, reserved=0)
+        scheduler.acquire(RequestScheduler.BATCH)
+        order = []
+
+        batch = self.start(scheduler, RequestScheduler.BATCH, order)
+        self.wait_for(lambda: scheduler.waiting(RequestScheduler.BATCH) == 1)
+        interactive = self.start(scheduler, RequestScheduler.INTERACTIVE, order)
+        self.wait_for(lambda: scheduler.waiting(RequestScheduler.INTERACTIVE) == 1)
+
+        scheduler.release()
+        batch.join(5)
+        interactive.join(5)
+        self.assertEqual(order, [RequestScheduler.INTERACTIVE, RequestScheduler.BATCH])
+        self.assertEqual(scheduler.running, 0)
+
+    def test_batch_leaves_reserved_slots(self):
+        scheduler = RequestScheduler(max_concurrent=2, reserved=1)
+        self.assertTrue(scheduler.acquire(RequestScheduler.BATCH))
+        self.assertFalse(scheduler.acquire(RequestScheduler.BATCH, timeout=0.05))
+        self.assertTrue(scheduler.acquire(RequestScheduler.INTERACTIVE, timeout=0.05))
+        self.assertFalse(scheduler.acquire(RequestScheduler.INTERACTIVE, timeout=0.05))
+
+    def test_priority_applies_to_thread_and_bound_functions(self):
+        self.assertEqual(RequestScheduler.current_priority(), RequestScheduler.INTERACTIVE)
+        seen = []
+        with RequestScheduler.priority(RequestScheduler.BATCH):
+            self.assertEqual(RequestScheduler.current_priority(), RequestScheduler.BATCH)
+            function = RequestScheduler.bind(lambda: seen.append(RequestScheduler.current_priority()))
+        thread = threading.Thread(target=function)
+        thread.start()
+        thread.join()
+        self.assertEqual(seen, [RequestScheduler.BATCH])
+        self.assertEqual(RequestScheduler.current_priority(), RequestScheduler.INTERACTIVE)
+
+
+class TestAccountScheduling(TestCase):
+    def setUp(self):
+        self.scheduler = RequestScheduler(max_concurrent=1, reserved=0)
+        self.session = Mock()
+        self.account = EchosignAccount('token', session=self.session, api_access_point='http://echosign.com/',
+                                       circuit_breaker=False, coalesce_reads=False, scheduler=self.scheduler)
+
+    def test_requests_take_a_slot(self):
+        def get(url, **kwargs):
+            self.assertEqual(self.scheduler.running, 1)
+            return Mock(status_code=200)
+        self.session.get.side_effect = get
+
+        self.account.request('get', 'http://echosign.com/agreements')
+        self.assertEqual(self.session.get.call_count, 1)
+        self.assertEqual(self.scheduler.running, 0)
+
+    def test_deadline_passing_while_queued_raises(self):
+        self.scheduler.acquire()
+        try:
+            with Deadline(0.05):
+                with self.assertRaises(DeadlineExceeded):
+                    self.account.request('get', 'http://echosign.com/agreements')
+        finally:
+            self.scheduler.release()
+        self.session.get.assert_not_called()
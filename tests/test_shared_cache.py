@@ -0,0 +1,75 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+try:
+    from unittest.mock import Mock, patch
+except ImportError:
+    from mock import Mock, patch
+
+from pyEchosign.classes.account import EchosignAccount
+from pyEchosign.classes.agreement import Agreement
+from pyEchosign.classes.shared_cache import SharedCache
+from pyEchosign.utils import endpoints
+
+
+class TestSharedCache(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cache.sqlite3')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_entries_shared_between_instances(self):
+        SharedCache(self.path).set('key', dict(value=1))
+        self.assertEqual(SharedCache(self.path).get('key'), dict(value=1))
+
+    @patch('pyEchosign.classes.shared_cache.time.time')
+    def test_expired_entries_ignored(self, mock_time):
+        mock_time.return_value = 1000
+        cache = SharedCache(self.path, ttl=60)
+        cache.set('key', 'value')
+        cache.set('forever', 'value', ttl=10 ** 9)
+        mock_time.return_value = 1061
+        self.assertIsNone(cache.get('key'))
+        self.assertEqual(cache.get('forever'), 'value')
+
+    def test_reconnects_after_fork(self):
+        cache = SharedCache(self.path)
+        connection = cache._db
+        with patch('pyEchosign.classes.shared_cache.os.getpid', return_value=-1):
+            cache.set('key', 'value')
+            self.assertIsNot(cache._db, connection)
+        self.assertEqual(cache.get('key'), 'value')
+
+    def test_accounts_share_responses(self):
+        cache = SharedCache(self.path)
+        session = Mock()
+        session.get.return_value = Mock(status_code=200, json=Mock(return_value=dict(
+            api_access_point='https://api.na1.echosign.com/',
+            documents=[dict(documentId='1', name='contract.pdf', numPages=1)])))
+
+        first = EchosignAccount('token', session=session, cache=cache, circuit_breaker=False)
+        second = EchosignAccount('token', session=session, cache=cache, circuit_breaker=False)
+        self.assertEqual(second.api_access_point, 'https://api.na1.echosign.com/' + endpoints.API_URL_EXTENSION)
+        self.assertEqual(session.get.call_count, 1)
+
+        documents = Agreement(first, echosign_id='123').documents
+        cached_documents = Agreement(second, echosign_id='123').documents
+        self.assertEqual(session.get.call_count, 2)
+        self.assertEqual([document.echosign_id for document in cached_documents],
+                         [document.echosign_id for document in documents])
+
+        # Other tenants are not served the cached responses
+        EchosignAccount('other token', session=session, cache=cache, circuit_breaker=False)
+        self.assertEqual(session.get.call_count, 3)
+
+        # A refreshed access token still reads the cached responses
+        refreshing = EchosignAccount('token', session=session, cache=cache, circuit_breaker=False,
+                                     api_access_point=first.api_access_point, refresh_token='refresh')
+        Agreement(refreshing, echosign_id='123').documents
+        refreshing.access_token = 'refreshed token'
+        Agreement(refreshing, echosign_id='123').documents
+        self.assertEqual(session.get.call_count, 4)
@@ -0,0 +1,95 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+try:
+    from unittest.mock import Mock
+except ImportError:
+    from mock import Mock
+
+from pyEchosign.classes.agreement import Agreement
+from pyEchosign.classes.library_document import LibraryDocument
+from pyEchosign.classes.snapshot import Snapshot
+from pyEchosign.exceptions.internal import InvalidSnapshot
+
+
+def agreement_json(index):
+    return {
+        'agreementId': 'agreement {}'.format(index),
+        'name': u'Contract nº {}'.format(index),
+        'status': 'OUT_FOR_SIGNATURE',
+        'displayDate': '2017-02-19T08:22:34-08:00',
+        'displayUserSetInfos': [{'displayUserSetMemberInfos': [
+            {'email': 'signer{}@pyechosign.com'.format(index), 'fullName': 'Signer', 'company': None},
+        ]}],
+    }
+
+
+class TestSnapshot(TestCase):
+    def setUp(self):
+        self.account = Mock()
+        self.agreements = Agreement.json_to_agreements(
+            self.account, dict(userAgreementList=[agreement_json(index) for index in range(3)]))
+        self.library_documents = [
+            LibraryDocument(self.account, 'library 1', ['DOCUMENT'], 'Template', '2017-03-01T10:00:00+00:00',
+                            LibraryDocument.SHARED),
+        ]
+
+    def test_round_trip(self):
+        other_account = Mock()
+        snapshot = Snapshot.loads(other_account, Snapshot(self.agreements, self.library_documents).dumps())
+
+        self.assertEqual(len(snapshot.agreements), 3)
+        for original, loaded in zip(self.agreements, snapshot.agreements):
+            self.assertIs(loaded.account, other_account)
+            self.assertEqual(loaded.echosign_id, original.echosign_id)
+            self.assertEqual(loaded.name, original.name)
+            self.assertEqual(loaded.status, original.status)
+            self.assertEqual(loaded.date, original.date)
+            self.assertEqual(loaded.date.utcoffset(), original.date.utcoffset())
+            self.assertEqual([user.email for user in loaded.users], [user.email for user in original.users])
+            self.assertEqual(loaded.users[0].full_name, 'Signer')
+            self.assertIsNone(loaded.users[0].company)
+
+        document = snapshot.library_documents[0]
+        self.assertEqual(document.echosign_id, 'library 1')
+        self.assertEqual(document.name, 'Template')
+        self.assertEqual(document.scope, LibraryDocument.SHARED)
+        self.assertEqual(document.modified_date, self.library_documents[0].modified_date)
+
+    def test_agreement_without_date_or_status(self):
+        agreement = Agreement(self.account, echosign_id='agreement 1')
+        loaded = Snapshot.loads(self.account, Snapshot([agreement]).dumps()).agreements[0]
+        self.assertIsNone(loaded.date)
+        self.assertFalse(hasattr(loaded, 'status'))
+
+    def test_strings_stored_once(self):
+        agreements = Agreement.json_to_agreements(
+            self.account, dict(userAgreementList=[agreement_json(1) for _ in range(100)]))
+        self.assertLess(len(Snapshot(agreements).dumps()), len(Snapshot(agreements[:2]).dumps()) + 200)
+
+    def test_save_and_load(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'listings.snapshot')
+            snapshot = Snapshot(self.agreements, created=1000)
+            snapshot.save(path)
+            loaded = Snapshot.load(self.account, path)
+            self.assertEqual(loaded.created, 1000)
+            self.assertEqual(len(loaded.agreements), 3)
+            self.assertEqual(os.listdir(directory), ['listings.snapshot'])
+        finally:
+            shutil.rmtree(directory)
+
+    def test_other_versions_rejected(self):
+        data = bytearray(Snapshot(self.agreements).dumps())
+        data[5] += 1
+        with self.assertRaises(InvalidSnapshot):
+            Snapshot.loads(self.account, bytes(data))
+
+        with self.assertRaises(InvalidSnapshot):
+            Snapshot.loads(self.account, b'not a snapshot at all')
+
+        with self.assertRaises(InvalidSnapshot):
+            Snapshot.loads(self.account, Snapshot(self.agreements).dumps()[:-10])
@@ -0,0 +1,79 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+try:
+    from unittest.mock import Mock
+except ImportError:
+    from mock import Mock
+
+from pyEchosign.classes.account import EchosignAccount
+from pyEchosign.classes.sync import ShardedSync
+
+AGREEMENT_IDS = ['agreement {}'.format(index) for index in range(20)]
+
+
+def make_account():
+    listing = dict(userAgreementList=[dict(
+        agreementId=agreement_id, name='Contract', status='SIGNED', displayDate='2017-09-09T09:33:53-07:00',
+        displayUserSetInfos=[{'displayUserSetMemberInfos': [{'email': 'signer@pyechosign.com'}]}])
+        for agreement_id in AGREEMENT_IDS])
+    session = Mock()
+    session.get.return_value = Mock(status_code=200, json=Mock(return_value=listing))
+    return EchosignAccount('token', session=session, api_access_point='http://echosign.com/',
+                           circuit_breaker=False)
+
+
+def record_pid(agreement):
+    # The checkpoint only records that an agreement completed, so note which process synced it alongside
+    with open(os.path.join(os.environ['PYECHOSIGN_SYNC_TEST'], agreement.echosign_id), 'w') as file:
+        file.write(str(os.getpid()))
+
+
+def fail_one(agreement):
+    if agreement.echosign_id == 'agreement 3':
+        raise ValueError('Could not sync')
+    record_pid(agreement)
+
+
+class TestShardedSync(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.output = os.path.join(self.directory, 'output')
+        os.makedirs(self.output)
+        os.environ['PYECHOSIGN_SYNC_TEST'] = self.output
+        self.checkpoint = os.path.join(self.directory, 'sync.sqlite3')
+
+    def tearDown(self):
+        del os.environ['PYECHOSIGN_SYNC_TEST']
+        shutil.rmtree(self.directory)
+
+    def test_shards_are_stable_and_cover_every_agreement(self):
+        sync = ShardedSync(make_account, record_pid, self.checkpoint, processes=3)
+        shards = sync.partition(dict(agreementId=agreement_id) for agreement_id in AGREEMENT_IDS)
+        self.assertEqual(sorted(data['agreementId'] for shard in shards.values() for data in shard),
+                         sorted(AGREEMENT_IDS))
+        for shard, agreements_data in shards.items():
+            self.assertTrue(0 <= shard < 3)
+            for data in agreements_data:
+                self.assertEqual(ShardedSync(make_account, record_pid, self.checkpoint, processes=3)
+                                 .shard(data['agreementId']), shard)
+
+    def test_syncs_across_processes_and_resumes_failures(self):
+        progress = ShardedSync(make_account, fail_one, self.checkpoint, processes=2).run()
+
+        self.assertEqual(progress.total, 20)
+        self.assertEqual(progress.completed, 19)
+        self.assertEqual(list(progress.failed), ['agreement 3'])
+        self.assertIn('Could not sync', progress.failed['agreement 3'])
+        pids = set(open(os.path.join(self.output, name)).read() for name in os.listdir(self.output))
+        self.assertNotIn(str(os.getpid()), pids)
+
+        sync = ShardedSync(make_account, record_pid, self.checkpoint, processes=2)
+        progress = sync.run()
+        self.assertEqual((progress.total, progress.skipped, progress.completed), (1, 19, 1))
+        self.assertEqual(sync.completed_ids(), set(AGREEMENT_IDS))
+
+        sync.reset()
+        self.assertEqual(sync.completed_ids(), set())
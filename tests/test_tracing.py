@@ -0,0 +1,113 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+from io import BytesIO
+from unittest import TestCase
+
+try:
+    from unittest.mock import Mock
+except ImportError:
+    from mock import Mock
+
+from pyEchosign.classes.account import EchosignAccount
+from pyEchosign.classes.agreement import Agreement
+from pyEchosign.classes.documents import TransientDocument
+from pyEchosign.classes.tracing import JsonLinesExporter, SpanCollector, Tracer, trace
+
+
+class TestTracing(TestCase):
+    def setUp(self):
+        self.collector = SpanCollector()
+        self.tracer = Tracer([self.collector]).install()
+
+        self.session = Mock()
+        self.account = EchosignAccount('token', session=self.session, api_access_point='http://echosign.com/',
+                                       circuit_breaker=False)
+
+    def tearDown(self):
+        self.tracer.uninstall()
+
+    def test_operations_nest_http_spans(self):
+        self.session.post.side_effect = [
+            Mock(status_code=201, json=Mock(return_value=dict(transientDocumentId='document 1'))),
+            Mock(status_code=201, json=Mock(return_value=dict(agreementId='agreement 1'))),
+        ]
+
+        with trace('create contract') as root:
+            document = TransientDocument(self.account, 'contract.pdf', BytesIO(b'pdf'))
+            agreement = Agreement(self.account, name='Contract', files=[document])
+            agreement.send([])
+
+        spans = dict((span.name, span) for span in self.collector.spans)
+        self.assertEqual(spans['TransientDocument.upload'].attributes['document_id'], 'document 1')
+        self.assertEqual(spans['Agreement.send'].attributes['agreement_id'], 'agreement 1')
+        self.assertEqual(spans['TransientDocument.upload'].parent_id, root.span_id)
+        self.assertEqual(spans['Agreement.send'].parent_id, root.span_id)
+
+        http_spans = [span for span in self.collector.spans if span.name == 'http']
+        self.assertEqual(len(http_spans), 2)
+        self.assertEqual(http_spans[1].parent_id, spans['Agreement.send'].span_id)
+        self.assertEqual(http_spans[1].attributes['status_code'], 201)
+        self.assertEqual(set(span.trace_id for span in self.collector.spans), set([root.trace_id]))
+
+    def test_errors_recorded(self):
+        self.session.delete.return_value = Mock(status_code=500, json=Mock(return_value={}), content=b'')
+        agreement = Agreement(self.account, echosign_id='agreement 1')
+        with self.assertRaises(Exception):
+            agreement.delete()
+
+        span = self.collector.spans[-1]
+        self.assertEqual(span.name, 'Agreement.delete')
+        self.assertEqual(span.attributes['agreement_id'], 'agreement 1')
+        self.assertIn('ApiError', span.error)
+
+    def test_json_lines_export(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'spans.jsonl')
+            self.tracer = Tracer([JsonLinesExporter(path)]).install()
+            with trace('outer', agreement_id='agreement 1'):
+                with trace('inner'):
+                    pass
+
+            with open(path) as file:
+                lines = [json.loads(line) for line in file]
+            self.assertEqual([line['name'] for line in lines], ['inner', 'outer'])
+            self.assertEqual(lines[0]['parent_id'], lines[1]['span_id'])
+            self.assertEqual(lines[1]['attributes'], dict(agreement_id='agreement 1'))
+        finally:
+            shutil.rmtree(directory)
+
+    def test_slow_spans_profiled(self):
+        slow = []
+        self.tracer = Tracer([self.collector], slow_threshold=0.01, sample_interval=0.005,
+                             on_slow_span=slow.append).install()
+        with trace('slow'):
+            time.sleep(0.1)
+        with trace('fast'):
+            pass
+
+        self.assertEqual([span.name for span in slow], ['slow'])
+        self.assertTrue(any('test_slow_spans_profiled' in stack for stack in slow[0].profile))
+        self.assertIsNone(self.collector.spans[-1].profile)
+
+    def test_finished_spans_no_longer_profiled(self):
+        self.tracer = Tracer([self.collector], slow_threshold=0.01, sample_interval=0.005).install()
+        with trace('slow'):
+            time.sleep(0.05)
+        finished = self.collector.spans[-1]
+        profile = finished.to_dict()['profile']
+
+        # The sampler keeps running for another open span, but leaves the exported one alone
+        with trace('other'):
+            time.sleep(0.05)
+        self.assertEqual(finished.profile, profile)
+        self.assertIsNot(finished.to_dict()['profile'], finished.profile)
+
+    def test_nothing_recorded_without_tracer(self):
+        self.tracer.uninstall()
+        with trace('untraced') as span:
+            span.set_attribute('ignored', True)
+        self.assertEqual(self.collector.spans, [])